@@ -1,13 +1,11 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-from engine import TradingEngine
 import os
 import sys
 import subprocess
 import time
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-import alpaca_trade_api as tradeapi
 
 # --- CONFIGURATION INITIALE ---
 st.set_page_config(page_title="Crypto Bot Dashboard", layout="wide")
@@ -39,6 +37,75 @@ def stop_bot():
         st.session_state.bot_process = None
         st.session_state.active_bot_type = None
 
+# --- CACHES (Streamlit relance tout le script à chaque interaction) ---
+@st.cache_resource
+def get_alpaca_api(api_key, secret_key, base_url):
+    """Client REST créé une seule fois pour toutes les sessions"""
+    import alpaca_trade_api as tradeapi
+    return tradeapi.REST(api_key, secret_key, base_url, api_version='v2')
+
+@st.cache_data(ttl=30, show_spinner=False)
+def get_account_info(api_key, secret_key, base_url):
+    """Compte Alpaca relu au plus toutes les 30 secondes"""
+    account = get_alpaca_api(api_key, secret_key, base_url).get_account()
+    return {'equity': float(account.equity), 'buying_power': float(account.buying_power)}
+
+@st.cache_resource
+def get_ohlcv_cache():
+    from ohlcv_cache import OHLCVCache
+    return OHLCVCache()
+
+@st.cache_resource
+def start_data_hub():
+    """Hub de données partagé (datahub.py) lancé une seule fois : les bots démarrés d'ici passent par lui"""
+    import datahub
+    try:
+        datahub.ensure_hub()
+        return ["--hub", str(datahub.DEFAULT_SOCKET)]
+    except Exception:
+        return [] # Sans hub, chaque bot télécharge lui-même
+
+@st.cache_data(ttl=300, show_spinner=False)
+def load_history(symbol, timeframe, lookback):
+    """Historique depuis le cache local (seules les bougies manquantes sont téléchargées)"""
+    cache = get_ohlcv_cache()
+    cache.update_yfinance(symbol, interval=timeframe, period=f"{lookback}d")
+    since = datetime.now(timezone.utc) - timedelta(days=lookback)
+    return cache.frame('yfinance', symbol, timeframe, since=since)
+
+def run_backtest(symbol, hist):
+    """Backtest réduit à ce qui est affiché (l'objet Strategy n'est pas sérialisable)"""
+    from engine import TradingEngine # backtesting : chargé seulement au premier backtest
+    stats, _ = TradingEngine(symbol).run_backtest(hist)
+    result = {key: stats[key] for key in ('Return [%]', 'Win Rate [%]', 'Profit Factor', '# Trades')}
+    result['_equity_curve'] = stats['_equity_curve'][['Equity']]
+    result['_trades'] = stats['_trades']
+    return result
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def run_backtest_cached(symbol, hist, params):
+    """Backtest mémoïsé : clé = hash des données + paramètres de la stratégie (32 résultats max)"""
+    return run_backtest(symbol, hist)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def run_monte_carlo_cached(trades, paths=100_000):
+    """Monte Carlo des trades du backtest (100k séquences tirées avec remise), mémoïsé comme le backtest"""
+    from montecarlo import monte_carlo
+    return monte_carlo(trades, cash=1000000, paths=paths)
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def run_portfolio_cached(symbols, timeframe, lookback, params):
+    """Backtest de portefeuille (une passe sur tous les actifs, capital équiréparti), mémoïsé"""
+    from portfolio import run_portfolio_backtest
+    frames = {}
+    for symbol in symbols:
+        hist = load_history(symbol, timeframe, lookback)
+        if not hist.empty:
+            frames[symbol] = hist[['Open', 'High', 'Low', 'Close', 'Volume']].dropna()
+    if not frames:
+        return None
+    return run_portfolio_backtest(frames, **dict(params))
+
 # --- CONNEXION ALPACA (Pour l'affichage onglet 1) ---
 api_key = os.getenv("ALPACA_API_KEY")
 secret_key = os.getenv("ALPACA_SECRET_KEY")
@@ -48,8 +115,7 @@ connected = False
 account = None
 try:
     if api_key:
-        api = tradeapi.REST(api_key, secret_key, base_url, api_version='v2')
-        account = api.get_account()
+        account = get_account_info(api_key, secret_key, base_url)
         connected = True
 except:
     pass
@@ -80,7 +146,7 @@ with tab_alpaca:
         # BOUTON START ALPACA
         if st.button("▶️ DÉMARRER SIGNAUX", disabled=is_bot_running(), key="start_alpaca", use_container_width=True):
             try:
-                cmd = [sys.executable, "signal_bot.py", "--symbol", choix_symbol]
+                cmd = [sys.executable, "signal_bot.py", "--symbol", choix_symbol] + start_data_hub()
                 st.session_state.bot_process = subprocess.Popen(cmd)
                 st.session_state.active_bot_type = 'alpaca'
                 st.rerun()
@@ -107,8 +173,8 @@ with tab_alpaca:
         st.subheader("Portefeuille Alpaca (Paper)")
         if connected:
             c1, c2 = st.columns(2)
-            c1.metric("Equity", f"{float(account.equity)} $")
-            c2.metric("Buying Power", f"{float(account.buying_power)} $")
+            c1.metric("Equity", f"{account['equity']} $")
+            c2.metric("Buying Power", f"{account['buying_power']} $")
         else:
             st.warning("Alpaca non connecté.")
 
@@ -133,7 +199,7 @@ with tab_binance: # On garde le nom de variable tab_binance pour pas casser le c
         if st.button("🚀 LANCER LA SIMULATION", disabled=is_bot_running(), key="start_local", use_container_width=True):
             try:
                 # On lance local_bot.py
-                cmd = [sys.executable, "local_bot.py", "--symbol", local_symbol, "--amount", str(local_amount)]
+                cmd = [sys.executable, "local_bot.py", "--symbol", local_symbol, "--amount", str(local_amount)] + start_data_hub()
                 st.session_state.bot_process = subprocess.Popen(cmd)
                 st.session_state.active_bot_type = 'local' # Nouveau type
                 st.rerun()
@@ -152,6 +218,18 @@ with tab_binance: # On garde le nom de variable tab_binance pour pas casser le c
             st.markdown(f"**Mise par trade :** {local_amount} {local_symbol.split('/')[0]}")
             
             st.info("👇 Regardez le terminal VS Code ci-dessous pour voir le journal des transactions en direct.")
+
+            # Dernières bougies + indicateurs lus dans l'anneau partagé du hub (ni téléchargement ni recalcul)
+            from ringbuffer import BarRing, ring_name
+            ring = BarRing.attach(ring_name('binance', local_symbol, '1h'))
+            if ring:
+                rows = ring.window(120, forming=True)
+                ring.close()
+                if len(rows):
+                    live = pd.DataFrame({'Close': rows['close'], 'EMA rapide': rows['ema_fast'], 'EMA lente': rows['ema_slow']},
+                                        index=pd.to_datetime(rows['timestamp'], unit='ms'))
+                    st.line_chart(live)
+                    st.caption(f"RSI {rows['rsi'][-1]:.1f} | ATR {rows['atr'][-1]:.2f} | flux partagé du hub de données")
             
         elif is_bot_running():
             st.warning("⚠️ Un autre bot tourne déjà.")
@@ -165,15 +243,18 @@ with tab_simu:
     st.header("Simulation Réelle (Objectif 5 Jours / 1H)")
     st.warning("⚠️ Mode Sniper : Analyse sur 120 bougies horaires.")
     
-    symbol = st.selectbox("Actif", ["BTC-USD", "ETH-USD", "NVDA", "AAPL"], index=0, key="sim_select")
+    sim_assets = ["BTC-USD", "ETH-USD", "NVDA", "AAPL"]
+    symbol = st.selectbox("Actif", sim_assets, index=0, key="sim_select")
     days = 5  
     timeframe = "1h" 
+    # Profilage : le backtest est relancé hors cache et le rapport s'affiche sous les résultats
+    profile_backtest = st.checkbox("🔬 Profiler le backtest", key="sim_profile")
     
     if st.button("Lancer la Simulation", key="sim_btn"):
         try:
             with st.spinner("Analyse en cours..."):
                 lookback = days + 10 
-                hist = yf.download(symbol, period=f"{lookback}d", interval=timeframe)
+                hist = load_history(symbol, timeframe, lookback)
                 
                 if not hist.empty:
                     if isinstance(hist.columns, pd.MultiIndex):
@@ -182,8 +263,16 @@ with tab_simu:
                     hist = hist[['Open', 'High', 'Low', 'Close', 'Volume']]
                     hist = hist.dropna()
 
-                    eng = TradingEngine(symbol)
-                    stats, bt = eng.run_backtest(hist)
+                    from engine import strategy_params
+                    profile_report = None
+                    if profile_backtest:
+                        from profiling import Profiler
+                        with Profiler("dashboard").session(symbol.replace("/", "-"), quiet=True) as profile:
+                            stats = run_backtest(symbol, hist)
+                        profile_report = profile['report']
+                    else:
+                        # Même symbole, mêmes données, mêmes paramètres : résultat instantané
+                        stats = run_backtest_cached(symbol, hist, tuple(strategy_params().items()))
                     
                     if stats['# Trades'] == 0:
                         st.warning("⚠️ Aucun trade détecté.")
@@ -194,6 +283,10 @@ with tab_simu:
                     c3.metric("Profit Factor", f"{stats['Profit Factor']:.2f}")
                     c4.metric("Number of Trades", int(stats['# Trades']))
 
+                    if profile_report:
+                        st.subheader("🔬 Profil du backtest")
+                        st.code(profile_report, language=None)
+
                     st.subheader("Capital Evolution")
                     st.line_chart(stats['_equity_curve']['Equity'])
 
@@ -224,5 +317,35 @@ with tab_simu:
                     else:
                         st.info("Aucun trade n'a été ouvert sur cette période.")
 
+                    # --- ROBUSTESSE : MONTE CARLO SUR LES TRADES ---
+                    if len(trades) >= 2:
+                        mc = run_monte_carlo_cached(trades[['PnL']])
+                        st.subheader(f"Monte Carlo ({mc['paths']:,} séquences de {mc['trades']} trades)")
+                        m1, m2, m3, m4 = st.columns(4)
+                        m1.metric("Rendement médian", f"{mc['return_pct'][50]:.2f}%")
+                        m2.metric("Rendement 5% / 95%", f"{mc['return_pct'][5]:.1f}% / {mc['return_pct'][95]:.1f}%")
+                        m3.metric("Drawdown max (95%)", f"{mc['max_drawdown_pct'][95]:.2f}%")
+                        m4.metric("Probabilité de ruine (-50%)", f"{mc['prob_ruin']:.2%}")
+                        st.line_chart(mc['bands'])
+
+        except Exception as e:
+            st.error(f"Erreur d'affichage : {e}")
+
+    # --- PORTEFEUILLE : TOUS LES ACTIFS EN UNE SEULE PASSE ---
+    if st.button("Comparer tous les actifs (portefeuille)", key="portfolio_btn"):
+        try:
+            with st.spinner("Backtest du portefeuille..."):
+                from engine import strategy_params
+                result = run_portfolio_cached(tuple(sim_assets), timeframe, days + 10, tuple(strategy_params().items()))
+            if result is None:
+                st.warning("⚠️ Aucune donnée disponible.")
+            else:
+                stats = result['stats']
+                p1, p2, p3 = st.columns(3)
+                p1.metric("Portfolio Return", f"{stats['Return [%]']:.2f}%")
+                p2.metric("Max Drawdown", f"{stats['Max. Drawdown [%]']:.2f}%")
+                p3.metric("Number of Trades", int(stats['# Trades']))
+                st.line_chart(result['equity'])
+                st.dataframe(result['per_symbol'].round(2), use_container_width=True)
         except Exception as e:
-            st.error(f"Erreur d'affichage : {e}")
\ No newline at end of file
+            st.error(f"Erreur du portefeuille : {e}")
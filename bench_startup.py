@@ -0,0 +1,157 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# ==========================================
+# BUDGET DE DÉMARRAGE DES POINTS D'ENTRÉE
+# ==========================================
+# Pour chaque script, dans un processus neuf :
+# - help       : `script --help` (coût des imports faits avant la lecture des arguments)
+# - first_loop : du lancement jusqu'à l'entrée dans la boucle principale (BarScheduler.run / run_stream / asyncio.run)
+#                ou, pour le dashboard, jusqu'à la fin du premier rendu Streamlit
+# Code de sortie 1 si un budget est dépassé (ou si un script ne démarre pas).
+# Aucun appel réseau : la boucle est interceptée avant la première requête, les clés sont factices.
+
+ROOT = Path(__file__).parent
+
+# Budgets en secondes (first_loop)
+ENTRY_POINTS = {
+    'local_bot.py': {'args': ['--symbol', 'BTC/USDT'], 'budget': 2.0},
+    'binance_simu.py': {'args': ['--symbol', 'BTC/USDT'], 'budget': 2.0},
+    'live_bot.py': {'args': ['--symbol', 'BTC/USD'], 'budget': 3.0},
+    'signal_bot.py': {'args': ['--symbol', 'BTC/USD'], 'budget': 3.0},
+    'scanner.py': {'args': ['--symbols', 'BTC/USDT,ETH/USDT'], 'budget': 2.0},
+    'app.py': {'args': [], 'budget': 4.0},
+}
+
+# Modules lourds dont on note la présence à l'entrée de la boucle
+HEAVY_MODULES = ('pandas', 'backtesting', 'ccxt', 'yfinance', 'alpaca_trade_api', 'bokeh')
+
+# Variables d'environnement : clés factices (pas de réseau), Telegram et Alpaca du dashboard désactivés,
+# état des bots / cache / profils dans un dossier temporaire (bot_state/ et data_cache/ réels jamais touchés)
+BENCH_DIR = Path(tempfile.gettempdir()) / "bench_startup"
+BENCH_ENV = {
+    'ALPACA_API_KEY': 'bench', 'ALPACA_SECRET_KEY': 'bench',
+    'ALPACA_BASE_URL': 'https://paper-api.alpaca.markets',
+    'TELEGRAM_BOT_TOKEN': '', 'TELEGRAM_CHAT_ID': '',
+    'BOT_STATE_DIR': str(BENCH_DIR / "bot_state"),
+    'OHLCV_CACHE_DIR': str(BENCH_DIR / "data_cache"),
+    'PROFILE_DIR': str(BENCH_DIR / "profiles"),
+}
+
+# Exécuté dans le processus enfant : arrête le script à l'entrée de sa boucle principale
+BOT_PROBE = r'''
+import json, runpy, sys, time
+script, args, heavy = sys.argv[1], json.loads(sys.argv[2]), sys.argv[3].split(",")
+
+class FirstLoop(BaseException):
+    pass
+
+def reached(*a, **k):
+    for main in a:
+        getattr(main, "close", lambda: None)() # Coroutine jamais lancée (scanner)
+    raise FirstLoop
+
+import asyncio, scheduler, stream
+scheduler.BarScheduler.run = reached
+stream.run_stream = reached
+asyncio.run = reached # scanner.py : asyncio.run(run_scanner(...))
+sys.argv = [script] + args
+try:
+    runpy.run_path(script, run_name="__main__")
+    status = "exit"
+except FirstLoop:
+    status = "ok"
+except SystemExit:
+    status = "exit"
+print("__BENCH__" + json.dumps({"at": time.time(), "status": status,
+                                "heavy": [m for m in heavy if m in sys.modules]}))
+'''
+
+APP_PROBE = r'''
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+heavy = sys.argv[3].split(",")
+at = AppTest.from_file(sys.argv[1], default_timeout=60).run()
+status = "error" if at.exception else "ok"
+print("__BENCH__" + json.dumps({"at": time.time(), "status": status,
+                                "heavy": [m for m in heavy if m in sys.modules]}))
+'''
+
+
+def _env(script):
+    env = dict(os.environ, **BENCH_ENV)
+    if script == 'app.py':
+        # Pas d'appel get_account() pendant la mesure
+        env['ALPACA_API_KEY'] = ''
+    return env
+
+def measure_help(script):
+    start = time.time()
+    subprocess.run([sys.executable, script, '--help'], cwd=ROOT, env=_env(script),
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.time() - start
+
+def measure_first_loop(script, args):
+    probe = APP_PROBE if script == 'app.py' else BOT_PROBE
+    start = time.time()
+    proc = subprocess.run([sys.executable, '-c', probe, script, json.dumps(args), ",".join(HEAVY_MODULES)],
+                          cwd=ROOT, env=_env(script), capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith("__BENCH__"):
+            result = json.loads(line[len("__BENCH__"):])
+            result['first_loop'] = result.pop('at') - start
+            return result
+    error = (proc.stderr.strip().splitlines() or ["aucune sortie"])[-1]
+    return {'status': 'error', 'error': error, 'first_loop': None, 'heavy': []}
+
+def interpreter_baseline():
+    start = time.time()
+    subprocess.run([sys.executable, '-c', 'pass'])
+    return time.time() - start
+
+
+def run(scripts, repeat=3, scale=1.0):
+    results = {'interpreter': min(interpreter_baseline() for _ in range(repeat)), 'entry_points': {}}
+    for script in scripts:
+        spec = ENTRY_POINTS[script]
+        runs = [measure_first_loop(script, spec['args']) for _ in range(repeat)]
+        ok = [r for r in runs if r['status'] == 'ok']
+        best = min(ok, key=lambda r: r['first_loop']) if ok else runs[-1]
+        budget = spec['budget'] * scale
+        best['help'] = min(measure_help(script) for _ in range(repeat)) if script != 'app.py' else None
+        best['budget'] = budget
+        best['within_budget'] = best['status'] == 'ok' and best['first_loop'] <= budget
+        results['entry_points'][script] = best
+    return results
+
+def print_report(results):
+    print(f"🐍 Interpréteur seul : {results['interpreter']:.2f}s")
+    for script, r in results['entry_points'].items():
+        icon = "✅" if r['within_budget'] else "❌"
+        if r['status'] != 'ok':
+            print(f"{icon} {script:<16} {r['status']} : {r.get('error', '')}")
+            continue
+        help_txt = f"--help {r['help']:.2f}s | " if r['help'] is not None else ""
+        heavy = ", ".join(r['heavy']) or "aucun"
+        print(f"{icon} {script:<16} {help_txt}1re boucle {r['first_loop']:.2f}s (budget {r['budget']:.1f}s) | modules lourds : {heavy}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scripts", nargs="*", default=list(ENTRY_POINTS), help="Points d'entrée à mesurer")
+    parser.add_argument("--repeat", type=int, default=3, help="Nombre de mesures (on garde la meilleure)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplicateur des budgets (machine lente / CI)")
+    parser.add_argument("--json", type=str, help="Fichier de sortie JSON")
+    args = parser.parse_args()
+
+    results = run(args.scripts, repeat=args.repeat, scale=args.scale)
+    print_report(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    sys.exit(0 if all(r['within_budget'] for r in results['entry_points'].values()) else 1)
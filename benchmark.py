@@ -0,0 +1,264 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import profiling
+
+# ==========================================
+# BENCHMARKS DES CHEMINS CRITIQUES (HORS LIGNE)
+# ==========================================
+# Données synthétiques reproductibles (synthetic.py), aucun appel réseau.
+# Scénarios : indicateurs (batch / incrémental), recalcul par poll, signaux, backtests, balayage de paramètres, walk-forward, portefeuille.
+# Résultats en JSON ; --baseline compare à un run précédent et échoue au-delà du seuil de régression.
+#
+#   python benchmark.py --sizes 1000,100000 --json bench.json
+#   python benchmark.py --baseline bench.json --threshold 0.2
+
+DEFAULT_SIZES = (1_000, 100_000)
+WINDOW = 100 # Fenêtre des anciens get_data() (limit=100)
+POLLS = 1_000
+
+
+# --- SCÉNARIOS ---
+# Chaque scénario reçoit (bars, df) et renvoie une fonction sans argument à chronométrer.
+# `max_size` borne les scénarios trop lents sur 10M bougies ; `fixed` = indépendant de la taille.
+
+def indicators_batch(bars, df):
+    from indicators import ema, rsi, atr
+    high, low, close = bars['high'], bars['low'], bars['close']
+
+    def run():
+        ema(close, 9), ema(close, 21), rsi(close, 14), atr(high, low, close, 14)
+    return run
+
+def indicators_streaming(bars, df):
+    from indicators import StreamingIndicators
+    rows = list(zip(bars['high'].tolist(), bars['low'].tolist(), bars['close'].tolist()))
+
+    def run():
+        ind = StreamingIndicators()
+        for h, l, c in rows:
+            ind.update(h, l, c)
+    return run
+
+def poll_window(bars, df):
+    """Ancien get_data() : recalcul complet des indicateurs sur la fenêtre à chaque poll"""
+    from indicators import ema, rsi, atr
+    high, low, close = bars['high'], bars['low'], bars['close']
+
+    def run():
+        for i in range(WINDOW, WINDOW + POLLS):
+            h, l, c = high[i - WINDOW:i], low[i - WINDOW:i], close[i - WINDOW:i]
+            ema(c, 9), ema(c, 21), rsi(c, 14), atr(h, l, c, 14)
+    return run
+
+def poll_streaming(bars, df):
+    """get_data() actuel : une bougie intégrée par poll"""
+    from indicators import StreamingIndicators
+    rows = list(zip(bars['high'].tolist(), bars['low'].tolist(), bars['close'].tolist()))
+    ind = StreamingIndicators()
+    for h, l, c in rows[:WINDOW]:
+        ind.update(h, l, c)
+    pending = rows[WINDOW:WINDOW + POLLS]
+
+    def run():
+        state = StreamingIndicators()
+        state.__dict__.update(ind.__dict__)
+        for h, l, c in pending:
+            state.update(h, l, c)
+    return run
+
+def signals_vector(bars, df):
+    from strategy import compute
+    h, l, c = bars['high'], bars['low'], bars['close']
+    return lambda: compute(h, l, c)
+
+def signals_streaming(bars, df):
+    from strategy import SignalKernel
+    rows = list(zip(bars['high'].tolist(), bars['low'].tolist(), bars['close'].tolist()))
+
+    def run():
+        kernel = SignalKernel()
+        for h, l, c in rows:
+            kernel.update(h, l, c)
+    return run
+
+def backtest_simulate(bars, df):
+    from vector_engine import compute_indicators, simulate, quick_stats
+    o, h, l, c = bars['open'], bars['high'], bars['low'], bars['close']
+    indicators = compute_indicators(o, h, l, c)
+
+    def run():
+        equity, trades, _ = simulate(o, h, l, c, indicators)
+        quick_stats(equity, trades)
+    return run
+
+def backtest_vector(bars, df):
+    from engine import TradingEngine
+    engine = TradingEngine("BENCH")
+    return lambda: engine.run_backtest(df, mode="vector")
+
+def backtest_backtesting(bars, df):
+    from engine import TradingEngine
+    engine = TradingEngine("BENCH")
+    return lambda: engine.run_backtest(df)
+
+def parameter_sweep(bars, df):
+    from engine import TradingEngine
+    engine = TradingEngine("BENCH")
+    grid = {'atr_mult': [1.5, 2.0, 2.5], 'fast_len': [5, 9, 12], 'tp_mult': [2.0, 2.6]}
+    return lambda: engine.optimize(df, grid, processes=2)
+
+def walk_forward(bars, df):
+    from engine import TradingEngine
+    engine = TradingEngine("BENCH")
+    grid = {'atr_mult': [1.5, 2.0, 2.5], 'fast_len': [5, 9, 12]}
+    # 4 folds d'entraînement glissants + tests
+    train = max(2, len(df) // 3)
+    return lambda: engine.walk_forward(df, grid, train=train, test=max(1, train // 2), processes=2)
+
+def portfolio_backtest(bars, df):
+    from portfolio import run_portfolio_backtest
+    # 10 symboles décalés (même taille que le scénario), une seule passe
+    frames = {f"S{k}": df.iloc[k * 7:] for k in range(10)}
+    return lambda: run_portfolio_backtest(frames)
+
+SCENARIOS = {
+    'indicators_batch': {'fn': indicators_batch},
+    'indicators_streaming': {'fn': indicators_streaming, 'max_size': 1_000_000},
+    'poll_window': {'fn': poll_window, 'fixed': True},
+    'poll_streaming': {'fn': poll_streaming, 'fixed': True},
+    'signals_vector': {'fn': signals_vector},
+    'signals_streaming': {'fn': signals_streaming, 'max_size': 1_000_000},
+    'backtest_simulate': {'fn': backtest_simulate},
+    'backtest_vector': {'fn': backtest_vector, 'max_size': 1_000_000},
+    'backtest_backtesting': {'fn': backtest_backtesting, 'max_size': 100_000},
+    'parameter_sweep': {'fn': parameter_sweep, 'max_size': 1_000_000},
+    'walk_forward': {'fn': walk_forward, 'max_size': 1_000_000},
+    'portfolio_backtest': {'fn': portfolio_backtest, 'max_size': 1_000_000},
+}
+
+
+# --- EXÉCUTION ---
+def time_call(fn, repeat):
+    fn() # Échauffement (imports, caches)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def _metadata(seed):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit, 'python': platform.python_version(), 'numpy': np.__version__,
+        'machine': platform.machine(), 'processor': platform.processor(), 'seed': seed,
+    }
+
+def run(scenarios, sizes, repeat=3, seed=42, profiler=None):
+    from synthetic import generate_bars, generate_ohlcv
+    results = {}
+    fixed_done = set()
+    for n in sizes:
+        # Les scénarios de poll ont besoin d'au moins WINDOW + POLLS bougies
+        bars = generate_bars(max(n, WINDOW + POLLS), seed=seed)
+        df = generate_ohlcv(n, seed=seed)
+        for name in scenarios:
+            spec = SCENARIOS[name]
+            if spec.get('fixed'):
+                if name in fixed_done:
+                    continue
+                fixed_done.add(name)
+                key = name
+            else:
+                if n > spec.get('max_size', n):
+                    continue
+                key = f"{name}/{n}"
+            try:
+                fn = spec['fn'](_slice(bars, None if spec.get('fixed') else n), df)
+                timings = time_call(fn, repeat)
+                if profiler:
+                    # Passe supplémentaire profilée, hors chronométrage
+                    with profiler.session(key.replace("/", "_")):
+                        fn()
+            except ImportError as e:
+                results[key] = {'skipped': f"dépendance absente : {e.name}"}
+                print(f"⏭️  {key:<32} ignoré ({e.name} absent)")
+                continue
+            results[key] = {'median': statistics.median(timings), 'min': min(timings), 'repeat': repeat,
+                            'bars': None if spec.get('fixed') else n}
+            print(f"⏱️  {key:<32} médiane {results[key]['median'] * 1000:10.2f} ms | min {results[key]['min'] * 1000:10.2f} ms")
+    return {'meta': _metadata(seed), 'results': results}
+
+def _slice(bars, n):
+    if n is None:
+        return bars
+    return {k: v[:n] for k, v in bars.items()}
+
+def compare(current, baseline, threshold):
+    """Renvoie la liste des régressions (médiane > baseline x (1 + seuil))"""
+    regressions = []
+    print(f"\n📊 Comparaison avec la référence ({baseline['meta'].get('commit')}, seuil {threshold:.0%})")
+    for key, result in current['results'].items():
+        ref = baseline['results'].get(key)
+        if 'median' not in result or not ref or 'median' not in ref:
+            continue
+        ratio = result['median'] / ref['median']
+        icon = "❌" if ratio > 1 + threshold else ("🚀" if ratio < 1 - threshold else "✅")
+        print(f"{icon} {key:<32} x{ratio:.2f} ({ref['median'] * 1000:.2f} ms -> {result['median'] * 1000:.2f} ms)")
+        if ratio > 1 + threshold:
+            regressions.append(key)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", type=str, default=",".join(SCENARIOS), help="Scénarios séparés par des virgules")
+    parser.add_argument("--sizes", type=str, default=",".join(map(str, DEFAULT_SIZES)), help="Tailles (bougies), ex : 1000,100000,10000000")
+    parser.add_argument("--repeat", type=int, default=3, help="Mesures par scénario (médiane retenue)")
+    parser.add_argument("--seed", type=int, default=42, help="Graine du générateur synthétique")
+    parser.add_argument("--json", type=str, help="Fichier de sortie JSON")
+    parser.add_argument("--baseline", type=str, help="JSON de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Régression tolérée (0.2 = +20%%)")
+    parser.add_argument("--parity", action="store_true", help="Vérifier d'abord la parité batch / incrémental du noyau de stratégie")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.parity:
+        from synthetic import generate_bars
+        from strategy import check_parity
+        bars = generate_bars(50_000, seed=args.seed)
+        parity = check_parity(bars['high'], bars['low'], bars['close'])
+        icon = "✅" if parity['ok'] else "❌"
+        print(f"{icon} Parité batch / incrémental sur {parity['bars']} bougies : "
+              f"écart max {parity['max_error']:.1e}, {parity['signal_mismatches']} signal(s) différent(s)")
+        if not parity['ok']:
+            sys.exit(1)
+
+    names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Scénarios inconnus : {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    current = run(names, sizes, repeat=args.repeat, seed=args.seed, profiler=profiling.from_args(args, "benchmark"))
+    if args.json:
+        Path(args.json).write_text(json.dumps(current, indent=2))
+        print(f"💾 Résultats enregistrés dans {args.json}")
+    if args.baseline:
+        regressions = compare(current, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) : {', '.join(regressions)}")
+            sys.exit(1)
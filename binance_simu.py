@@ -1,22 +1,43 @@
-import ccxt
-import pandas_ta as ta
-import pandas as pd
-import time
 import argparse
+import tempfile
+import time
 import sys
 from datetime import datetime
+from strategy import SignalKernel, LONG, SHORT
+from ohlcv_cache import OHLCVCache, hlc, timeframe_ms
+from replay import run_paper_bot
+from state import BotState, state_name, resume_indicators
+from metrics import metrics
+import datahub
+import profiling
 
 # --- CONFIGURATION ---
 parser = argparse.ArgumentParser()
-parser.add_argument("--symbol", type=str, default="BTC/USDT", help="Paire (ex: BTC/USDT)")
+parser.add_argument("--symbol", type=str, default="BTC/USDT", help="Paire (ex: BTC/USDT) ; en rejeu, plusieurs paires séparées par des virgules")
 parser.add_argument("--amount", type=float, default=0.001, help="Quantité fictive à trader")
+parser.add_argument("--settle", type=float, default=2.0, help="Secondes d'attente après la clôture d'une bougie")
+parser.add_argument("--intrabar", type=float, default=0, help="Évaluation de la bougie en cours toutes les N secondes (0 = désactivé)")
+parser.add_argument("--stream", type=str, choices=["kline", "trades", "file", "socket"], help="Bougies poussées (websocket / rejeu) au lieu du polling REST")
+parser.add_argument("--stream-path", type=str, help="Fichier JSONL (--stream file) ou hôte:port (--stream socket)")
+parser.add_argument("--replay", nargs="?", const="cache", help="Rejeu accéléré de l'historique : 'cache' (cache local, défaut) ou fichier JSONL enregistré")
+parser.add_argument("--speed", type=float, default=0, help="Rejeu : accélération (0 = maximum, 3600 = une bougie 1h par seconde)")
+parser.add_argument("--since", type=str, help="Rejeu : date de début (AAAA-MM-JJ, UTC)")
+parser.add_argument("--until", type=str, help="Rejeu : date de fin exclue (AAAA-MM-JJ, UTC)")
+parser.add_argument("--fresh", action="store_true", help="Ignorer l'état sauvegardé (portefeuille neuf, indicateurs recalculés)")
+parser.add_argument("--metrics-port", type=int, default=0, help="Port local des mesures de latence au format Prometheus (0 = désactivé)")
+datahub.add_arguments(parser)
+profiling.add_arguments(parser)
 args = parser.parse_args()
 
-SYMBOL = args.symbol
+# Imports lourds après les arguments : --help et les erreurs de saisie sont instantanés
+import ccxt
+
+SYMBOL = args.symbol.split(",")[0]
 AMOUNT = args.amount
 TIMEFRAME = '1h'
 
 # --- PORTEFEUILLE VIRTUEL (C'est ici que l'argent existe) ---
+# Sauvegardé dans bot_state/ : un redémarrage reprend le solde (--fresh pour repartir à 1000)
 wallet = {
     'USDT': 1000.0,  # On commence avec 1000$ fictifs
     'CRYPTO': 0.0    # 0 BTC
@@ -25,81 +46,145 @@ wallet = {
 # --- CONNEXION PUBLIQUE (Pas de clés !) ---
 try:
     # On initialise sans API Key ni Secret => Mode Lecture Seule Public
-    exchange = ccxt.binance({'enableRateLimit': True})
+    exchange = datahub.connect_ccxt('binance') # $BINANCE_API_URL : faux exchange local (mock_exchange.py)
     print(f"✅ Connecté au flux public Binance ({SYMBOL})")
 except Exception as e:
     print(f"❌ Erreur connexion : {e}")
     sys.exit()
 
 # Stratégie ENGINE
-EMA_FAST = 9
-EMA_SLOW = 21
-RSI_LEN = 14
+# Noyau de stratégie commun (strategy.py) : indicateurs incrémentaux, seules les nouvelles bougies clôturées sont calculées
+kernel = SignalKernel()
+indicators = kernel.indicators
+# Cache local partagé : seules les bougies postérieures au cache sont téléchargées
+# Flux hors ligne (fichier / socket) : cache temporaire pour ne pas mélanger avec les vraies données
+offline_stream = args.stream in ("file", "socket") and not args.replay
+cache = OHLCVCache(tempfile.mkdtemp(prefix="stream_")) if offline_stream else OHLCVCache()
+# Téléchargements via le hub de données partagé (--hub) : un seul appel par clôture pour tous les bots
+feed = datahub.DataFeed(cache, args.hub)
 
-def get_data():
+# --- REPRISE À CHAUD ---
+# Portefeuille + état des indicateurs relus en quelques ms : seules les bougies clôturées depuis l'arrêt sont intégrées.
+# Pas de sauvegarde en rejeu (historique ou flux hors ligne) : l'état du live n'est pas touché.
+store = None
+if not args.replay and args.stream not in ("file", "socket"):
+    store = BotState(state_name("binance_simu", SYMBOL))
+    snapshot = None if args.fresh else store.load()
+    if snapshot:
+        wallet.update(snapshot['wallet'])
+        # Indicateurs repris seulement si le cache couvre l'arrêt (sinon chauffe sur les 100 bougies du démarrage à froid)
+        warm = resume_indicators(indicators, snapshot, cache, exchange.id, SYMBOL, TIMEFRAME, warmup=100)
+        print(f"♻️ Reprise de l'état sauvegardé : {wallet['USDT']:.2f} USDT + {wallet['CRYPTO']} {SYMBOL}"
+              f"{'' if warm else ' (indicateurs recalculés)'}")
+
+def save_state():
+    """Instantané après chaque décision (écrit en arrière-plan)"""
+    if store:
+        store.save({'wallet': dict(wallet), 'indicators': indicators.state()})
+
+def journal(event, **fields):
+    if store:
+        store.record(event, symbol=SYMBOL, **fields)
+
+def get_data(intrabar=False, need=None):
     try:
         # fetch_ohlcv est public, pas besoin de compte
-        ohlcv = exchange.fetch_ohlcv(SYMBOL, TIMEFRAME, limit=100)
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['close'] = df['close'].astype(float)
-        
-        # Indicateurs
-        df['EMA_Fast'] = ta.ema(df['close'], length=EMA_FAST)
-        df['EMA_Slow'] = ta.ema(df['close'], length=EMA_SLOW)
-        df['RSI'] = ta.rsi(df['close'], length=RSI_LEN)
-        
-        df.dropna(inplace=True)
-        return df
+        # En mode flux, les bougies clôturées sont déjà poussées dans le cache (on_bar)
+        with metrics.timer('fetch'):
+            forming = None if args.stream else feed.update_ccxt(exchange, SYMBOL, TIMEFRAME, limit=100, need=need)
+        with metrics.timer('parse'):
+            # Anneau partagé du hub si à jour ; en mode flux, les bougies poussées ne sont que dans le cache
+            closed = (cache if args.stream else feed).window(exchange.id, SYMBOL, TIMEFRAME, after=indicators.last_timestamp)
+        # À la clôture on évalue la bougie clôturée ; en mode intrabar, la bougie en cours
+        with metrics.timer('indicators'):
+            return indicators.feed(closed, hlc(forming) if intrabar else None)
     except Exception as e:
         print(f"⚠️ Erreur Data : {e}")
         return None
 
+if args.metrics_port:
+    metrics.serve(args.metrics_port, bot="binance_simu", symbol=SYMBOL)
+
 # --- BOUCLE DE TRADING ---
 print(f"🤖 Bot Simulation Démarré | Solde Initial : {wallet['USDT']} USDT")
 
-while True:
+def act(last, now):
+    """Signal et ordres sur le portefeuille virtuel ; `now` = heure affichée dans le journal"""
+    price = last['close']
+    ema_f = last['EMA_Fast']
+    ema_s = last['EMA_Slow']
+    rsi = last['RSI']
+    with metrics.timer('decision'):
+        direction, _, _ = kernel.evaluate(last)
+
+    # Calcul de la valeur totale (Cash + Crypto convertie au prix actuel)
+    valeur_totale = wallet['USDT'] + (wallet['CRYPTO'] * price)
+
+    in_pos = wallet['CRYPTO'] > 0
+    state = "🟢 EN POS" if in_pos else "⚪ CASH"
+
+    print(f"[{now}] {SYMBOL}:{price:.2f}$ | RSI:{rsi:.1f} | Wallet:{valeur_totale:.2f}$ ({state})")
+
+    # --- LOGIQUE D'ACHAT (SIMULÉE) ---
+    if direction == LONG:
+        if not in_pos:
+            cout = price * AMOUNT
+            if wallet['USDT'] >= cout:
+                print("🚀 SIGNAL D'ACHAT !")
+                wallet['USDT'] -= cout
+                wallet['CRYPTO'] += AMOUNT
+                journal('buy', price=price, qty=AMOUNT, usdt=wallet['USDT'])
+                print(f"✅ Acheté {AMOUNT} {SYMBOL} à {price}$")
+            else:
+                print("❌ Fonds insuffisants (Virtuels).")
+
+    # --- LOGIQUE DE VENTE (SIMULÉE) ---
+    elif direction == SHORT:
+        if in_pos:
+            print("📉 SIGNAL DE VENTE !")
+            gain = price * wallet['CRYPTO']
+            wallet['USDT'] += gain
+            journal('sell', price=price, qty=wallet['CRYPTO'], usdt=wallet['USDT'])
+            wallet['CRYPTO'] = 0
+            print(f"✅ Tout vendu à {price}$")
+            print(f"💰 Nouveau Solde : {wallet['USDT']:.2f} USDT")
+
+    save_state()
+
+
+def tick(expected):
+    """
+    Une itération : données, signal, ordres.
+    expected = ouverture (ms) de la bougie qui vient de clôturer, ou None en mode intrabar.
+    Renvoie False si cette bougie n'est pas encore publiée (le planificateur réessaie).
+    """
     try:
-        df = get_data()
-        
-        if df is not None:
-            last = df.iloc[-1]
-            price = last['close']
-            ema_f = last['EMA_Fast']
-            ema_s = last['EMA_Slow']
-            rsi = last['RSI']
-
-            # Calcul de la valeur totale (Cash + Crypto convertie au prix actuel)
-            valeur_totale = wallet['USDT'] + (wallet['CRYPTO'] * price)
-            
-            in_pos = wallet['CRYPTO'] > 0
-            state = "🟢 EN POS" if in_pos else "⚪ CASH"
-            now = datetime.now().strftime('%H:%M')
-
-            print(f"[{now}] {SYMBOL}:{price:.2f}$ | RSI:{rsi:.1f} | Wallet:{valeur_totale:.2f}$ ({state})")
-
-            # --- LOGIQUE D'ACHAT (SIMULÉE) ---
-            if ema_f > ema_s and rsi > 50:
-                if not in_pos:
-                    cout = price * AMOUNT
-                    if wallet['USDT'] >= cout:
-                        print("🚀 SIGNAL D'ACHAT !")
-                        wallet['USDT'] -= cout
-                        wallet['CRYPTO'] += AMOUNT
-                        print(f"✅ Acheté {AMOUNT} {SYMBOL} à {price}$")
-                    else:
-                        print("❌ Fonds insuffisants (Virtuels).")
-
-            # --- LOGIQUE DE VENTE (SIMULÉE) ---
-            elif ema_f < ema_s and rsi < 50:
-                if in_pos:
-                    print("📉 SIGNAL DE VENTE !")
-                    gain = price * wallet['CRYPTO']
-                    wallet['USDT'] += gain
-                    wallet['CRYPTO'] = 0
-                    print(f"✅ Tout vendu à {price}$")
-                    print(f"💰 Nouveau Solde : {wallet['USDT']:.2f} USDT")
+        last = get_data(intrabar=expected is None, need=expected)
+        if expected is not None and (indicators.last_timestamp or 0) < expected:
+            return False
+
+        if last is not None:
+            if expected is not None:
+                metrics.observe('bot_bar_close_to_decision_seconds', time.time() - (expected + timeframe_ms(TIMEFRAME)) / 1000)
+            act(last, datetime.now().strftime('%H:%M'))
 
     except Exception as e:
         print(f"⚠️ Erreur : {e}")
+    return True
+
+# Profilage à la demande (--profile) : une itération sur --profile-every, rapport + fichier dans profiles/
+profiler = profiling.from_args(args, "binance_simu")
+if profiler:
+    tick = profiler.wrap(tick)
+
+def reset(symbol):
+    """Rejeu : portefeuille et noyau neufs pour la paire `symbol` -> ses indicateurs"""
+    global SYMBOL, kernel, indicators
+    SYMBOL = symbol
+    wallet['USDT'], wallet['CRYPTO'] = 1000.0, 0.0
+    kernel = SignalKernel()
+    indicators = kernel.indicators
+    return indicators
 
-    time.sleep(60)
\ No newline at end of file
+# Rejeu (--replay), flux poussé (--stream) ou réveil à chaque clôture : aiguillage commun (replay.py)
+run_paper_bot(args, exchange, cache, feed, TIMEFRAME, indicators, tick, act, reset, wallet, profiler)
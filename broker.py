@@ -1,14 +1,142 @@
 import os
+import time
+import asyncio
+import threading
 from dotenv import load_dotenv
 import alpaca_trade_api as tradeapi
 import pandas as pd
+from metrics import metrics
+from execution import OrderPipeline
 from datetime import datetime, timedelta
 
 # Chargement des variables du fichier .env
 load_dotenv()
 
+def clean_symbol(symbol):
+    """BTC/USD -> BTCUSD (format des positions Alpaca)"""
+    return symbol.replace("/", "")
+
+
+class AccountCache:
+    """
+    Positions et compte en mémoire, mis à jour par les réponses d'ordres et le flux trade_updates.
+    - lecture O(1) par symbole, sans aller-retour API
+    - un symbole est invalidé après un ordre non encore exécuté : seule sa position est relue
+    - positions resynchronisées (un seul list_positions) toutes les `reconcile_every` secondes, à la lecture
+    - compte relu (get_account) seulement quand on le lit : après un ordre, ou au-delà de `reconcile_every` secondes
+    Un bot qui tourne une fois par bougie fait donc au plus un appel par tick, comme un get_position direct.
+    """
+
+    def __init__(self, api, reconcile_every=300, clock=time.monotonic):
+        self.api = api
+        self.reconcile_every = reconcile_every
+        self.clock = clock
+        self.positions = {}
+        self._account = None
+        self._dirty = set()
+        self._account_stale = True
+        self._synced_at = None
+        self._account_at = None
+        self._lock = threading.RLock()
+
+    # --- LECTURE ---
+    def position(self, symbol):
+        """Quantité détenue (+ long, - short, 0 sinon)"""
+        key = clean_symbol(symbol)
+        with self._lock:
+            self._maybe_reconcile()
+            if key in self._dirty:
+                self._refresh_symbol(key)
+            return self.positions.get(key, 0.0)
+
+    def account(self):
+        with self._lock:
+            if self._account_stale or self.clock() - self._account_at >= self.reconcile_every:
+                self._refresh_account()
+            return self._account
+
+    # --- MISES À JOUR ---
+    def reconcile(self):
+        """Resynchronisation complète avec le broker (positions + compte)"""
+        with self._lock:
+            self._reconcile_positions()
+            self._refresh_account()
+
+    def invalidate(self, symbol=None):
+        """Après un ordre : la position (ou tout, si symbol=None) sera relue au prochain accès"""
+        with self._lock:
+            if symbol is None:
+                self._synced_at = None
+            else:
+                self._dirty.add(clean_symbol(symbol))
+            self._account_stale = True
+
+    def apply_order(self, order):
+        """Réponse de submit_order : exécution immédiate appliquée, sinon invalidation du symbole"""
+        if order is None:
+            return
+        with self._lock:
+            filled = float(getattr(order, 'filled_qty', 0) or 0)
+            if getattr(order, 'status', None) == 'filled' and filled:
+                key = clean_symbol(order.symbol)
+                sign = 1 if order.side == 'buy' else -1
+                if key not in self._dirty:
+                    self.positions[key] = self.positions.get(key, 0.0) + sign * filled
+                self._account_stale = True
+            else:
+                self.invalidate(order.symbol)
+
+    def on_trade_update(self, data):
+        """Événement trade_updates (dict brut) : `position_qty` donne la position après exécution"""
+        if data.get('event') not in ('fill', 'partial_fill'):
+            return
+        key = clean_symbol(data['order']['symbol'])
+        with self._lock:
+            if data.get('position_qty') is not None:
+                self.positions[key] = float(data['position_qty'])
+                self._dirty.discard(key)
+            else:
+                self._dirty.add(key)
+            self._account_stale = True
+
+    def listen(self, key_id, secret_key, base_url):
+        """Abonnement au flux trade_updates dans un thread dédié (les fills arrivent sans polling)"""
+        from alpaca_trade_api.stream import TradingStream
+        stream = TradingStream(key_id, secret_key, base_url, raw_data=True)
+
+        async def handler(msg):
+            self.on_trade_update(msg.get('data', {}))
+
+        stream.subscribe_trade_updates(handler)
+        threading.Thread(target=lambda: asyncio.run(stream._run_forever()), name="trade_updates", daemon=True).start()
+        return stream
+
+    # --- INTERNE ---
+    def _maybe_reconcile(self):
+        if self._synced_at is None or self.clock() - self._synced_at >= self.reconcile_every:
+            self._reconcile_positions()
+
+    def _reconcile_positions(self):
+        self.positions = {p.symbol: float(p.qty) for p in self.api.list_positions()}
+        self._dirty.clear()
+        self._synced_at = self.clock()
+
+    def _refresh_account(self):
+        self._account = self.api.get_account()
+        self._account_stale = False
+        self._account_at = self.clock()
+
+    def _refresh_symbol(self, key):
+        try:
+            self.positions[key] = float(self.api.get_position(key).qty)
+        except Exception:
+            # Pas de position : l'API renvoie une erreur
+            self.positions.pop(key, None)
+        self._dirty.discard(key)
+
+
 class AlpacaBroker:
-    def __init__(self):
+    def __init__(self, net_reversal=False):
         # Récupération des clés
         self.api_key = os.getenv("ALPACA_API_KEY")
         self.secret_key = os.getenv("ALPACA_SECRET_KEY")
@@ -20,7 +148,11 @@ class AlpacaBroker:
         # Connexion à l'API
         try:
             self.api = tradeapi.REST(self.api_key, self.secret_key, self.base_url, api_version='v2')
-            account = self.api.get_account()
+            # Positions et compte en cache : plus d'appel get_position avant chaque ordre
+            self.cache = AccountCache(self.api)
+            # Ordres idempotents sur connexions poolées ; net_reversal : retournement en un seul ordre
+            self.orders = OrderPipeline(self.api, self.cache, bot="broker", net_reversal=net_reversal)
+            account = self.cache.account()
             print(f"✅ Broker Connecté ! Cash disponible : {account.cash}$")
         except Exception as e:
             print(f"❌ Erreur de connexion Alpaca : {e}")
@@ -29,7 +161,8 @@ class AlpacaBroker:
         """Récupère les données historiques pour les calculs"""
         try:
             # Pour les cryptos sur Alpaca
-            bars = self.api.get_crypto_bars(symbol, timeframe, limit=limit).df
+            with metrics.timer('fetch'):
+                bars = self.api.get_crypto_bars(symbol, timeframe, limit=limit).df
             if bars.empty:
                 return pd.DataFrame()
             
@@ -48,31 +181,19 @@ class AlpacaBroker:
     def get_position(self, symbol):
         """Vérifie si on a une position (Retourne la quantité, + ou -)"""
         try:
-            # Nettoyage du symbole (BTC/USD -> BTCUSD pour la vérif position)
-            clean_symbol = symbol.replace("/", "")
-            pos = self.api.get_position(clean_symbol)
-            return float(pos.qty)
-        except:
-            # Si pas de position, l'API renvoie une erreur, donc on retourne 0
+            with metrics.timer('position'):
+                return self.cache.position(symbol)
+        except Exception:
             return 0.0
 
     def submit_order(self, symbol, qty, side):
         """Envoie un ordre (achat ou vente)"""
         try:
-            # On ferme d'abord les positions inverses si nécessaire
+            # Position inverse : clôture puis ordre (ou un seul ordre net) ; position lue dans le cache
             current_pos = self.get_position(symbol)
-            if (side == 'buy' and current_pos < 0) or (side == 'sell' and current_pos > 0):
-                self.api.close_position(symbol.replace("/", ""))
+            order = self.orders.enter(symbol, side, qty, current=current_pos)
+            if current_pos * (1 if side == 'buy' else -1) < 0:
                 print("🔄 Position inverse fermée.")
-
-            # Envoi de l'ordre
-            order = self.api.submit_order(
-                symbol=symbol,
-                qty=qty,
-                side=side,
-                type='market',
-                time_in_force='gtc'
-            )
             print(f"✅ Ordre {side.upper()} exécuté pour {qty} {symbol}")
             return order
         except Exception as e:
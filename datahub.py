@@ -0,0 +1,463 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from ohlcv_cache import OHLCVCache
+from ringbuffer import DEFAULT_CAPACITY, BarRing, forming_row, hlc_rows, ring_name, ring_rows
+from strategy import SignalKernel
+from metrics import metrics
+
+# ==========================================
+# HUB DE DONNÉES DE MARCHÉ PARTAGÉ ENTRE LES BOTS
+# ==========================================
+# Un processus local possède les connexions aux exchanges (ccxt, Alpaca, Yahoo) et le limiteur de débit.
+# Les bots lui demandent "mets le cache à jour pour (source, symbole, timeframe)" sur un socket Unix
+# (une ligne JSON par requête, une ligne JSON par réponse) :
+# - les bougies clôturées sont écrites dans le cache partagé (data_cache/, fichiers memory-mapped),
+#   les bots les relisent directement sans copie ; la réponse ne porte que la bougie en cours
+# - requêtes identiques simultanées fusionnées : un seul appel à l'exchange, les autres attendent le résultat
+# - résultat réutilisé tant qu'il suffit (bougie attendue déjà en cache, ou appel de moins de `min_interval` s)
+# - seau à jetons PAR EXCHANGE, commun à tous les bots (un appel = un jeton, pages comprises)
+# - le hub est l'unique écrivain d'un anneau en mémoire partagée par flux (ringbuffer.py) : dernières bougies
+#   + indicateurs de la stratégie, relus sans verrou par les bots (DataFeed.window) et le dashboard
+# Dix bots sur BTC/USDT 1h = un seul appel par clôture, comme un seul bot.
+# Hub absent ou arrêté : DataFeed retombe sur le téléchargement direct (comportement historique).
+#
+#   python datahub.py                          # lance le hub (socket : $DATAHUB_SOCKET ou /tmp/trading_datahub.sock)
+#   python local_bot.py --hub                  # le bot passe par le hub
+#   python datahub.py --stats                  # appels réels / requêtes servies par flux
+
+DEFAULT_SOCKET = Path(os.getenv("DATAHUB_SOCKET", Path(tempfile.gettempdir()) / "trading_datahub.sock"))
+
+# Débit maximum par exchange : (jetons par seconde, rafale)
+RATE_LIMITS = {'binance': (10.0, 20), 'alpaca': (3.0, 5), 'yfinance': (1.0, 2)}
+DEFAULT_RATE = (5.0, 10)
+
+
+def connect_ccxt(source):
+    """
+    Client ccxt public (pas de clé). $<SOURCE>_API_URL (ex : BINANCE_API_URL) le redirige vers un serveur
+    compatible, comme le faux exchange local (mock_exchange.py) : tests de charge sans réseau.
+    """
+    import ccxt
+    exchange = getattr(ccxt, source)({'enableRateLimit': True})
+    url = os.getenv(f"{source.upper()}_API_URL")
+    if url:
+        # Données spot uniquement (le faux exchange ne publie pas les marchés futures)
+        for name in exchange.urls['api']:
+            if isinstance(exchange.urls['api'][name], str):
+                exchange.urls['api'][name] = url.rstrip('/') + "/api/v3"
+        exchange.options['fetchMarkets'] = {**exchange.options.get('fetchMarkets', {}), 'types': ['spot']}
+    return exchange
+
+
+class TokenBucket:
+    """Seau à jetons thread-safe : acquire() bloque jusqu'à ce qu'un jeton soit disponible"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Prend un jeton ; renvoie le temps d'attente (s)"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def try_acquire(self):
+        """Prend un jeton s'il y en a un, sans attendre (serveur qui répond 429)"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class _Throttled:
+    """Client d'exchange dont chaque appel de méthode consomme un jeton du seau"""
+
+    def __init__(self, client, source, bucket):
+        self._client = client
+        self._source = source
+        self._bucket = bucket
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr # ex : exchange.id
+
+        def call(*args, **kwargs):
+            metrics.observe('hub_throttle_wait_seconds', self._bucket.acquire(), source=self._source)
+            metrics.inc('hub_exchange_calls_total', source=self._source)
+            return attr(*args, **kwargs)
+        return call
+
+
+class _Feed:
+    """État d'un flux (source, symbole, timeframe) : dernier appel réel et bougie en cours"""
+
+    def __init__(self):
+        self.lock = threading.Lock() # Tenu pendant l'appel : les requêtes identiques attendent son résultat
+        self.fetched_at = float('-inf')
+        self.forming = None
+        self.fetches = 0
+        self.served = 0
+        self.ring = None # Anneau partagé, créé à la première requête
+        self.indicators = None
+
+
+class DataHub:
+    def __init__(self, cache=None, min_interval=1.0, max_age=5.0, rates=None, ring_capacity=DEFAULT_CAPACITY):
+        self.cache = cache or OHLCVCache()
+        self.ring_capacity = ring_capacity
+        self.min_interval = min_interval
+        self.max_age = max_age
+        self.rates = {**RATE_LIMITS, **(rates or {})}
+        self.buckets = {}
+        self.clients = {}
+        self.feeds = {}
+        self.lock = threading.Lock()
+
+    # --- CONNEXIONS (créées une seule fois, au premier besoin) ---
+    def bucket(self, source):
+        with self.lock:
+            if source not in self.buckets:
+                self.buckets[source] = TokenBucket(*self.rates.get(source, DEFAULT_RATE))
+            return self.buckets[source]
+
+    def client(self, source):
+        with self.lock:
+            client = self.clients.get(source)
+        if client is None:
+            client = _Throttled(self._connect(source), source, self.bucket(source))
+            with self.lock:
+                client = self.clients.setdefault(source, client)
+        return client
+
+    @staticmethod
+    def _connect(source):
+        if source == 'alpaca':
+            import alpaca_trade_api as tradeapi
+            from dotenv import load_dotenv
+            load_dotenv(dotenv_path=Path(__file__).parent / '.env')
+            return tradeapi.REST(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"),
+                                 os.getenv("ALPACA_BASE_URL", "https://paper-api.alpaca.markets"), api_version='v2')
+        return connect_ccxt(source)
+
+    def _feed(self, key):
+        with self.lock:
+            if key not in self.feeds:
+                self.feeds[key] = _Feed()
+            return self.feeds[key]
+
+    # --- REQUÊTES ---
+    def update(self, source, symbol, timeframe, need=None, **params):
+        """
+        Met le cache à jour pour un flux, au plus un appel réel à la fois et par intervalle.
+        `need` : ouverture (ms) de la bougie clôturée attendue ; déjà en cache => aucun appel.
+        Renvoie (bougie en cours ou None, dernier horodatage en cache, appel réel effectué ?).
+        """
+        key = (source, symbol, timeframe)
+        feed = self._feed(key)
+        with feed.lock:
+            age = time.monotonic() - feed.fetched_at
+            last = self.cache.last_timestamp(source, symbol, timeframe)
+            if need is not None:
+                fresh = age < self.min_interval or (last is not None and last >= need)
+            else:
+                fresh = age < self.max_age
+            if not fresh:
+                with metrics.timer('fetch'):
+                    feed.forming = self._fetch(source, symbol, timeframe, params)
+                feed.fetched_at = time.monotonic()
+                feed.fetches += 1
+                last = self.cache.last_timestamp(source, symbol, timeframe)
+            feed.served += 1
+            metrics.inc('hub_requests_total', source=source, result='shared' if fresh else 'fetched')
+            # Publié même sans appel : un autre processus a pu compléter le cache
+            self._publish(key, feed)
+            return feed.forming, last, not fresh
+
+    def _publish(self, key, feed):
+        """Recopie dans l'anneau du flux les bougies clôturées absentes (indicateurs inclus) et la bougie en cours"""
+        if feed.ring is None:
+            feed.ring = BarRing(ring_name(*key), self.ring_capacity, create=True)
+            feed.indicators = SignalKernel().indicators
+        indicators = feed.indicators
+        rows = ring_rows(self.cache.rows_after(*key, indicators.last_timestamp), indicators)
+        forming = feed.forming
+        if forming is not None and indicators.last_timestamp is not None and forming[0] <= indicators.last_timestamp:
+            forming = None # Bougie en cours périmée : elle est déjà clôturée dans le cache
+        feed.ring.append(rows, None if forming is None else forming_row(forming, indicators))
+
+    def _fetch(self, source, symbol, timeframe, params):
+        if source == 'yfinance':
+            # yf.download n'a pas de client : un jeton par téléchargement
+            metrics.observe('hub_throttle_wait_seconds', self.bucket(source).acquire(), source=source)
+            metrics.inc('hub_exchange_calls_total', source=source)
+            return self.cache.update_yfinance(symbol, interval=timeframe, period=params.get('period', '60d'))
+        client = self.client(source)
+        if source == 'alpaca':
+            return self.cache.update_alpaca(client, symbol, timeframe, limit=params.get('limit', 200))
+        return self.cache.update_ccxt(client, symbol, timeframe, limit=params.get('limit', 1000))
+
+    def close(self):
+        """Détruit les anneaux partagés"""
+        with self.lock:
+            feeds = list(self.feeds.values())
+        for feed in feeds:
+            if feed.ring is not None:
+                feed.ring.close()
+                feed.ring = None
+
+    def stats(self):
+        with self.lock:
+            feeds = list(self.feeds.items())
+        return [{'source': s, 'symbol': sym, 'timeframe': tf, 'fetches': f.fetches, 'served': f.served}
+                for (s, sym, tf), f in sorted(feeds)]
+
+    def handle(self, request):
+        """Requête JSON (dict) -> réponse JSON (dict) ; les erreurs de l'exchange sont renvoyées au bot"""
+        op = request.get('op', 'update')
+        try:
+            if op == 'ping':
+                return {'ok': True}
+            if op == 'stats':
+                return {'feeds': self.stats()}
+            if op != 'update':
+                return {'error': f"opération inconnue : {op}"}
+            params = {k: v for k, v in request.items() if k in ('limit', 'period')}
+            forming, last, fetched = self.update(request['source'], request['symbol'], request['timeframe'],
+                                                 need=request.get('need'), **params)
+            return {'forming': list(forming) if forming else None, 'last': last, 'fetched': fetched}
+        except Exception as e:
+            return {'error': f"{type(e).__name__}: {e}"}
+
+    # --- SERVEUR (socket Unix, un thread par bot connecté) ---
+    def serve(self, path=DEFAULT_SOCKET):
+        path = Path(path)
+        if ping(path):
+            raise RuntimeError(f"❌ Un hub répond déjà sur {path}")
+        path.unlink(missing_ok=True) # Socket orphelin d'un hub arrêté brutalement
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(path))
+        server.listen(64)
+        print(f"🛰️ Hub de données en écoute sur {path}")
+        try:
+            while True:
+                conn, _ = server.accept()
+                threading.Thread(target=self._client_loop, args=(conn,), name="hub-client", daemon=True).start()
+        finally:
+            server.close()
+            path.unlink(missing_ok=True)
+            self.close()
+
+    def _client_loop(self, conn):
+        with conn, conn.makefile('rb') as reader:
+            for line in reader:
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    reply = {'error': "requête JSON invalide"}
+                else:
+                    reply = self.handle(request)
+                try:
+                    conn.sendall(json.dumps(reply, separators=(',', ':')).encode() + b"\n")
+                except OSError:
+                    return # Bot arrêté
+
+
+# ==========================================
+# CÔTÉ BOT
+# ==========================================
+
+def _ask(path, request, timeout=5.0):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(str(path))
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile('rb') as reader:
+            return json.loads(reader.readline())
+
+
+def ping(path=DEFAULT_SOCKET):
+    """True si un hub répond sur `path`"""
+    try:
+        return _ask(path, {'op': 'ping'}, timeout=1.0).get('ok', False)
+    except (OSError, ValueError):
+        return False
+
+
+def ensure_hub(path=DEFAULT_SOCKET, timeout=10.0):
+    """Lance le hub en arrière-plan s'il ne répond pas encore (dashboard). Renvoie le processus lancé ou None."""
+    if ping(path):
+        return None
+    process = subprocess.Popen([sys.executable, str(Path(__file__)), "--socket", str(path)], start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        if ping(path):
+            return process
+        time.sleep(0.1)
+    raise RuntimeError(f"❌ Le hub de données n'a pas démarré sur {path}")
+
+
+class DataFeed:
+    """
+    Mêmes méthodes que OHLCVCache.update_* (plus `need`) : via le hub si `hub` est donné, sinon en direct.
+    Hub injoignable : avertissement puis téléchargement direct, le hub est retenté à l'appel suivant.
+    window() lit les bougies dans l'anneau partagé du hub quand il est à jour, sinon dans le cache.
+    """
+
+    def __init__(self, cache, hub=None, timeout=60.0):
+        self.cache = cache
+        self.hub = Path(hub) if hub else None
+        self.timeout = timeout
+        self.sock = None
+        self.reader = None
+        self.warned = False
+        self.rings = {}
+        self.latest = {} # Flux -> dernière bougie clôturée annoncée par le hub
+
+    def _request(self, request):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(self.timeout)
+            try:
+                self.sock.connect(str(self.hub))
+            except OSError:
+                self._disconnect()
+                raise
+            self.reader = self.sock.makefile('rb')
+        try:
+            self.sock.sendall(json.dumps(request).encode() + b"\n")
+            line = self.reader.readline()
+            if not line:
+                raise ConnectionError("hub arrêté")
+            return json.loads(line)
+        except OSError:
+            self._disconnect()
+            raise
+
+    def _via_hub(self, request, direct):
+        if self.hub:
+            try:
+                reply = self._request(request)
+            except OSError as e:
+                self.latest.clear() # Plus de hub : les anneaux ne sont plus tenus à jour
+                if not self.warned:
+                    print(f"⚠️ Hub de données injoignable ({e}) : téléchargement direct")
+                    self.warned = True
+            else:
+                self.warned = False
+                if 'error' in reply:
+                    raise RuntimeError(f"hub : {reply['error']}")
+                self.latest[(request['source'], request['symbol'], request['timeframe'])] = reply['last']
+                return tuple(reply['forming']) if reply['forming'] else None
+        return direct()
+
+    def update_ccxt(self, exchange, symbol, timeframe='1h', limit=1000, need=None):
+        request = {'source': exchange.id, 'symbol': symbol, 'timeframe': timeframe, 'limit': limit, 'need': need}
+        return self._via_hub(request, lambda: self.cache.update_ccxt(exchange, symbol, timeframe, limit=limit))
+
+    def update_alpaca(self, api, symbol, timeframe='1Hour', limit=200, need=None):
+        # str() : les objets TimeFrame d'Alpaca (actions) voyagent sous forme de chaîne ('1Hour')
+        request = {'source': 'alpaca', 'symbol': symbol, 'timeframe': str(timeframe), 'limit': limit, 'need': need}
+        return self._via_hub(request, lambda: self.cache.update_alpaca(api, symbol, timeframe, limit=limit))
+
+    def update_yfinance(self, symbol, interval='1h', period='60d', need=None):
+        request = {'source': 'yfinance', 'symbol': symbol, 'timeframe': interval, 'period': period, 'need': need}
+        return self._via_hub(request, lambda: self.cache.update_yfinance(symbol, interval=interval, period=period))
+
+    def window(self, source, symbol, timeframe, after=None):
+        """Même résultat que OHLCVCache.window : anneau partagé si possible (aucune lecture de fichier)"""
+        rows = self._ring_after((source, symbol, str(timeframe)), after)
+        if rows is not None:
+            return hlc_rows(rows)
+        return self.cache.window(source, symbol, timeframe, after=after)
+
+    def _ring_after(self, key, after):
+        latest = self.latest.get(key)
+        # Démarrage à froid (tout l'historique) ou hub non joint pour ce flux : le cache fait foi
+        if after is None or latest is None:
+            return None
+        for _ in range(2):
+            ring = self.rings.get(key)
+            if ring is None:
+                ring = self.rings[key] = BarRing.attach(ring_name(*key))
+                if ring is None:
+                    del self.rings[key]
+                    return None
+            if (ring.last_timestamp() or -1) >= latest:
+                return ring.after(after)
+            # Anneau figé (hub relancé, nouveau bloc) : on se rattache
+            ring.close()
+            del self.rings[key]
+        return None
+
+    def close(self):
+        for ring in self.rings.values():
+            ring.close()
+        self.rings.clear()
+        self._disconnect()
+
+    def _disconnect(self):
+        if self.reader:
+            self.reader.close()
+        if self.sock:
+            self.sock.close()
+        self.sock = self.reader = None
+
+
+def add_arguments(parser):
+    """Option commune --hub des bots"""
+    parser.add_argument("--hub", nargs="?", const=str(DEFAULT_SOCKET),
+                        help=f"Passer par le hub de données partagé (socket Unix, défaut {DEFAULT_SOCKET})")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", type=str, default=str(DEFAULT_SOCKET), help="Chemin du socket Unix")
+    parser.add_argument("--min-interval", type=float, default=1.0, help="Secondes minimum entre deux appels réels pour un même flux")
+    parser.add_argument("--max-age", type=float, default=5.0, help="Âge maximum (s) de la bougie en cours servie sans nouvel appel")
+    parser.add_argument("--metrics-port", type=int, default=0, help="Port local des mesures au format Prometheus (0 = désactivé)")
+    parser.add_argument("--stats", action="store_true", help="Afficher les compteurs du hub en cours d'exécution et quitter")
+    args = parser.parse_args()
+
+    if args.stats:
+        try:
+            feeds = _ask(args.socket, {'op': 'stats'})['feeds']
+        except (OSError, ValueError) as e:
+            sys.exit(f"❌ Hub injoignable sur {args.socket} : {e}")
+        for feed in feeds:
+            print(f"📡 {feed['source']} {feed['symbol']} {feed['timeframe']} : "
+                  f"{feed['fetches']} appels réels pour {feed['served']} requêtes")
+        sys.exit()
+
+    if args.metrics_port:
+        metrics.serve(args.metrics_port, bot="datahub")
+    hub = DataHub(min_interval=args.min_interval, max_age=args.max_age)
+    try:
+        hub.serve(args.socket)
+    except KeyboardInterrupt:
+        print("🛑 Hub arrêté")
@@ -1,21 +1,30 @@
-import pandas as pd
-import pandas_ta as ta
 from backtesting import Strategy, Backtest
-import numpy as np
+from vector_engine import run_vector_backtest
+import optimizer
+import strategy
+from indicators import ema, rsi, atr
+
+STRATEGY_PARAMS = ('atr_mult', 'tp_mult', 'fast_len', 'slow_len', 'rsi_len', 'atr_len')
 
 class BotStrategy(Strategy):
-    # Paramètres équilibrés pour la réactivité
-    atr_mult = 2.0
-    tp_mult = 2.6
+    # Paramètres équilibrés pour la réactivité (valeurs du noyau commun strategy.py)
+    atr_mult = strategy.ATR_MULT_SL
+    tp_mult = strategy.TP_MULT
+    # Longueurs des indicateurs (optimisables)
+    fast_len = strategy.EMA_FAST
+    slow_len = strategy.EMA_SLOW
+    rsi_len = strategy.RSI_LEN
+    atr_len = strategy.ATR_LEN
 
     def init(self):
+        # Indicateurs du noyau (mode batch, mêmes formules que pandas_ta)
         # 1. Tendance & Momentum
-        self.ema_fast = self.I(lambda x: ta.ema(pd.Series(x), length=9).to_numpy(), self.data.Close)
-        self.ema_slow = self.I(lambda x: ta.ema(pd.Series(x), length=21).to_numpy(), self.data.Close)
-        self.rsi = self.I(lambda x: ta.rsi(pd.Series(x), length=14).to_numpy(), self.data.Close)
+        self.ema_fast = self.I(ema, self.data.Close, self.fast_len)
+        self.ema_slow = self.I(ema, self.data.Close, self.slow_len)
+        self.rsi = self.I(rsi, self.data.Close, self.rsi_len)
         
         # 2. ATR pour le Trailing Stop
-        self.atr = self.I(lambda: ta.atr(pd.Series(self.data.High), pd.Series(self.data.Low), pd.Series(self.data.Close), length=14).to_numpy())
+        self.atr = self.I(atr, self.data.High, self.data.Low, self.data.Close, self.atr_len)
 
     def next(self):
         price = self.data.Close[-1]
@@ -25,36 +34,75 @@ class BotStrategy(Strategy):
         # Si on est en position, on remonte le Stop Loss pour protéger le profit
         for trade in self.trades:
             if trade.is_long:
-                # Le nouveau stop est le prix actuel moins 2x ATR
-                new_sl = max(trade.sl or 0, price - (1.5 * atr_val))
+                # Le nouveau stop est le prix actuel moins 1.5x ATR
+                new_sl = max(trade.sl or 0, price - (strategy.TRAIL_MULT * atr_val))
                 trade.sl = new_sl
             else:
                 # Pour un short, le stop descend
-                new_sl = min(trade.sl or float('inf'), price + (1.5 * atr_val))
+                new_sl = min(trade.sl or float('inf'), price + (strategy.TRAIL_MULT * atr_val))
                 trade.sl = new_sl
 
         # --- LOGIQUE D'ENTRÉE ---
         if not self.position:
-            # On simplifie : Croisement EMA + RSI directionnel
-            # LONG
-            if self.ema_fast[-1] > self.ema_slow[-1] and self.rsi[-1] > 50:
-                sl = price - (self.atr_mult * atr_val)
-                tp = price + (self.tp_mult * atr_val)
-                self.buy(size=0.95, sl=sl, tp=tp)
-
-            # SHORT
-            elif self.ema_fast[-1] < self.ema_slow[-1] and self.rsi[-1] < 50:
-                sl = price + (self.atr_mult * atr_val)
-                tp = price - (self.tp_mult * atr_val)
-                self.sell(size=0.95, sl=sl, tp=tp)
+            # On simplifie : Croisement EMA + RSI directionnel (règle du noyau)
+            direction = strategy.signal(self.ema_fast[-1], self.ema_slow[-1], self.rsi[-1])
+            if direction != strategy.FLAT:
+                sl, tp = strategy.levels(direction, price, atr_val, self.atr_mult, self.tp_mult)
+                # LONG
+                if direction == strategy.LONG:
+                    self.buy(size=0.95, sl=sl, tp=tp)
+                # SHORT
+                else:
+                    self.sell(size=0.95, sl=sl, tp=tp)
+
+def strategy_params(**overrides):
+    """Paramètres courants de BotStrategy (éventuellement surchargés)"""
+    params = {name: getattr(BotStrategy, name) for name in STRATEGY_PARAMS}
+    params.update(overrides)
+    return params
 
 class TradingEngine:
     def __init__(self, symbol):
         self.symbol = symbol
 
-    def run_backtest(self, df):
+    def run_backtest(self, df, mode="backtesting", intrabar=None):
+        """
+        mode="backtesting" : moteur backtesting.py, bougie par bougie (renvoie stats, bt)
+        mode="vector" : moteur NumPy, mêmes trades et mêmes statistiques (renvoie stats, None)
+        intrabar : bougies 1m de la même période (intrabar.load_minutes) pour départager SL et TP
+                   touchés dans la même bougie (moteur vectorisé uniquement)
+        """
         df = df.rename(columns={'Open':'Open','High':'High','Low':'Low','Close':'Close','Volume':'Volume'})
         df = df.dropna()
+        if intrabar is not None and mode != "vector":
+            raise ValueError("❌ Le remplissage intrabougie n'existe qu'avec mode=\"vector\"")
+        if mode == "vector":
+            stats = run_vector_backtest(df, cash=1000000, commission=.0003, intrabar=intrabar, **strategy_params())
+            return stats, None
         # Commission réaliste
         bt = Backtest(df, BotStrategy, cash=1000000, commission=.0003)
-        return bt.run(), bt
\ No newline at end of file
+        return bt.run(), bt
+
+    def optimize(self, df, grid, maximize='Return [%]', constraint=None, processes=None):
+        """
+        Balayage parallèle des paramètres de BotStrategy (moteur vectorisé).
+        Exemple : eng.optimize(df, {'atr_mult': [1.5, 2, 2.5], 'fast_len': [5, 9, 12]},
+                               constraint=lambda p: p['fast_len'] < p['slow_len'])
+        Renvoie un DataFrame classé (une ligne par combinaison).
+        """
+        df = df.dropna()
+        return optimizer.optimize(df, grid, strategy_params(), maximize=maximize, constraint=constraint,
+                                  processes=processes, cash=1000000, commission=.0003)
+
+    def walk_forward(self, df, grid, train, test, anchored=False, maximize='Return [%]', constraint=None,
+                     processes=None):
+        """
+        Walk-forward de BotStrategy : optimisation sur chaque fenêtre d'entraînement, évaluation sur le test suivant.
+        `train` / `test` en bougies (int) ou en durée pandas ; anchored=True garde le début de l'historique.
+        Exemple : eng.walk_forward(df, {'atr_mult': [1.5, 2, 2.5]}, train='365D', test='90D')
+        Renvoie {'folds', 'equity', 'trades', 'stats'} (voir optimizer.walk_forward).
+        """
+        df = df.dropna()
+        return optimizer.walk_forward(df, grid, strategy_params(), train, test, anchored=anchored,
+                                      maximize=maximize, constraint=constraint, processes=processes,
+                                      cash=1000000, commission=.0003)
@@ -0,0 +1,216 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from metrics import metrics
+
+# ==========================================
+# EXÉCUTION DES ORDRES : IDEMPOTENCE, CONNEXIONS POOLÉES, RETOURNEMENT EN UN ORDRE
+# ==========================================
+# - Chaque ordre porte un client_order_id généré par le bot : (bot, symbole, bougie, sens, rôle).
+#   Après un timeout ou une erreur 5xx, on relit l'ordre par cet identifiant avant de renvoyer
+#   le MÊME identifiant : un nouvel essai ne peut jamais produire un second fill.
+#   La même bougie ne peut pas non plus déclencher deux fois le même ordre (redémarrage) ; en intrabar,
+#   le bot numérote les entrées de la bougie en cours (ré-entrée après un SL / TP dans la même bougie).
+# - Une seule session HTTP keep-alive, avec un pool de connexions et un timeout (le client Alpaca n'en a pas).
+# - Retournement de position :
+#   * broker qui accepte un ordre traversant zéro (net_reversal) : UN ordre net (position + nouvelle quantité),
+#     les anciennes jambes SL/TP sont annulées en parallèle et la protection OCO est posée hors chemin critique
+#   * Alpaca (refuse de passer de long à short en un ordre, jambes bracket = quantité de l'ordre) :
+#     annulation des jambes en parallèle -> ordre de clôture -> bracket, sans get_position ni attente d'exécution
+# - Latence de chaque étape (cancel, close, order, protect) dans metrics.py.
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+OPEN_STATUS = ('new', 'accepted', 'held', 'pending_new', 'partially_filled')
+
+
+def _status(error):
+    return getattr(error, 'status_code', None)
+
+
+def _is_network_error(error):
+    import requests
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def pool_session(api, size=8, timeout=10.0):
+    """Pool de connexions keep-alive + timeout par défaut sur la session du client REST Alpaca"""
+    from requests.adapters import HTTPAdapter
+
+    class TimeoutAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            if kwargs.get('timeout') is None:
+                kwargs['timeout'] = timeout
+            return super().send(request, **kwargs)
+
+    # Pas de nouvel essai automatique d'urllib3 : les ordres sont rejoués ici, avec leur identifiant
+    adapter = TimeoutAdapter(pool_connections=size, pool_maxsize=size, max_retries=0)
+    api._session.mount("https://", adapter)
+    api._session.mount("http://", adapter)
+    return api
+
+
+class OrderPipeline:
+    def __init__(self, api, positions=None, bot="bot", net_reversal=False, workers=4, retries=3, backoff=0.25,
+                 pool_size=8, timeout=10.0):
+        self.api = pool_session(api, pool_size, timeout) if hasattr(api, '_session') else api
+        self.positions = positions # AccountCache (broker.py), mis à jour par les réponses
+        self.bot = bot
+        self.net_reversal = net_reversal
+        self.retries = retries
+        self.backoff = backoff
+        # Au moins 2 : cancel_legs, lancé dans le pool, y soumet lui-même ses annulations
+        self.executor = ThreadPoolExecutor(max_workers=max(2, workers), thread_name_prefix="orders")
+        self.legs = {} # Symbole -> ids des jambes SL/TP encore ouvertes de notre dernier ordre
+
+    # --- IDENTIFIANTS ---
+    def client_order_id(self, symbol, side, role, bar=None):
+        """Identifiant déterministe par (bot, symbole, bougie, sens, rôle) ; aléatoire hors bougie"""
+        stamp = bar if bar is not None else uuid.uuid4().hex[:12]
+        return f"{self.bot}-{symbol.replace('/', '')}-{stamp}-{side}-{role}"[:128]
+
+    # --- ENVOI IDEMPOTENT ---
+    def _lookup(self, client_id):
+        """Ordre déjà accepté sous cet identifiant ; None s'il est inconnu ou si la vérification échoue aussi"""
+        try:
+            return self.api.get_order_by_client_order_id(client_id)
+        except Exception as e:
+            # Vérification impossible (réseau, 5xx) : on renvoie le même identifiant, Alpaca refuse un doublon
+            if _status(e) == 404 or _is_network_error(e) or _status(e) in RETRYABLE_STATUS:
+                return None
+            raise
+
+    def submit(self, client_id, stage='order', retry_rejected=False, after=None, **order):
+        """
+        submit_order avec client_order_id ; nouvel essai (même identifiant) sur timeout, 429 et 5xx.
+        `retry_rejected` : réessaie aussi les refus 403 / 422 (ordre dépendant d'une clôture pas encore exécutée).
+        `after` : Future lancée en parallèle (annulation des jambes) dont on attend la fin avant un nouvel essai.
+        """
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                if after is not None:
+                    wait([after])
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                with metrics.timer(stage):
+                    result = self.api.submit_order(client_order_id=client_id, **order)
+                metrics.inc('bot_orders_total', side=order.get('side'))
+                return result
+            except Exception as e:
+                error = e
+                message = str(e).lower()
+                if 'client_order_id' in message and 'unique' in message:
+                    # Déjà accepté (essai précédent dont la réponse est perdue, ou même bougie rejouée)
+                    print(f"♻️ {client_id} déjà accepté : ordre existant, rien de nouveau envoyé")
+                    return self.api.get_order_by_client_order_id(client_id)
+                if _is_network_error(e) or _status(e) in RETRYABLE_STATUS:
+                    # L'ordre a peut-être été accepté avant la coupure : on vérifie avant de le renvoyer
+                    existing = self._lookup(client_id)
+                    if existing is not None:
+                        return existing
+                elif not (retry_rejected and _status(e) in (403, 422)):
+                    raise
+                if attempt < self.retries:
+                    print(f"🔁 Nouvel essai {attempt + 1}/{self.retries} de {client_id} : {e}")
+        raise error
+
+    # --- JAMBES SL / TP ---
+    def _remember_legs(self, symbol, order):
+        ids = [leg.id for leg in getattr(order, 'legs', None) or []]
+        if getattr(order, 'order_class', None) == 'oco':
+            ids.append(order.id)
+        self.legs[symbol] = ids
+
+    def cancel_legs(self, symbol, keep=()):
+        """
+        Annule en parallèle les jambes SL/TP ouvertes de CE bot sur le symbole (elles bloquent la quantité).
+        `keep` : client_order_id à épargner (ordre envoyé en même temps que l'annulation).
+        Les ordres manuels et ceux des autres bots du même compte ne sont jamais touchés.
+        """
+        ids = self.legs.pop(symbol, None)
+        if ids is None:
+            # Inconnues (redémarrage) : un seul aller-retour pour les lister, jambes regroupées sous l'ordre parent
+            # (leur propre client_order_id est attribué par le broker, seul le parent porte le nôtre)
+            prefix = f"{self.bot}-{symbol.replace('/', '')}-"
+            ids = []
+            for order in self.api.list_orders(status='open', symbols=[symbol.replace('/', '')], nested=True):
+                client_id = getattr(order, 'client_order_id', None) or ''
+                if not client_id.startswith(prefix) or client_id in keep:
+                    continue
+                ids += [o.id for o in [order, *(getattr(order, 'legs', None) or [])] if o.status in OPEN_STATUS]
+        if not ids:
+            return
+        with metrics.timer('cancel'):
+            futures = [self.executor.submit(self.api.cancel_order, order_id) for order_id in ids]
+            wait(futures)
+        for future in futures:
+            if future.exception() is not None and _status(future.exception()) not in (404, 422):
+                print(f"⚠️ Annulation refusée : {future.exception()}") # Déjà exécutée / annulée : sans importance
+
+    # --- ENTRÉES ---
+    def enter(self, symbol, side, qty, current=0.0, sl=None, tp=None, bar=None):
+        """
+        Ouvre `qty` dans le sens `side` ('buy' / 'sell') avec SL / TP, en retournant la position `current` si besoin.
+        `bar` : horodatage de la bougie du signal (identifiants idempotents). Renvoie l'ordre d'entrée.
+        """
+        start = time.perf_counter()
+        sign = 1 if side == 'buy' else -1
+        reverse = current * sign < 0
+        legs = {}
+        if sl is not None and tp is not None:
+            legs = {'stop_loss': {'stop_price': round(sl, 2)}, 'take_profit': {'limit_price': round(tp, 2)}}
+
+        if reverse and self.net_reversal:
+            # Anciennes jambes annulées pendant l'envoi de l'ordre net. Tant qu'elles bloquent la quantité
+            # (annulation asynchrone), l'ordre net est refusé : nouvel essai une fois les annulations envoyées
+            client_id = self.client_order_id(symbol, side, 'net', bar)
+            cancelled = self.executor.submit(self.cancel_legs, symbol, (client_id,))
+            order = self.submit(client_id, retry_rejected=True, after=cancelled, symbol=symbol, side=side,
+                                qty=abs(current) + qty, type='market', time_in_force='gtc')
+            cancelled.result()
+            if legs:
+                # Protection de la nouvelle position, hors du chemin critique
+                self.executor.submit(self._protect, symbol, side, qty, legs, bar)
+        else:
+            if reverse:
+                self.cancel_legs(symbol)
+                # Quantité libérée de manière asynchrone après l'annulation : refus 403 possible, on réessaie
+                self.submit(self.client_order_id(symbol, side, 'close', bar), stage='close', retry_rejected=True,
+                            symbol=symbol, side=side, qty=abs(current), type='market', time_in_force='gtc')
+            # Refus possible tant que la clôture n'est pas exécutée : nouvel essai avec le même identifiant
+            order = self.submit(self.client_order_id(symbol, side, 'open', bar), retry_rejected=reverse,
+                                symbol=symbol, side=side, qty=qty, type='market', time_in_force='gtc',
+                                **({'order_class': 'bracket', **legs} if legs else {}))
+            self._remember_legs(symbol, order)
+
+        metrics.observe('bot_reversal_seconds' if reverse else 'bot_entry_seconds', time.perf_counter() - start)
+        if self.positions is not None:
+            self.positions.apply_order(order)
+            if reverse:
+                self.positions.invalidate(symbol)
+        return order
+
+    def _protect(self, symbol, side, qty, legs, bar):
+        exit_side = 'sell' if side == 'buy' else 'buy'
+        try:
+            order = self.submit(self.client_order_id(symbol, exit_side, 'oco', bar), stage='protect',
+                                retry_rejected=True, symbol=symbol, side=exit_side, qty=qty, type='limit',
+                                time_in_force='gtc', order_class='oco', **legs)
+            self._remember_legs(symbol, order)
+        except Exception as e:
+            print(f"❌ Protection SL/TP non posée sur {symbol} : {e}")
+
+    def close(self, symbol, current, bar=None):
+        """Clôture idempotente (ordre au marché avec identifiant, au lieu de DELETE /positions non rejouable)"""
+        if not current:
+            return None
+        self.cancel_legs(symbol)
+        side = 'sell' if current > 0 else 'buy'
+        order = self.submit(self.client_order_id(symbol, side, 'close', bar), stage='close', retry_rejected=True,
+                            symbol=symbol, side=side, qty=abs(current), type='market', time_in_force='gtc')
+        if self.positions is not None:
+            self.positions.apply_order(order)
+        return order
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,240 @@
+import math
+import numpy as np
+
+# ==========================================
+# INDICATEURS INCRÉMENTAUX (O(1) PAR BOUGIE)
+# ==========================================
+# Mêmes formules que pandas_ta (ema / rsi / atr) mais mises à jour bougie par bougie :
+# - update() : intègre une bougie CLÔTURÉE dans l'état
+# - peek()   : calcule la valeur avec une bougie en cours SANS modifier l'état
+# Tant que l'indicateur chauffe, la valeur vaut None (équivalent des NaN de pandas_ta).
+
+
+class StreamingEMA:
+    """EMA incrémentale, amorcée par la SMA des `length` premières valeurs (comme ta.ema)"""
+
+    def __init__(self, length):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value = None
+
+    def peek(self, close):
+        n = self.count + 1
+        if n < self.length:
+            return None
+        if n == self.length:
+            return (self.total + close) / self.length
+        return self.value + self.alpha * (close - self.value)
+
+    def update(self, close):
+        value = self.peek(close)
+        self.count += 1
+        if self.count <= self.length:
+            self.total += close
+        self.value = value
+        return value
+
+
+class StreamingRSI:
+    """RSI de Wilder incrémental (moyenne rma de pandas_ta : ewm alpha=1/length, adjust=True)"""
+
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.count = 0 # Nombre de variations déjà intégrées
+        self.prev_close = None
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.value = None
+
+    def _step(self, close):
+        if self.prev_close is None:
+            return None, None, None
+        delta = close - self.prev_close
+        gain_sum = max(delta, 0.0) + self.decay * self.gain_sum
+        loss_sum = max(-delta, 0.0) + self.decay * self.loss_sum
+        if self.count + 1 < self.length:
+            return gain_sum, loss_sum, None
+        # Les deux moyennes partagent le même dénominateur : il s'annule dans le ratio
+        total = gain_sum + loss_sum
+        value = 100.0 * gain_sum / total if total else math.nan
+        return gain_sum, loss_sum, value
+
+    def peek(self, close):
+        return self._step(close)[2]
+
+    def update(self, close):
+        gain_sum, loss_sum, value = self._step(close)
+        if gain_sum is not None:
+            self.gain_sum, self.loss_sum = gain_sum, loss_sum
+            self.count += 1
+        self.prev_close = close
+        self.value = value
+        return value
+
+
+class StreamingATR:
+    """ATR incrémental (True Range lissé par la rma de pandas_ta)"""
+
+    def __init__(self, length):
+        self.length = length
+        self.decay = 1.0 - 1.0 / length
+        self.count = 0 # Nombre de True Range déjà intégrés
+        self.prev_close = None
+        self.tr_sum = 0.0
+        self.weight = 0.0
+        self.value = None
+
+    def _step(self, high, low, close):
+        # La première bougie n'a pas de clôture précédente : pas de True Range (NaN chez pandas_ta)
+        if self.prev_close is None:
+            return None, None, None
+        tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        tr_sum = tr + self.decay * self.tr_sum
+        weight = 1.0 + self.decay * self.weight
+        if self.count + 1 < self.length:
+            return tr_sum, weight, None
+        return tr_sum, weight, tr_sum / weight
+
+    def peek(self, high, low, close):
+        return self._step(high, low, close)[2]
+
+    def update(self, high, low, close):
+        tr_sum, weight, value = self._step(high, low, close)
+        if tr_sum is not None:
+            self.tr_sum, self.weight = tr_sum, weight
+            self.count += 1
+        self.prev_close = close
+        self.value = value
+        return value
+
+
+class StreamingIndicators:
+    """Jeu d'indicateurs de la stratégie (EMA rapide/lente, RSI, ATR) tenu à jour bougie par bougie"""
+
+    def __init__(self, ema_fast=9, ema_slow=21, rsi_len=14, atr_len=14):
+        self.ema_fast = StreamingEMA(ema_fast)
+        self.ema_slow = StreamingEMA(ema_slow)
+        self.rsi = StreamingRSI(rsi_len)
+        self.atr = StreamingATR(atr_len)
+        self.last_timestamp = None # Horodatage de la dernière bougie clôturée intégrée
+        self.last = None # Ligne d'indicateurs de cette bougie clôturée
+
+    @staticmethod
+    def _snapshot(close, ema_f, ema_s, rsi, atr):
+        # Équivalent de df.dropna() : rien tant qu'un indicateur chauffe
+        if ema_f is None or ema_s is None or rsi is None or atr is None:
+            return None
+        return {'close': close, 'EMA_Fast': ema_f, 'EMA_Slow': ema_s, 'RSI': rsi, 'ATR': atr}
+
+    def update(self, high, low, close):
+        """Intègre une bougie clôturée et renvoie la ligne d'indicateurs (ou None)"""
+        self.last = self._snapshot(
+            close,
+            self.ema_fast.update(close),
+            self.ema_slow.update(close),
+            self.rsi.update(close),
+            self.atr.update(high, low, close),
+        )
+        return self.last
+
+    def peek(self, high, low, close):
+        """Ligne d'indicateurs pour la bougie en cours, sans modifier l'état"""
+        return self._snapshot(
+            close,
+            self.ema_fast.peek(close),
+            self.ema_slow.peek(close),
+            self.rsi.peek(close),
+            self.atr.peek(high, low, close),
+        )
+
+    def sync(self, bars):
+        """
+        Reçoit la fenêtre renvoyée par l'API [(timestamp, high, low, close), ...].
+        Seules les bougies clôturées jamais vues sont intégrées ; la dernière (en cours) est lue via peek().
+        """
+        if not bars:
+            return None
+        for timestamp, high, low, close in bars[:-1]:
+            if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+                continue
+            self.update(high, low, close)
+            self.last_timestamp = timestamp
+        timestamp, high, low, close = bars[-1]
+        return self.peek(high, low, close)
+
+    def feed(self, closed_bars, forming=None):
+        """
+        Variante de sync() quand on sait quelles bougies sont clôturées (cache local).
+        Renvoie la ligne de la bougie en cours si `forming` est fourni, sinon celle de la dernière clôturée.
+        """
+        for timestamp, high, low, close in closed_bars:
+            if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+                continue
+            self.update(high, low, close)
+            self.last_timestamp = timestamp
+        if forming is not None:
+            timestamp, high, low, close = forming
+            return self.peek(high, low, close)
+        return self.last
+
+    # --- SAUVEGARDE (reprise à chaud, voir state.py) ---
+    PARTS = ('ema_fast', 'ema_slow', 'rsi', 'atr')
+
+    def state(self):
+        """État complet en types simples (JSON) : permet de reprendre sans rejouer l'historique"""
+        state = {name: dict(vars(getattr(self, name))) for name in self.PARTS}
+        state['last_timestamp'] = self.last_timestamp
+        state['last'] = self.last
+        return state
+
+    def restore(self, state):
+        """Recharge un état de state() ; False (état inchangé) si les longueurs ne correspondent pas"""
+        if any(state[name]['length'] != getattr(self, name).length for name in self.PARTS):
+            return False
+        for name in self.PARTS:
+            vars(getattr(self, name)).update(state[name])
+        self.last_timestamp = state['last_timestamp']
+        self.last = state['last']
+        return True
+
+
+# ==========================================
+# VERSION VECTORISÉE (TABLEAUX COMPLETS)
+# ==========================================
+# Réplique de pandas_ta sur des tableaux NumPy, pour les backtests.
+# Renvoie des tableaux de même longueur que l'entrée, avec NaN pendant la chauffe.
+# pandas n'est importé qu'ici : les bots (mode incrémental) démarrent sans le charger.
+
+def _rma(values, length):
+    return values.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+def ema(close, length):
+    """EMA amorcée par une SMA (équivalent ta.ema)"""
+    import pandas as pd
+    close = pd.Series(close, dtype=float)
+    if len(close) < length:
+        return np.full(len(close), np.nan)
+    seeded = close.copy()
+    seeded.iloc[:length - 1] = np.nan
+    seeded.iloc[length - 1] = close.iloc[:length].mean()
+    return seeded.ewm(span=length, adjust=False).mean().to_numpy()
+
+def rsi(close, length):
+    """RSI de Wilder (équivalent ta.rsi)"""
+    import pandas as pd
+    delta = pd.Series(close, dtype=float).diff()
+    gain = _rma(delta.clip(lower=0), length)
+    loss = _rma((-delta).clip(lower=0), length)
+    return (100.0 * gain / (gain + loss)).to_numpy()
+
+def atr(high, low, close, length):
+    """ATR lissé par rma (équivalent ta.atr)"""
+    import pandas as pd
+    high = pd.Series(high, dtype=float)
+    low = pd.Series(low, dtype=float)
+    prev_close = pd.Series(close, dtype=float).shift(1)
+    tr = np.maximum(high - low, np.maximum((high - prev_close).abs(), (low - prev_close).abs()))
+    return _rma(tr, length).to_numpy()
@@ -0,0 +1,84 @@
+from pathlib import Path
+import numpy as np
+from ohlcv_cache import BAR_DTYPE, OHLCVCache, frame_to_bars
+
+# ==========================================
+# REMPLISSAGE SL / TP INTRABOUGIE (DONNÉES 1 MINUTE)
+# ==========================================
+# Sur une bougie 1h qui touche à la fois le SL et le TP, le backtest ne sait pas lequel a été atteint
+# en premier (le moteur retient le SL, hypothèse pessimiste). Les bots live passent de vrais ordres
+# bracket dont le remplissage dépend du chemin intrabougie : on le reconstitue avec les bougies 1m.
+# - les bornes [début, fin) des minutes de chaque bougie sont trouvées UNE fois par searchsorted
+# - pour une bougie ambiguë, premier contact SL / TP par argmax sur les hauts et bas des minutes
+# - les minutes restent en np.memmap (cache) : des années de 1m sans copie ni boucle par minute
+# - même minute pour les deux niveaux (ou minutes absentes) : on garde le SL
+
+def load_minutes(path=None, cache=None, source='binance', symbol=None, timeframe='1m'):
+    """
+    Bougies 1m (tableau BAR_DTYPE) depuis le cache local, un fichier .bin du cache ou un CSV
+    (index = date, colonnes open/high/low/close[/volume], casse libre).
+    """
+    if path is None:
+        return (cache or OHLCVCache()).read(source, symbol, timeframe)
+    path = Path(path)
+    if path.suffix == '.csv':
+        import pandas as pd
+        return frame_to_bars(pd.read_csv(path, index_col=0, parse_dates=True))
+    count = path.stat().st_size // BAR_DTYPE.itemsize
+    return np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(count,))
+
+
+def _to_ms(times):
+    """DatetimeIndex (naïf = UTC) ou tableau d'horodatages ms -> int64 ms"""
+    if hasattr(times, 'asi8'):
+        if times.tz is not None:
+            times = times.tz_convert('UTC').tz_localize(None)
+        return times.as_unit('ms').asi8
+    return np.asarray(times, dtype=np.int64)
+
+
+class IntrabarFills:
+    """Modèle de remplissage : ordre réel d'atteinte du SL et du TP dans une bougie, d'après les minutes"""
+
+    def __init__(self, minutes, bar_times, bar_ms=None):
+        bar_times = _to_ms(bar_times)
+        if bar_ms is None:
+            bar_ms = int(np.median(np.diff(bar_times))) if len(bar_times) > 1 else 0
+        timestamps = minutes['timestamp']
+        # Bornes des minutes de chaque bougie : deux searchsorted pour tout l'historique
+        self.start = np.searchsorted(timestamps, bar_times, side='left')
+        self.end = np.searchsorted(timestamps, bar_times + bar_ms, side='left')
+        self.open = minutes['open']
+        self.high = minutes['high']
+        self.low = minutes['low']
+        self.resolved = 0 # Bougies ambiguës tranchées par les minutes
+        self.take_profit_first = 0 # ... dont le TP a été touché avant le SL
+        self.missing = 0 # Bougies ambiguës sans minutes (SL retenu)
+
+    def first_touch(self, bar, direction, stop, target):
+        """
+        Bougie `bar` touchant SL et TP -> (sl_touché_en_premier, prix d'exécution), None sans minutes.
+        Un gap à l'ouverture d'une minute est exécuté à l'ouverture (comme sur la bougie 1h).
+        """
+        lo, hi = self.start[bar], self.end[bar]
+        if lo == hi:
+            self.missing += 1
+            return None
+        high, low = self.high[lo:hi], self.low[lo:hi]
+        if direction > 0:
+            sl_mask, tp_mask = low <= stop, high >= target
+        else:
+            sl_mask, tp_mask = high >= stop, low <= target
+        sl_first = int(sl_mask.argmax()) if sl_mask.any() else hi - lo
+        tp_first = int(tp_mask.argmax()) if tp_mask.any() else hi - lo
+        if sl_first == tp_first == hi - lo:
+            # Minutes incohérentes avec la bougie (données partielles) : pas de décision
+            self.missing += 1
+            return None
+        self.resolved += 1
+        if sl_first <= tp_first:
+            open_ = self.open[lo + sl_first]
+            return True, (min(open_, stop) if direction > 0 else max(open_, stop))
+        self.take_profit_first += 1
+        open_ = self.open[lo + tp_first]
+        return False, (max(open_, target) if direction > 0 else min(open_, target))
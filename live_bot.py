@@ -1,18 +1,37 @@
-import time
-import pandas_ta as ta
 from datetime import datetime
+import time
 import os
 from dotenv import load_dotenv
-import alpaca_trade_api as tradeapi
-from alpaca_trade_api.rest import TimeFrame # Import nécessaire pour les actions
 from pathlib import Path
 import argparse
 import sys
+from strategy import SignalKernel, LONG, SHORT
+from ohlcv_cache import OHLCVCache, hlc, timeframe_ms
+from scheduler import BarScheduler
+from state import BotState, state_name, resume_indicators
+from metrics import metrics
+import datahub
+import profiling
 
 # --- GESTION DES ARGUMENTS ---
 parser = argparse.ArgumentParser()
 parser.add_argument("--symbol", type=str, default="BTC/USD", help="Symbole à trader")
+parser.add_argument("--settle", type=float, default=2.0, help="Secondes d'attente après la clôture d'une bougie")
+parser.add_argument("--intrabar", type=float, default=0, help="Évaluation de la bougie en cours toutes les N secondes (0 = désactivé)")
+parser.add_argument("--reconcile", type=float, default=300, help="Secondes entre deux resynchronisations complètes des positions")
+parser.add_argument("--trade-updates", action="store_true", help="Suivre les exécutions en temps réel (flux trade_updates)")
+parser.add_argument("--fresh", action="store_true", help="Ignorer l'état sauvegardé des indicateurs (chauffe complète)")
+parser.add_argument("--net-reversal", action="store_true", help="Retournement en un seul ordre net (broker qui accepte de traverser zéro)")
+parser.add_argument("--metrics-port", type=int, default=0, help="Port local des mesures de latence au format Prometheus (0 = désactivé)")
+datahub.add_arguments(parser)
+profiling.add_arguments(parser)
 args = parser.parse_args()
+
+# Imports lourds après les arguments : --help et les erreurs de saisie sont instantanés
+import alpaca_trade_api as tradeapi
+from alpaca_trade_api.rest import TimeFrame # Import nécessaire pour les actions
+from broker import AccountCache
+from execution import OrderPipeline
 SYMBOL = args.symbol 
 
 # --- CHARGEMENT .ENV ---
@@ -29,102 +48,109 @@ TIMEFRAME_STR = "1Hour" # Pour Crypto
 TIMEFRAME_ENUM = TimeFrame.Hour # Pour Actions
 QTY = 1 # Attention : 0.01 fonctionne pour BTC, mais pour NVDA il faut souvent au moins 1 action (ou des fractions)
 
-# Paramètres Stratégie
-EMA_FAST_LEN = 9
-EMA_SLOW_LEN = 21
-RSI_LEN = 14
-ATR_LEN = 14
-ATR_MULT_SL = 2.0
-ATR_MULT_TP = 2.6
-RSI_THRESHOLD = 50
+# Stratégie : noyau commun (strategy.py), mêmes paramètres que le backtest
+kernel = SignalKernel()
+indicators = kernel.indicators
+cache = OHLCVCache()
+# Téléchargements via le hub de données partagé (--hub) : un seul appel par clôture pour tous les bots
+feed = datahub.DataFeed(cache, args.hub)
+
+# Reprise à chaud des indicateurs (les positions, elles, sont relues chez Alpaca) + journal des ordres
+store = BotState(state_name("live_bot", SYMBOL))
+snapshot = None if args.fresh else store.load()
+# Refusée si l'arrêt dépasse la fenêtre de chauffe (200 bougies) ou si le cache ne couvre plus la dernière bougie vue
+if snapshot and resume_indicators(indicators, snapshot, cache, 'alpaca', SYMBOL, TIMEFRAME_STR, warmup=200):
+    print("♻️ Indicateurs repris de l'état sauvegardé")
+elif snapshot:
+    print("♻️ État sauvegardé trop ancien ou non raccordé au cache : indicateurs recalculés")
 
 # --- CONNEXION ---
 try:
     api = tradeapi.REST(API_KEY, SECRET_KEY, BASE_URL, api_version='v2')
+    # Positions en cache : mises à jour par les ordres / exécutions, resynchronisées lentement
+    positions = AccountCache(api, reconcile_every=args.reconcile)
+    if args.trade_updates:
+        positions.listen(API_KEY, SECRET_KEY, BASE_URL)
+    # Ordres idempotents (client_order_id par bougie) sur connexions poolées, retournement sans aller-retour inutile
+    orders = OrderPipeline(api, positions, bot="live", net_reversal=args.net_reversal)
     print(f"✅ Bot connecté sur {SYMBOL}. Prêt à sniper.")
 except Exception as e:
     print(f"❌ Erreur connexion : {e}")
     sys.exit()
 
-def get_data():
+def get_data(intrabar=False, need=None):
     try:
-        bars = None
-        
         # --- DÉTECTION AUTOMATIQUE CRYPTO vs ACTION ---
-        if "/" in SYMBOL:
-            # C'est une Crypto (ex: BTC/USD)
-            bars = api.get_crypto_bars(SYMBOL, TIMEFRAME_STR, limit=200).df
-        else:
-            # C'est une Action (ex: NVDA, TSLA)
-            # Les actions ont besoin de l'objet TimeFrame
-            bars = api.get_bars(SYMBOL, TIMEFRAME_ENUM, limit=200).df
-
-        # Vérification vide
-        if bars is None or bars.empty:
-            return None
-
-        # Nettoyage des colonnes (Alpaca renvoie parfois des majuscules ou minuscules)
-        bars.columns = [c.lower() for c in bars.columns]
-        
-        # Standardisation (rename si nécessaire)
-        # Si on trade des actions, Alpaca renvoie parfois 'c', 'h', 'l', 'o'
-        rename_map = {'c': 'close', 'h': 'high', 'l': 'low', 'o': 'open', 'v': 'volume'}
-        bars.rename(columns=rename_map, inplace=True)
-
-        # Calculs Indicateurs
-        bars['EMA_Fast'] = ta.ema(bars['close'], length=EMA_FAST_LEN)
-        bars['EMA_Slow'] = ta.ema(bars['close'], length=EMA_SLOW_LEN)
-        bars['RSI'] = ta.rsi(bars['close'], length=RSI_LEN)
-        bars['ATR'] = ta.atr(bars['high'], bars['low'], bars['close'], length=ATR_LEN)
-        
-        # Supprime les lignes vides (NaN) dues aux calculs
-        bars.dropna(inplace=True)
-        
-        return bars
+        # Les cryptos utilisent la chaîne "1Hour", les actions ont besoin de l'objet TimeFrame
+        timeframe = TIMEFRAME_STR if "/" in SYMBOL else TIMEFRAME_ENUM
+
+        # Cache local : seules les bougies postérieures à la dernière stockée sont téléchargées
+        with metrics.timer('fetch'):
+            forming = feed.update_alpaca(api, SYMBOL, timeframe, limit=200, need=need)
+        with metrics.timer('parse'):
+            closed = feed.window('alpaca', SYMBOL, timeframe, after=indicators.last_timestamp)
+
+        # Calculs Indicateurs (incrémentaux : seules les nouvelles bougies clôturées sont intégrées)
+        # À la clôture on évalue la bougie clôturée ; en mode intrabar, la bougie en cours
+        with metrics.timer('indicators'):
+            return indicators.feed(closed, hlc(forming) if intrabar else None)
     except Exception as e:
         print(f"⚠️ Erreur récupération données : {e}")
         return None
 
 def check_position():
     try:
-        positions = api.list_positions()
-        # Nettoyage du symbole pour comparaison (BTC/USD -> BTCUSD)
-        symbol_clean = SYMBOL.replace("/", "")
-        
-        for p in positions:
-            if p.symbol == symbol_clean:
-                return float(p.qty)
-        return 0
-    except:
+        with metrics.timer('position'):
+            return positions.position(SYMBOL)
+    except Exception:
         return 0
 
-def close_all():
-    try:
-        # On ne ferme que la position du symbole en cours pour ne pas tout vendre
-        symbol_clean = SYMBOL.replace("/", "")
-        try:
-            api.close_position(symbol_clean)
-            print(f"🛑 Position fermée sur {SYMBOL}.")
-        except:
-            pass # Pas de position à fermer
-    except Exception as e:
-        print(f"Erreur fermeture : {e}")
+if args.metrics_port:
+    metrics.serve(args.metrics_port, bot="live_bot", symbol=SYMBOL)
 
 # --- BOUCLE PRINCIPALE ---
 print("🤖 Lancement de la boucle... (CTRL+C pour arrêter)")
 
-while True:
+entries = {} # Bougie en cours -> nombre d'entrées déjà envoyées (mode intrabar)
+
+def order_bar(expected):
+    """
+    Horodatage des identifiants d'ordre : la bougie clôturée ; en intrabar, la bougie en cours + n° d'entrée,
+    pour qu'une ré-entrée après un SL / TP dans la même bougie ne soit pas prise pour un doublon.
+    """
+    if expected is not None or indicators.last_timestamp is None:
+        return indicators.last_timestamp
+    forming = indicators.last_timestamp + timeframe_ms(TIMEFRAME_STR)
+    return f"{forming}i{entries.get(forming, 0)}"
+
+def count_entry():
+    """Entrée intrabar acceptée : la suivante dans la même bougie aura un autre identifiant"""
+    forming = indicators.last_timestamp + timeframe_ms(TIMEFRAME_STR)
+    count = entries.get(forming, 0) + 1
+    entries.clear() # Seule la bougie en cours compte
+    entries[forming] = count
+
+def tick(expected):
+    """
+    Une itération : données, signal, ordres.
+    expected = ouverture (ms) de la bougie qui vient de clôturer, ou None en mode intrabar.
+    Renvoie False si cette bougie n'est pas encore publiée (le planificateur réessaie).
+    """
     try:
-        df = get_data()
-        
-        if df is not None and not df.empty:
-            last = df.iloc[-1]
-            
+        last = get_data(intrabar=expected is None, need=expected)
+        if expected is not None and (indicators.last_timestamp or 0) < expected:
+            return False
+
+        if last is not None:
             price = last['close']
             ema_f = last['EMA_Fast']
             ema_s = last['EMA_Slow']
             rsi = last['RSI']
-            atr = last['ATR']
+            if expected is not None:
+                metrics.observe('bot_bar_close_to_decision_seconds', time.time() - (expected + timeframe_ms(TIMEFRAME_STR)) / 1000)
+            with metrics.timer('decision'):
+                direction, sl_price, tp_price = kernel.evaluate(last)
+            decided = time.perf_counter()
 
             print(f"[{datetime.now().strftime('%H:%M')}] {SYMBOL} | Prix: {price:.2f} | EMA9: {ema_f:.2f} | RSI: {rsi:.1f}")
 
@@ -133,51 +159,53 @@ while True:
             # --- LOGIQUE TRADING ---
             
             # ACHAT
-            if ema_f > ema_s and rsi > RSI_THRESHOLD:
+            if direction == LONG:
                 if current_qty <= 0:
                     print("🚀 SIGNAL LONG !")
-                    if current_qty < 0: close_all()
-                    
-                    sl_price = price - (ATR_MULT_SL * atr)
-                    tp_price = price + (ATR_MULT_TP * atr)
-                    
                     try:
-                        api.submit_order(
-                            symbol=SYMBOL, qty=QTY, side='buy', type='market', time_in_force='gtc',
-                            order_class='bracket',
-                            stop_loss={'stop_price': round(sl_price, 2)},
-                            take_profit={'limit_price': round(tp_price, 2)}
-                        )
+                        order = orders.enter(SYMBOL, 'buy', QTY, current=current_qty, sl=sl_price, tp=tp_price,
+                                             bar=order_bar(expected))
+                        if expected is None:
+                            count_entry()
+                        metrics.observe('bot_signal_to_order_seconds', time.perf_counter() - decided)
+                        store.record('order', symbol=SYMBOL, side='buy', qty=QTY, price=price, sl=sl_price, tp=tp_price,
+                                     order_id=getattr(order, 'id', None), client_order_id=getattr(order, 'client_order_id', None))
                         print(f"✅ Ordre LONG envoyé (SL: {sl_price:.2f})")
                     except Exception as e:
                         print(f"❌ Erreur ordre : {e}")
 
             # VENTE
-            elif ema_f < ema_s and rsi < RSI_THRESHOLD:
+            elif direction == SHORT:
                 if current_qty >= 0:
                     print("📉 SIGNAL SHORT !")
-                    if current_qty > 0: close_all()
-                    
-                    sl_price = price + (ATR_MULT_SL * atr)
-                    tp_price = price - (ATR_MULT_TP * atr)
-                    
                     try:
-                        api.submit_order(
-                            symbol=SYMBOL, qty=QTY, side='sell', type='market', time_in_force='gtc',
-                            order_class='bracket',
-                            stop_loss={'stop_price': round(sl_price, 2)},
-                            take_profit={'limit_price': round(tp_price, 2)}
-                        )
+                        order = orders.enter(SYMBOL, 'sell', QTY, current=current_qty, sl=sl_price, tp=tp_price,
+                                             bar=order_bar(expected))
+                        if expected is None:
+                            count_entry()
+                        metrics.observe('bot_signal_to_order_seconds', time.perf_counter() - decided)
+                        store.record('order', symbol=SYMBOL, side='sell', qty=QTY, price=price, sl=sl_price, tp=tp_price,
+                                     order_id=getattr(order, 'id', None), client_order_id=getattr(order, 'client_order_id', None))
                         print(f"✅ Ordre SHORT envoyé (SL: {sl_price:.2f})")
                     except Exception as e:
                         print(f"❌ Erreur ordre : {e}")
             else:
                 print("⏳ Zone neutre.")
 
+            store.save({'indicators': indicators.state()})
+
         else:
             print("💤 Pas de données (Marché fermé ou erreur API)...")
 
     except Exception as e:
         print(f"⚠️ Erreur boucle : {e}")
+    return True
+
+# Profilage à la demande (--profile) : une itération sur --profile-every, rapport + fichier dans profiles/
+profiler = profiling.from_args(args, "live_bot")
+if profiler:
+    tick = profiler.wrap(tick)
 
-    time.sleep(60)
\ No newline at end of file
+# Réveil à chaque clôture de bougie (+ délai de settle) au lieu d'un polling toutes les 60 secondes
+scheduler = BarScheduler(TIMEFRAME_STR, settle=args.settle, intrabar_every=args.intrabar)
+scheduler.run(tick)
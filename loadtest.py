@@ -0,0 +1,234 @@
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# ==========================================
+# TEST DE CHARGE DES BOTS CONTRE LE FAUX EXCHANGE LOCAL
+# ==========================================
+# Lance mock_exchange.py (latence, erreurs et limite de débit réglables), puis pour chaque nombre de bots
+# (--bots 1,2,4,8,16) autant de processus qui tournent pendant --duration secondes la boucle d'un bot,
+# avec le code réel : DataFeed / OHLCVCache -> fenêtre -> SignalKernel -> décision, et en mode alpaca
+# un ordre (OrderPipeline.enter : bracket, retournement) toutes les --order-every itérations.
+# Boucle fermée : chaque bot enchaîne les itérations sans attendre la clôture des bougies (--interval pour espacer).
+# Rapport par palier : débit total (itérations/s), latence p50 / p95 / p99 / max d'une itération
+# et d'un ordre, erreurs par type (429, 5xx injectés, réseau).
+# Isolation : cache OHLCV temporaire (OHLCV_CACHE_DIR) et symboles dédiés (LOAD0/USDT, LOAD0S0...), le cache et les
+# anneaux partagés des vrais bots ne sont jamais touchés.
+#
+#   python loadtest.py --bots 1,4,16 --duration 10 --latency 30 --jitter 10
+#   python loadtest.py --mode binance --hub --rate-limit 50     # hub partagé vs appels directs
+#   python loadtest.py --net-reversal                           # retournement en un ordre net, jambes annulées en parallèle
+
+ROOT = Path(__file__).parent
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_http(url, timeout=10.0):
+    import urllib.request
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"{url}/__mock__/stats", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"❌ Le faux exchange ne répond pas sur {url}")
+
+
+def _percentiles(values):
+    import numpy as np
+    if not values:
+        return {'p50': float('nan'), 'p95': float('nan'), 'p99': float('nan'), 'max': float('nan')}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {'p50': p50, 'p95': p95, 'p99': p99, 'max': max(values) * 1000}
+
+
+# --- BOT SIMULÉ (processus enfant) ---
+def run_bot(mode, index, stage, symbol, duration, interval, order_every, qty, hub, net_reversal=False):
+    """Boucle d'un bot pendant `duration` s -> dict de mesures"""
+    from collections import Counter
+    import datahub
+    from ohlcv_cache import OHLCVCache, hlc
+    from strategy import SignalKernel
+
+    cache = OHLCVCache()
+    feed = datahub.DataFeed(cache, hub)
+    kernel = SignalKernel()
+    indicators = kernel.indicators
+    if mode == 'binance':
+        exchange = datahub.connect_ccxt('binance')
+        source, timeframe = exchange.id, '1h'
+
+        def update():
+            return feed.update_ccxt(exchange, symbol, timeframe, limit=100)
+    else:
+        import alpaca_trade_api as tradeapi
+        from alpaca_trade_api.rest import TimeFrame
+        from broker import AccountCache
+        from execution import OrderPipeline
+        api = tradeapi.REST("load", "load", os.environ["ALPACA_BASE_URL"], api_version='v2')
+        positions = AccountCache(api)
+        orders = OrderPipeline(api, positions, bot=f"load{stage}x{index}", net_reversal=net_reversal)
+        source, timeframe = 'alpaca', TimeFrame.Hour
+
+        def update():
+            return feed.update_alpaca(api, symbol, timeframe, limit=200)
+
+    def iteration():
+        forming = update()
+        closed = feed.window(source, symbol, timeframe, after=indicators.last_timestamp)
+        return kernel.feed(closed, hlc(forming))
+
+    latencies, order_latencies = [], []
+    errors = Counter()
+    iteration() # Chauffe (historique complet) hors mesure
+    deadline = time.monotonic() + duration
+    count = 0
+    side = 'buy'
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            last, _, _, _ = iteration()
+            latencies.append(time.perf_counter() - start)
+            count += 1
+            if mode == 'alpaca' and order_every and count % order_every == 0 and last is not None:
+                # Ordre forcé quel que soit le signal, sens alterné : chaque ordre après le premier est un retournement
+                price = last['close']
+                sl = price * (0.95 if side == 'buy' else 1.05)
+                tp = price * (1.05 if side == 'buy' else 0.95)
+                start = time.perf_counter()
+                orders.enter(symbol, side, qty, current=positions.position(symbol), sl=sl, tp=tp, bar=count)
+                order_latencies.append(time.perf_counter() - start)
+                side = 'sell' if side == 'buy' else 'buy'
+        except Exception as e:
+            status = getattr(e, 'status_code', None) or getattr(getattr(e, 'response', None), 'status_code', None)
+            errors[f"{type(e).__name__}{f' {status}' if status else ''}"] += 1
+        if interval:
+            time.sleep(interval)
+    feed.close()
+    if mode == 'alpaca':
+        orders.shutdown()
+    return {'latencies': latencies, 'orders': order_latencies, 'errors': dict(errors)}
+
+
+def _bot_process(args, conn):
+    try:
+        conn.send(run_bot(*args))
+    except Exception as e:
+        conn.send({'latencies': [], 'orders': [], 'errors': {f"démarrage {type(e).__name__}: {e}": 1}})
+    conn.close()
+
+
+def run_stage(mode, count, stage, duration, interval, order_every, qty, hub, net_reversal=False):
+    """`count` bots en parallèle (un processus chacun) -> mesures agrégées"""
+    import multiprocessing as mp
+    from collections import Counter
+    ctx = mp.get_context("spawn") # Processus neufs, comme des bots lancés séparément
+    runs = []
+    for index in range(count):
+        # Actions : symboles neufs à chaque palier (pas de position ni de jambes SL/TP héritées du précédent)
+        symbol = f"LOAD{index}/USDT" if mode == 'binance' else f"LOAD{index}S{stage}"
+        parent, child = ctx.Pipe(duplex=False)
+        process = ctx.Process(target=_bot_process, daemon=True,
+                              args=((mode, index, stage, symbol, duration, interval, order_every, qty, hub,
+                                     net_reversal), child))
+        process.start()
+        runs.append((process, parent))
+    latencies, order_latencies = [], []
+    errors = Counter()
+    for process, parent in runs:
+        result = parent.recv()
+        process.join()
+        latencies += result['latencies']
+        order_latencies += result['orders']
+        errors.update(result['errors'])
+    return {'bots': count, 'iterations': len(latencies), 'throughput': len(latencies) / duration,
+            'loop': _percentiles(latencies), 'orders': len(order_latencies), 'order': _percentiles(order_latencies),
+            'errors': dict(errors)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["alpaca", "binance"], default="alpaca",
+                        help="alpaca : bougies + positions + ordres (live_bot) ; binance : données publiques ccxt (local_bot)")
+    parser.add_argument("--bots", type=str, default="1,2,4,8,16", help="Nombres de bots à tester, séparés par des virgules")
+    parser.add_argument("--duration", type=float, default=10, help="Durée de chaque palier (s)")
+    parser.add_argument("--interval", type=float, default=0, help="Pause entre deux itérations d'un bot (s)")
+    parser.add_argument("--order-every", type=int, default=10, help="Mode alpaca : un ordre toutes les N itérations (0 = aucun)")
+    parser.add_argument("--qty", type=float, default=1, help="Quantité par ordre")
+    parser.add_argument("--net-reversal", action="store_true",
+                        help="Mode alpaca : retournement en un seul ordre net (faux exchange lancé avec --net-reversal)")
+    parser.add_argument("--hub", action="store_true", help="Faire passer les bots par un hub de données partagé (datahub.py)")
+    parser.add_argument("--latency", type=float, default=20, help="Faux exchange : latence fixe par requête (ms)")
+    parser.add_argument("--jitter", type=float, default=5, help="Faux exchange : latence supplémentaire moyenne (ms)")
+    parser.add_argument("--error-rate", type=float, default=0, help="Faux exchange : part des requêtes en erreur 503")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Faux exchange : requêtes par seconde avant 429 (0 = illimité)")
+    parser.add_argument("--burst", type=int, help="Faux exchange : rafale autorisée")
+    parser.add_argument("--url", type=str, help="Utiliser un faux exchange déjà lancé au lieu d'en démarrer un")
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.bots.split(",")]
+    workdir = tempfile.mkdtemp(prefix="loadtest_")
+    processes = []
+    url = args.url
+    if url is None:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        command = [sys.executable, str(ROOT / "mock_exchange.py"), "--port", str(port),
+                   "--latency", str(args.latency), "--jitter", str(args.jitter), "--error-rate", str(args.error_rate),
+                   "--rate-limit", str(args.rate_limit),
+                   "--pairs", ",".join(f"LOAD{k}/USDT" for k in range(max(counts)))]
+        if args.burst:
+            command += ["--burst", str(args.burst)]
+        if args.net_reversal:
+            command.append("--net-reversal")
+        processes.append(subprocess.Popen(command))
+        _wait_http(url)
+
+    # Hérité par les bots et le hub : tout pointe vers le faux exchange, cache jetable
+    os.environ.update({
+        'BINANCE_API_URL': url, 'ALPACA_BASE_URL': url, 'APCA_API_DATA_URL': url,
+        'ALPACA_API_KEY': 'load', 'ALPACA_SECRET_KEY': 'load',
+        'OHLCV_CACHE_DIR': str(Path(workdir) / "cache"),
+        'TELEGRAM_BOT_TOKEN': '', 'TELEGRAM_CHAT_ID': '',
+    })
+    hub = None
+    if args.hub:
+        import datahub
+        hub = str(Path(workdir) / "datahub.sock")
+        processes.append(datahub.ensure_hub(hub))
+
+    print(f"🏋️ Test de charge {args.mode} contre {url} : {args.duration:.0f}s par palier"
+          f"{' (hub partagé)' if hub else ''}")
+    print(f"{'bots':>5} {'it/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'ordres':>7} {'ordre p50':>10} {'ordre p99':>10}  erreurs")
+    try:
+        for stage, count in enumerate(counts):
+            result = run_stage(args.mode, count, stage, args.duration, args.interval, args.order_every, args.qty, hub,
+                               args.net_reversal)
+            loop, order = result['loop'], result['order']
+            errors = ", ".join(f"{name} x{n}" for name, n in sorted(result['errors'].items())) or "-"
+            print(f"{count:>5} {result['throughput']:>9.1f} {loop['p50']:>8.1f} {loop['p95']:>8.1f} {loop['p99']:>8.1f} "
+                  f"{loop['max']:>8.1f} {result['orders']:>7} {order['p50']:>10.1f} {order['p99']:>10.1f}  {errors}",
+                  flush=True)
+    except KeyboardInterrupt:
+        print("🛑 Test interrompu")
+    finally:
+        for process in processes:
+            if process is not None:
+                # SIGINT : le hub détruit ses anneaux en mémoire partagée avant de quitter
+                process.send_signal(signal.SIGINT)
+                process.wait()
+        import shutil
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,180 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# MESURES DE LATENCE DU CHEMIN CRITIQUE (FORMAT PROMETHEUS)
+# ==========================================
+# Chronomètres par étape (fetch, parse, indicators, decision, position, order) -> histogrammes.
+# Exposés sur un endpoint HTTP local (/metrics, format texte Prometheus) avec --metrics-port.
+# Désactivé (par défaut) : timer() renvoie un objet vide partagé, observe() / inc() sortent immédiatement,
+# le coût se limite à un appel de fonction.
+#
+#   from metrics import metrics
+#   with metrics.timer('fetch'):
+#       ...
+#   metrics.serve(9100, bot='local_bot') # curl localhost:9100/metrics
+
+# Bornes des histogrammes en secondes (de 100 µs à 30 s)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    'bot_stage_seconds': "Durée de chaque étape du chemin critique",
+    'bot_bar_close_to_decision_seconds': "Délai entre la clôture de la bougie et la décision",
+    'bot_signal_to_order_seconds': "Délai entre la décision et l'accusé de réception de l'ordre",
+    'bot_errors_total': "Erreurs par étape",
+    'bot_orders_total': "Ordres envoyés",
+    'bot_entry_seconds': "Durée d'une entrée en position (envoi jusqu'à l'accusé de réception)",
+    'bot_reversal_seconds': "Durée d'un retournement de position (annulations, clôture et entrée)",
+    'hub_requests_total': "Requêtes des bots au hub de données (fetched = appel réel, shared = résultat partagé)",
+    'hub_exchange_calls_total': "Appels réels aux exchanges par le hub de données",
+    'hub_throttle_wait_seconds': "Attente imposée par le limiteur de débit du hub",
+}
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Dernier compteur = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _NullTimer:
+    """Chronomètre des mesures désactivées : ne fait rien"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'start')
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            self.registry.inc('bot_errors_total', **self.labels)
+        return False
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.constant_labels = {}
+        self.histograms = {} # (nom, labels triés) -> Histogram
+        self.counters = {} # (nom, labels triés) -> valeur
+        self.lock = threading.Lock()
+        self.server = None
+
+    # --- MESURES ---
+    def timer(self, stage, name='bot_stage_seconds'):
+        """Context manager qui chronomètre une étape (erreurs comptées)"""
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, name, {'stage': stage})
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    # --- EXPOSITION ---
+    def render(self):
+        """Texte au format d'exposition Prometheus"""
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            histograms = sorted((key, h.counts[:], h.sum, h.count) for key, h in self.histograms.items())
+            counters = sorted(self.counters.items())
+        for (name, labels), counts, total, count in histograms:
+            header(name, 'histogram')
+            labels = {**self.constant_labels, **dict(labels)}
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS + ('+Inf',), counts):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f"{name}{_labels({**self.constant_labels, **dict(labels)})} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1", **constant_labels):
+        """Active les mesures et sert /metrics dans un thread (écoute locale par défaut)"""
+        self.enabled = True
+        self.constant_labels = constant_labels
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass # Pas de ligne de log à chaque scrape
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True).start()
+        print(f"📊 Mesures exposées sur http://{host}:{self.server.server_address[1]}/metrics")
+        return self.server
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+# Registre unique du processus
+metrics = Metrics()
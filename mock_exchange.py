@@ -0,0 +1,447 @@
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from ohlcv_cache import now_ms, timeframe_ms
+from datahub import TokenBucket
+
+# ==========================================
+# FAUX EXCHANGE LOCAL (ALPACA V2 + BINANCE PUBLIC) POUR LES TESTS DE CHARGE
+# ==========================================
+# Un serveur HTTP local qui parle assez des API réelles pour faire tourner le code existant sans réseau :
+# - Alpaca trading : /v2/account, /v2/positions, /v2/orders (marché, bracket, OCO, client_order_id),
+#   annulation, recherche par client_order_id ; mêmes refus qu'Alpaca (quantité bloquée par les jambes
+#   SL/TP, retournement en un seul ordre, vente à découvert de crypto) ; annulations asynchrones comme chez Alpaca
+#   (pending_cancel, quantité libérée après --cancel-delay ms)
+# - Alpaca data : /v2/stocks/{symbole}/bars, /v1beta3/crypto/us/bars
+# - Binance public (ccxt) : /api/v3/exchangeInfo, /api/v3/klines, /api/v3/time
+# Prix synthétiques reproductibles par symbole (synthetic.py), la bougie en cours publiée avec ses valeurs finales. Ordres au marché exécutés au dernier prix ;
+# les jambes SL / TP restent ouvertes (pas de déclenchement) : elles bloquent la quantité comme chez Alpaca.
+# Conditions dégradées réglables : latence (+ queue exponentielle), taux d'erreurs 5xx, limite de débit (429).
+#
+#   python mock_exchange.py --port 8765 --latency 50 --error-rate 0.01 --rate-limit 200
+#   ALPACA_BASE_URL=http://127.0.0.1:8765 APCA_API_DATA_URL=http://127.0.0.1:8765 \
+#   BINANCE_API_URL=http://127.0.0.1:8765 python live_bot.py --symbol NVDA
+# (BINANCE_API_URL : voir datahub.connect_ccxt, utilisé par local_bot.py, binance_simu.py et le hub)
+# loadtest.py lance ce serveur et mesure le débit et la latence des boucles des bots.
+
+HISTORY_BARS = 2000 # Bougies clôturées disponibles à l'instant du démarrage
+HORIZON_BARS = 2000 # Bougies générées à l'avance (le temps avance pendant le test)
+BINANCE_PAIRS = ('BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'BNB/USDT', 'XRP/USDT')
+OPEN_STATUS = ('new', 'accepted', 'held', 'pending_cancel') # pending_cancel : quantité encore bloquée
+
+
+def _iso(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _parse_time(value):
+    """ISO 8601 (Alpaca) ou millisecondes -> ms"""
+    if value is None:
+        return None
+    if str(value).isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp() * 1000)
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, code=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code or status * 100000
+
+
+class Market:
+    """Séries de prix synthétiques par (symbole, timeframe), ancrées sur l'heure de démarrage"""
+
+    def __init__(self, history=HISTORY_BARS, horizon=HORIZON_BARS):
+        self.history = history
+        self.horizon = horizon
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def bars(self, symbol, timeframe):
+        tf = timeframe_ms(timeframe) # '1h' (Binance) et '1Hour' (Alpaca) : même série
+        key = (symbol, tf)
+        with self.lock:
+            if key not in self.series:
+                from synthetic import generate_bars
+                import pandas as pd
+                start = (now_ms() // tf - self.history) * tf
+                self.series[key] = generate_bars(self.history + self.horizon, seed=zlib.crc32(symbol.encode()),
+                                                 start=pd.Timestamp(start, unit='ms'), freq=f"{tf}ms")
+            return self.series[key]
+
+    def window(self, symbol, timeframe, start=None, end=None, limit=1000):
+        """Bougies publiées (clôturées + bougie en cours) entre start et end, au plus `limit`"""
+        bars = self.bars(symbol, timeframe)
+        timestamps = bars['timestamp']
+        visible = np.searchsorted(timestamps, now_ms(), side='right') # Jusqu'à la bougie en cours incluse
+        lo = 0 if start is None else np.searchsorted(timestamps, start, side='left')
+        hi = visible if end is None else min(visible, np.searchsorted(timestamps, end, side='right'))
+        if start is None:
+            lo = max(0, hi - limit)
+        hi = min(hi, lo + limit)
+        columns = [bars[name][lo:hi].tolist() for name in ('timestamp', 'open', 'high', 'low', 'close', 'volume')]
+        return list(zip(*columns))
+
+    def price(self, symbol, timeframe='1h'):
+        return float(self.window(symbol, timeframe, limit=1)[-1][4])
+
+
+class Broker:
+    """Compte Alpaca simulé : cash, positions, ordres"""
+
+    def __init__(self, market, cash=100000.0, allow_net_reversal=False, cancel_delay=0.1):
+        self.market = market
+        self.cash = cash
+        self.allow_net_reversal = allow_net_reversal
+        self.cancel_delay = cancel_delay
+        self.leg_ids = set() # Jambes SL / TP (regroupées sous leur ordre parent avec nested=true)
+        self.positions = {} # Symbole sans '/' -> quantité signée
+        self.symbols = {} # Symbole sans '/' -> symbole de la série de prix ('BTCUSD' -> 'BTC/USD')
+        self.entry = {}
+        self.orders = {} # id -> ordre (dict au format Alpaca)
+        self.by_client_id = {}
+        self.lock = threading.Lock()
+
+    # --- FORMAT ALPACA ---
+    def account(self):
+        with self.lock:
+            equity = self.cash + sum(qty * self._price(symbol) for symbol, qty in self.positions.items())
+            return {'id': 'mock', 'status': 'ACTIVE', 'currency': 'USD', 'cash': f"{self.cash:.2f}",
+                    'equity': f"{equity:.2f}", 'buying_power': f"{max(0.0, 2 * equity):.2f}",
+                    'portfolio_value': f"{equity:.2f}"}
+
+    def _position(self, symbol, qty):
+        price = self._price(symbol)
+        return {'symbol': symbol, 'qty': str(qty), 'side': 'long' if qty > 0 else 'short',
+                'avg_entry_price': str(self.entry.get(symbol, price)), 'current_price': str(price),
+                'market_value': str(qty * price), 'asset_class': 'crypto' if '/' in self.symbols.get(symbol, '') else 'us_equity'}
+
+    def list_positions(self):
+        with self.lock:
+            return [self._position(symbol, qty) for symbol, qty in self.positions.items() if qty]
+
+    def get_position(self, symbol):
+        with self.lock:
+            qty = self.positions.get(symbol.replace('/', ''), 0.0)
+            if not qty:
+                raise ApiError(404, "position does not exist", 40410000)
+            return self._position(symbol.replace('/', ''), qty)
+
+    # --- ORDRES ---
+    def _price(self, key):
+        return self.market.price(self.symbols.get(key, key))
+
+    def _order(self, symbol, side, qty, type_, client_id, order_class=None, status='new', **extra):
+        order = {'id': str(uuid.uuid4()), 'client_order_id': client_id or str(uuid.uuid4()), 'symbol': symbol,
+                 'side': side, 'qty': str(qty), 'filled_qty': '0', 'filled_avg_price': None, 'type': type_,
+                 'order_class': order_class or '', 'status': status, 'created_at': _iso(now_ms()), 'canceled_at': None,
+                 'legs': None,
+                 'time_in_force': 'gtc', **extra}
+        self.orders[order['id']] = order
+        self.by_client_id[order['client_order_id']] = order
+        return order
+
+    def _held(self, key, side):
+        """Quantité déjà engagée par les ordres ouverts qui réduisent la position (jambes SL / TP)"""
+        total = 0.0
+        seen = set()
+        for order in self.orders.values():
+            if order['status'] in OPEN_STATUS and order['symbol'].replace('/', '') == key \
+                    and order['side'] == side and order.get('parent_group') not in seen:
+                seen.add(order.get('parent_group')) # Les deux jambes d'une même paire bloquent une seule fois
+                total += float(order['qty'])
+        return total
+
+    def _fill(self, order, key, signed):
+        price = self._price(key)
+        current = self.positions.get(key, 0.0)
+        new = current + signed
+        if current == 0 or current * new < 0:
+            self.entry[key] = price
+        self.positions[key] = new
+        self.cash -= signed * price
+        order.update(status='filled', filled_qty=order['qty'], filled_avg_price=str(price), filled_at=_iso(now_ms()))
+
+    def submit(self, body):
+        symbol = body['symbol']
+        key = symbol.replace('/', '')
+        side = body['side']
+        qty = float(body['qty'])
+        client_id = body.get('client_order_id')
+        order_class = body.get('order_class') or ''
+        with self.lock:
+            if client_id and client_id in self.by_client_id:
+                raise ApiError(422, "client_order_id must be unique", 40010001)
+            self.symbols.setdefault(key, symbol)
+            current = self.positions.get(key, 0.0)
+            signed = qty if side == 'buy' else -qty
+            reducing = current * signed < 0
+            if order_class == 'oco':
+                # Ordre de sortie : limite (TP) + stop (SL) sur une position existante
+                if not reducing or qty > abs(current) - self._held(key, side):
+                    raise ApiError(403, f"insufficient qty available for order (requested: {qty}, "
+                                        f"available: {max(0.0, abs(current) - self._held(key, side))})", 40310000)
+                group = str(uuid.uuid4())
+                order = self._order(symbol, side, qty, 'limit', client_id, 'oco', parent_group=group,
+                                    limit_price=str(body['take_profit']['limit_price']))
+                stop = self._order(symbol, side, qty, 'stop', None, 'oco', parent_group=group,
+                                   stop_price=str(body['stop_loss']['stop_price']))
+                order['legs'] = [stop]
+                self.leg_ids.add(stop['id'])
+                return order
+            if reducing:
+                crossing = abs(signed) > abs(current)
+                if crossing and not self.allow_net_reversal:
+                    raise ApiError(403, "insufficient qty available for order (cannot reverse a position in one order)",
+                                   40310000)
+                # Jambes SL / TP ouvertes (ou en cours d'annulation) : quantité bloquée, y compris pour un ordre net
+                available = abs(current) - self._held(key, side)
+                if min(qty, abs(current)) > available:
+                    raise ApiError(403, f"insufficient qty available for order (requested: {qty}, "
+                                        f"available: {available})", 40310000)
+            if '/' in self.symbols[key] and current + signed < 0:
+                raise ApiError(403, "crypto short selling is not allowed", 40310000)
+            order = self._order(symbol, side, qty, body.get('type', 'market'), client_id, order_class)
+            self._fill(order, key, signed)
+            if order_class == 'bracket':
+                exit_side = 'sell' if side == 'buy' else 'buy'
+                group = str(uuid.uuid4())
+                order['legs'] = [
+                    self._order(symbol, exit_side, qty, 'limit', None, 'bracket', parent_group=group,
+                                limit_price=str(body['take_profit']['limit_price'])),
+                    self._order(symbol, exit_side, qty, 'stop', None, 'bracket', parent_group=group,
+                                stop_price=str(body['stop_loss']['stop_price'])),
+                ]
+                self.leg_ids.update(leg['id'] for leg in order['legs'])
+            return order
+
+    def cancel(self, order_id):
+        """
+        Comme Alpaca : la demande est acceptée tout de suite (pending_cancel) mais l'ordre n'est annulé,
+        et sa quantité libérée, qu'après `cancel_delay` secondes
+        """
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                raise ApiError(404, "order not found", 40410000)
+            if order['status'] not in ('new', 'accepted', 'held'):
+                raise ApiError(422, "order is not cancelable", 42210000)
+            order['status'] = 'pending_cancel'
+        timer = threading.Timer(self.cancel_delay, self._cancelled, (order,))
+        timer.daemon = True
+        timer.start()
+
+    def _cancelled(self, order):
+        with self.lock:
+            order.update(status='canceled', canceled_at=_iso(now_ms()))
+
+    def close_position(self, symbol):
+        key = symbol.replace('/', '')
+        with self.lock:
+            current = self.positions.get(key, 0.0)
+        if not current:
+            raise ApiError(404, "position does not exist", 40410000)
+        return self.submit({'symbol': symbol, 'side': 'sell' if current > 0 else 'buy', 'qty': abs(current),
+                            'type': 'market'})
+
+    def list_orders(self, status='open', symbols=None, nested=False):
+        """`nested` : jambes sous leur parent, parent listé tant qu'une de ses jambes est ouverte"""
+        wanted = {s.replace('/', '') for s in symbols.split(',')} if symbols else None
+        with self.lock:
+            orders = list(self.orders.values())
+        if nested:
+            orders = [o for o in orders if o['id'] not in self.leg_ids]
+        if status in (None, 'open'):
+            orders = [o for o in orders if o['status'] in OPEN_STATUS
+                      or (nested and any(leg['status'] in OPEN_STATUS for leg in o['legs'] or []))]
+        if wanted:
+            orders = [o for o in orders if o['symbol'].replace('/', '') in wanted]
+        return json.loads(json.dumps(orders)) # Instantané (les annulations en cours continuent)
+
+
+class MockExchange:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=0.0, burst=None,
+                 allow_net_reversal=False, pairs=BINANCE_PAIRS, seed=None, cancel_delay=100.0):
+        self.latency = latency / 1000
+        self.jitter = jitter / 1000
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit, burst or max(1, int(rate_limit))) if rate_limit else None
+        self.random = random.Random(seed)
+        self.market = Market()
+        self.broker = Broker(self.market, allow_net_reversal=allow_net_reversal, cancel_delay=cancel_delay / 1000)
+        self.pairs = list(pairs)
+        self.stats = {'requests': 0, 'throttled': 0, 'errors_injected': 0, 'routes': {}}
+        self.lock = threading.Lock()
+        self.server = None
+
+    # --- CONDITIONS DÉGRADÉES ---
+    def _degrade(self, route):
+        with self.lock:
+            self.stats['requests'] += 1
+            self.stats['routes'][route] = self.stats['routes'].get(route, 0) + 1
+            delay = self.latency + (self.random.expovariate(1 / self.jitter) if self.jitter else 0.0)
+            fail = self.random.random() < self.error_rate
+        if self.bucket is not None and not self.bucket.try_acquire():
+            with self.lock:
+                self.stats['throttled'] += 1
+            raise ApiError(429, "rate limit exceeded", 42910000)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            with self.lock:
+                self.stats['errors_injected'] += 1
+            raise ApiError(503, "service unavailable (injected)", 50300000)
+
+    # --- ROUTES ---
+    def route(self, method, path, query, body):
+        """(méthode, chemin, paramètres, corps JSON) -> (statut, corps JSON) ; lève ApiError"""
+        q = {k: v[-1] for k, v in query.items()}
+        broker = self.broker
+        parts = path.strip('/').split('/')
+        if path == '/__mock__/stats':
+            with self.lock:
+                return 200, json.loads(json.dumps(self.stats))
+        # Binance (ccxt)
+        if path.startswith('/api/v3/'):
+            self._degrade(path)
+            return 200, self._binance(parts[2], q)
+        # Alpaca data
+        if path.startswith('/v2/stocks/') and path.endswith('/bars'):
+            self._degrade('/v2/stocks/bars')
+            return 200, {'bars': self._alpaca_bars(parts[2], q), 'symbol': parts[2], 'next_page_token': None}
+        if path == '/v1beta3/crypto/us/bars':
+            self._degrade('/v1beta3/crypto/us/bars')
+            return 200, {'bars': {s: self._alpaca_bars(s, q) for s in q['symbols'].split(',')},
+                         'next_page_token': None}
+        # Alpaca trading
+        self._degrade(f"{method} /{'/'.join(parts[:2])}")
+        if path == '/v2/account':
+            return 200, broker.account()
+        if path == '/v2/positions' and method == 'GET':
+            return 200, broker.list_positions()
+        if parts[:2] == ['v2', 'positions'] and len(parts) == 3:
+            if method == 'DELETE':
+                return 200, broker.close_position(parts[2])
+            return 200, broker.get_position(parts[2])
+        if path == '/v2/orders:by_client_order_id':
+            order = broker.by_client_id.get(q.get('client_order_id'))
+            if order is None:
+                raise ApiError(404, "order not found", 40410000)
+            return 200, order
+        if path == '/v2/orders':
+            if method == 'POST':
+                return 200, broker.submit(body)
+            return 200, broker.list_orders(q.get('status'), q.get('symbols'), q.get('nested') in ('true', 'True'))
+        if parts[:2] == ['v2', 'orders'] and len(parts) == 3:
+            if method == 'DELETE':
+                broker.cancel(parts[2])
+                return 204, None
+            order = broker.orders.get(parts[2])
+            if order is None:
+                raise ApiError(404, "order not found", 40410000)
+            return 200, order
+        raise ApiError(404, f"route inconnue : {method} {path}", 40400000)
+
+    def _alpaca_bars(self, symbol, q):
+        rows = self.market.window(symbol, q.get('timeframe', '1Hour'), _parse_time(q.get('start')),
+                                  _parse_time(q.get('end')), int(q.get('limit') or 1000))
+        return [{'t': _iso(t), 'o': o, 'h': h, 'l': l, 'c': c, 'v': v} for t, o, h, l, c, v in rows]
+
+    def _binance(self, endpoint, q):
+        if endpoint == 'time':
+            return {'serverTime': now_ms()}
+        if endpoint == 'exchangeInfo':
+            return {'timezone': 'UTC', 'serverTime': now_ms(), 'rateLimits': [], 'symbols': [
+                {'symbol': pair.replace('/', ''), 'status': 'TRADING', 'baseAsset': pair.split('/')[0],
+                 'quoteAsset': pair.split('/')[1], 'baseAssetPrecision': 8, 'quotePrecision': 8,
+                 'quoteAssetPrecision': 8, 'orderTypes': ['LIMIT', 'MARKET'], 'isSpotTradingAllowed': True,
+                 'isMarginTradingAllowed': False, 'permissions': ['SPOT'], 'filters': []}
+                for pair in self.pairs]}
+        if endpoint == 'klines':
+            symbol = next((p for p in self.pairs if p.replace('/', '') == q['symbol']), q['symbol'])
+            tf = timeframe_ms(q['interval'])
+            rows = self.market.window(symbol, q['interval'], _parse_time(q.get('startTime')),
+                                      _parse_time(q.get('endTime')), int(q.get('limit') or 500))
+            return [[t, str(o), str(h), str(l), str(c), str(v), t + tf - 1, str(v * c), 1, "0", "0", "0"]
+                    for t, o, h, l, c, v in rows]
+        raise ApiError(404, f"endpoint Binance inconnu : {endpoint}", 40400000)
+
+    # --- SERVEUR HTTP ---
+    def serve(self, port=8765, host="127.0.0.1", background=False):
+        exchange = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive : les clients réutilisent leurs connexions
+            disable_nagle_algorithm = True # En-têtes et corps envoyés séparément : pas d'attente de 40 ms (ACK retardé)
+
+            def _handle(self, method):
+                url = urlparse(self.path)
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                try:
+                    status, payload = exchange.route(method, url.path, parse_qs(url.query), body)
+                except ApiError as e:
+                    status, payload = e.status, {'code': e.code, 'message': str(e)}
+                except (KeyError, ValueError) as e:
+                    status, payload = 422, {'code': 42200000, 'message': f"requête invalide : {e}"}
+                except Exception as e:
+                    print(f"❌ {method} {self.path} : {e!r}")
+                    status, payload = 500, {'code': 50000000, 'message': repr(e)}
+                data = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+            def do_DELETE(self):
+                self._handle('DELETE')
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        url = f"http://{host}:{self.server.server_address[1]}"
+        print(f"🧪 Faux exchange sur {url} (latence {self.latency * 1000:.0f} ms, erreurs {self.error_rate:.1%}, "
+              f"limite {self.bucket.rate if self.bucket else 0:.0f} req/s)", flush=True)
+        if background:
+            threading.Thread(target=self.server.serve_forever, name="mock-exchange", daemon=True).start()
+        else:
+            self.server.serve_forever()
+        return url
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765, help="Port local d'écoute")
+    parser.add_argument("--latency", type=float, default=0, help="Latence fixe par requête (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="Latence supplémentaire moyenne, loi exponentielle (ms)")
+    parser.add_argument("--error-rate", type=float, default=0, help="Part des requêtes en erreur 503 (0 à 1)")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Requêtes par seconde avant 429 (0 = illimité)")
+    parser.add_argument("--burst", type=int, help="Rafale autorisée par la limite de débit (défaut : 1 seconde)")
+    parser.add_argument("--net-reversal", action="store_true", help="Accepter les ordres qui traversent zéro")
+    parser.add_argument("--cancel-delay", type=float, default=100, help="Délai avant qu'une annulation libère la quantité (ms)")
+    parser.add_argument("--pairs", type=str, default=",".join(BINANCE_PAIRS), help="Paires Binance publiées")
+    args = parser.parse_args()
+    try:
+        MockExchange(args.latency, args.jitter, args.error_rate, args.rate_limit, args.burst,
+                     args.net_reversal, args.pairs.split(","), cancel_delay=args.cancel_delay).serve(args.port)
+    except KeyboardInterrupt:
+        print("🛑 Faux exchange arrêté")
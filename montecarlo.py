@@ -0,0 +1,135 @@
+import os
+from multiprocessing import Pool
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# MONTE CARLO SUR LES TRADES D'UN BACKTEST
+# ==========================================
+# À partir des trades clôturés (_trades de backtesting.py ou du moteur vectorisé) :
+# - rendement de chaque trade sur le capital du moment (PnL / équité avant le trade)
+# - 'bootstrap' : séquences tirées avec remise (le rendement final varie)
+#   'shuffle'   : permutations de l'ordre réel (rendement final identique, seul le chemin change)
+# Toutes les trajectoires d'un bloc forment une matrice NumPy (trajectoires x trades) : aucune boucle Python par trade.
+# Les gros volumes sont traités par blocs (mémoire bornée), éventuellement sur plusieurs processus.
+
+DEFAULT_PATHS = 100_000
+CHUNK_CELLS = 5_000_000 # Trajectoires x trades par bloc (~ 40 Mo par matrice)
+BAND_CELLS = 2_000_000 # Trajectoires x trades conservées pour les bandes de confiance
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def trade_returns(trades, cash=1000000):
+    """Trades clôturés (colonne PnL, ordre chronologique) -> rendement de chaque trade sur l'équité avant le trade"""
+    pnl = np.asarray(trades['PnL'] if isinstance(trades, pd.DataFrame) else trades, dtype=float)
+    before = cash + np.concatenate(([0.0], np.cumsum(pnl)[:-1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.where(before > 0, pnl / before, -1.0)
+    return np.maximum(returns, -1.0)
+
+
+def _simulate_chunk(task):
+    """Un bloc de trajectoires -> (rendements finaux, drawdowns max, ruine, log-équité conservée pour les bandes)"""
+    returns, paths, method, ruin, seed, keep = task
+    rng = np.random.default_rng(seed)
+    n = len(returns)
+    # Tout est calculé en log-équité (0 = capital de départ) : cumsum au lieu de cumprod, exp seulement sur les résultats.
+    # Une perte totale (-100%) laisse une équité ~1e-12 : la trajectoire est ruinée et le reste.
+    log_returns = np.log1p(np.maximum(returns, -1 + 1e-12))
+    if method == 'bootstrap':
+        log_equity = log_returns[rng.integers(0, n, size=(paths, n), dtype=np.int32)]
+    else:
+        log_equity = rng.permuted(np.broadcast_to(log_returns, (paths, n)), axis=1)
+    np.cumsum(log_equity, axis=1, out=log_equity)
+
+    # Drawdown : écart au plus haut précédent (le capital de départ compte comme plus haut)
+    gap = np.maximum.accumulate(log_equity, axis=1)
+    np.maximum(gap, 0, out=gap)
+    np.subtract(log_equity, gap, out=gap)
+    max_dd = -np.expm1(np.minimum(gap.min(axis=1), 0))
+    del gap
+
+    lowest = np.minimum(log_equity.min(axis=1), 0)
+    return np.expm1(log_equity[:, -1]), max_dd, lowest <= np.log(ruin), log_equity[:keep].copy() if keep else None
+
+
+def monte_carlo(trades, cash=1000000, paths=DEFAULT_PATHS, method='bootstrap', ruin=0.5, seed=42,
+                chunk_cells=CHUNK_CELLS, processes=1, band_cells=BAND_CELLS):
+    """
+    Analyse de robustesse d'une série de trades.
+    `trades` : DataFrame _trades (colonne PnL) ou tableau de PnL ; `ruin` : ruine si l'équité passe
+    sous cette fraction du capital de départ (0.5 = -50%). Mémoire bornée par `chunk_cells` (trajectoires x trades
+    par bloc) ; processes > 1 répartit les blocs sur un pool.
+    Renvoie un dict : 'paths', 'trades', 'return_pct' / 'max_drawdown_pct' (percentiles), 'mean_return_pct',
+    'prob_ruin', 'prob_loss' et 'bands' (DataFrame : équité en $ par numéro de trade, percentiles 5 / 50 / 95).
+    """
+    if method not in ('bootstrap', 'shuffle'):
+        raise ValueError(f"❌ Méthode inconnue : {method} (bootstrap ou shuffle)")
+    returns = trade_returns(trades, cash)
+    if not len(returns):
+        return None
+
+    # Graines dérivées par bloc : résultat identique quel que soit le nombre de processus
+    chunk = max(1, chunk_cells // len(returns))
+    band_paths = max(1000, band_cells // len(returns))
+    sizes = [min(chunk, paths - lo) for lo in range(0, paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = []
+    kept = 0
+    for size, child in zip(sizes, seeds):
+        keep = min(size, band_paths - kept)
+        kept += keep
+        tasks.append((returns, size, method, ruin, child, keep))
+
+    if processes and processes > 1 and len(tasks) > 1:
+        with Pool(min(processes, len(tasks))) as pool:
+            parts = pool.map(_simulate_chunk, tasks)
+    else:
+        parts = [_simulate_chunk(task) for task in tasks]
+
+    final = np.concatenate([p[0] for p in parts])
+    max_dd = np.concatenate([p[1] for p in parts])
+    ruined = np.concatenate([p[2] for p in parts])
+    sample = np.concatenate([p[3] for p in parts if p[3] is not None])
+
+    # Percentiles en log puis exp (transformation monotone) ; colonne 0 = avant le premier trade
+    band = np.exp(np.percentile(sample, (5, 50, 95), axis=0)) * cash
+    band = np.hstack((np.full((3, 1), float(cash)), band))
+    return {
+        'paths': paths,
+        'trades': len(returns),
+        'method': method,
+        'return_pct': dict(zip(PERCENTILES, np.percentile(final, PERCENTILES) * 100)),
+        'mean_return_pct': final.mean() * 100,
+        'max_drawdown_pct': dict(zip(PERCENTILES, np.percentile(max_dd, PERCENTILES) * 100)),
+        'prob_ruin': ruined.mean(),
+        'prob_loss': (final < 0).mean(),
+        'bands': pd.DataFrame({'p5': band[0], 'p50': band[1], 'p95': band[2]},
+                              index=pd.RangeIndex(len(returns) + 1, name='trade')),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, default=20_000, help="Bougies synthétiques du backtest")
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS, help="Nombre de trajectoires")
+    parser.add_argument("--method", choices=("bootstrap", "shuffle"), default="bootstrap")
+    parser.add_argument("--processes", type=int, default=1, help="Processus pour les blocs (1 = en ligne, 0 = tous les cœurs)")
+    import profiling
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    from synthetic import generate_ohlcv
+    from engine import TradingEngine
+    stats, _ = TradingEngine("SYNTH").run_backtest(generate_ohlcv(args.bars), mode="vector")
+    start = time.perf_counter()
+    with profiling.maybe(profiling.from_args(args, "montecarlo"), "run"):
+        result = monte_carlo(stats['_trades'], paths=args.paths, method=args.method,
+                             processes=args.processes or os.cpu_count())
+    elapsed = time.perf_counter() - start
+    print(f"🎲 {result['paths']} trajectoires x {result['trades']} trades ({result['method']}) en {elapsed:.2f}s")
+    print(f"📈 Rendement : médiane {result['return_pct'][50]:.1f}% | 5% {result['return_pct'][5]:.1f}% | 95% {result['return_pct'][95]:.1f}%")
+    print(f"📉 Drawdown max : médiane {result['max_drawdown_pct'][50]:.1f}% | 95% {result['max_drawdown_pct'][95]:.1f}%")
+    print(f"💀 Probabilité de ruine : {result['prob_ruin']:.2%} | de perte : {result['prob_loss']:.2%}")
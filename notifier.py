@@ -0,0 +1,198 @@
+import os
+import queue
+import threading
+import time
+import atexit
+import requests
+from requests.adapters import HTTPAdapter
+
+# ==========================================
+# NOTIFICATIONS NON BLOQUANTES (TELEGRAM)
+# ==========================================
+# La boucle de trading ne fait qu'un put_nowait dans une file bornée.
+# Un thread dédié envoie les messages :
+# - session HTTP réutilisée (keep-alive), timeout explicite
+# - regroupement des rafales (plusieurs symboles qui signalent en même temps = un seul message)
+# - nouvel essai avec recul exponentiel (réseau, 5xx), respect du `retry_after` renvoyé par Telegram (HTTP 429) ;
+#   un refus définitif (4xx : Markdown invalide, bot bloqué) est journalisé et le message abandonné
+# - message trop long découpé en morceaux de MAX_MESSAGE_LEN caractères au plus
+# Le transport est interchangeable : TELEGRAM_API_URL peut pointer vers un faux serveur local.
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+MAX_MESSAGE_LEN = 4096 # Limite Telegram par message
+
+
+def split_message(message, limit=MAX_MESSAGE_LEN):
+    """Découpe un message en morceaux de `limit` caractères au plus, de préférence sur un saut de ligne"""
+    chunks = []
+    while len(message) > limit:
+        cut = message.rfind("\n", 0, limit + 1)
+        if cut <= 0:
+            cut = limit
+        chunks.append(message[:cut])
+        message = message[cut:].lstrip("\n")
+    return chunks + [message]
+
+
+def _permanent(error):
+    """Refus définitif de Telegram (4xx hors 429) : inutile de réessayer"""
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Limite de débit, réessayer dans {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TelegramTransport:
+    def __init__(self, token, chat_id, base_url=TELEGRAM_API_URL, timeout=10, parse_mode="Markdown"):
+        self.url = f"{base_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.timeout = timeout
+        self.parse_mode = parse_mode
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+    def send(self, text):
+        data = {"chat_id": self.chat_id, "text": text}
+        if self.parse_mode:
+            data["parse_mode"] = self.parse_mode
+        response = self.session.post(self.url, data=data, timeout=self.timeout)
+        if response.status_code == 429:
+            try:
+                retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+            except ValueError:
+                retry_after = 1
+            raise RateLimited(retry_after)
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+class MemoryTransport:
+    """Transport factice : garde les messages en mémoire (tests, mode sans Telegram)"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, text):
+        self.sent.append(text)
+
+    def close(self):
+        pass
+
+
+class Notifier:
+    def __init__(self, transport, max_queue=100, batch_window=1.0, max_batch=20,
+                 min_interval=1.0, max_retries=5, backoff=1.0):
+        self.transport = transport
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.min_interval = min_interval # Telegram : ~1 message/s par conversation
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.dropped = 0
+        self._last_send = 0.0
+        self._pending = None # Message repoussé au lot suivant (limite de taille)
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def notify(self, message):
+        """Ne bloque jamais : si la file est pleine, le message est abandonné (et compté)"""
+        try:
+            for chunk in split_message(message):
+                self.queue.put_nowait(chunk)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout=5.0):
+        """Vide la file (dans la limite de `timeout`) puis arrête le thread"""
+        if self._thread.is_alive():
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+        self.transport.close()
+
+    # --- THREAD D'ENVOI ---
+    def _collect(self, first):
+        """Regroupe les messages arrivés pendant `batch_window` ; None = arrêt demandé"""
+        batch, size, stop = [first], len(first), False
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if message is None:
+                stop = True
+                break
+            # Au-delà de la limite Telegram, le message part dans le lot suivant
+            if size + len(message) + 2 > MAX_MESSAGE_LEN:
+                self._pending = message
+                break
+            batch.append(message)
+            size += len(message) + 2
+        return "\n\n".join(batch), stop
+
+    def _send(self, text):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            wait = self._last_send + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                self.transport.send(text)
+                self._last_send = time.monotonic()
+                return True
+            except RateLimited as e:
+                self._last_send = time.monotonic()
+                time.sleep(e.retry_after)
+            except Exception as e:
+                if _permanent(e):
+                    print(f"❌ Message refusé par Telegram, abandonné : {e}")
+                    return False
+                if attempt == self.max_retries:
+                    print(f"❌ Erreur envoi Telegram : {e}")
+                    return False
+                time.sleep(delay)
+                delay *= 2
+        return False
+
+    def _run(self):
+        while True:
+            if self._pending is not None:
+                message, self._pending = self._pending, None
+            else:
+                message = self.queue.get()
+            if message is None:
+                return
+            text, stop = self._collect(message)
+            if self._send(text):
+                print("📩 Notification envoyée !")
+            if stop:
+                # Derniers messages éventuellement laissés de côté par le découpage
+                if self._pending is not None:
+                    self._send(self._pending)
+                return
+
+
+def telegram_notifier(token=None, chat_id=None, **kwargs):
+    """Notifier Telegram depuis le .env ; None si les identifiants sont absents"""
+    token = token or os.getenv("TELEGRAM_BOT_TOKEN")
+    chat_id = chat_id or os.getenv("TELEGRAM_CHAT_ID")
+    if not (token and chat_id):
+        return None
+    return Notifier(TelegramTransport(token, chat_id), **kwargs)
@@ -0,0 +1,205 @@
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+
+try:
+    import fcntl # Verrou de fichier (Linux / macOS), plusieurs bots peuvent partager le cache
+except ImportError:
+    fcntl = None
+
+# ==========================================
+# CACHE LOCAL OHLCV (FICHIERS MEMORY-MAPPED)
+# ==========================================
+# Un fichier binaire par (source, symbole, timeframe) : data_cache/<source>/<timeframe>/<symbole>.bin
+# - Une bougie = un enregistrement de taille fixe (BAR_DTYPE), horodatage en millisecondes UTC
+# - On n'ajoute QUE les bougies clôturées postérieures à la dernière stockée (delta)
+# - La lecture se fait via np.memmap : aucune copie ni parsing
+# - pandas n'est chargé que pour les conversions DataFrame (backtests, Alpaca, Yahoo)
+
+BAR_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+# Durée d'une bougie en millisecondes (formats ccxt / yfinance / Alpaca)
+TIMEFRAME_MS = {
+    '1m': 60_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000,
+    '1Min': 60_000, '5Min': 300_000, '15Min': 900_000, '30Min': 1_800_000,
+    '1Hour': 3_600_000, '4Hour': 14_400_000, '1Day': 86_400_000,
+}
+
+DEFAULT_ROOT = Path(os.getenv("OHLCV_CACHE_DIR", Path(__file__).parent / "data_cache"))
+
+
+def timeframe_ms(timeframe):
+    # Accepte aussi les objets TimeFrame d'Alpaca (str(TimeFrame.Hour) == '1Hour')
+    return TIMEFRAME_MS[str(timeframe)]
+
+def now_ms():
+    return int(time.time() * 1000)
+
+# Alpaca renvoie parfois 'c', 'h', 'l', 'o', 'v'
+SHORT_COLUMNS = {'c': 'close', 'h': 'high', 'l': 'low', 'o': 'open', 'v': 'volume'}
+
+def frame_to_bars(df):
+    """DataFrame (index datetime, colonnes open/high/low/close/volume, casse libre) -> tableau BAR_DTYPE"""
+    import pandas as pd
+    columns = {SHORT_COLUMNS.get(c.lower(), c.lower()): c for c in df.columns}
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_convert('UTC').tz_localize(None)
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    bars['timestamp'] = index.as_unit('ms').asi8
+    for name in ('open', 'high', 'low', 'close', 'volume'):
+        bars[name] = df[columns[name]].to_numpy(dtype=float) if name in columns else np.nan
+    return bars
+
+def bars_to_frame(bars):
+    """Tableau BAR_DTYPE -> DataFrame au format backtesting.py (Open, High, Low, Close, Volume)"""
+    import pandas as pd
+    index = pd.to_datetime(np.asarray(bars['timestamp']), unit='ms')
+    return pd.DataFrame({
+        'Open': bars['open'], 'High': bars['high'], 'Low': bars['low'],
+        'Close': bars['close'], 'Volume': bars['volume'],
+    }, index=index)
+
+
+class OHLCVCache:
+    def __init__(self, root=None):
+        self.root = Path(root) if root else DEFAULT_ROOT
+
+    def path(self, source, symbol, timeframe):
+        safe_symbol = symbol.replace("/", "-").replace(":", "-")
+        return self.root / source / str(timeframe) / f"{safe_symbol}.bin"
+
+    # --- LECTURE ---
+    def read(self, source, symbol, timeframe):
+        """Toutes les bougies stockées, en lecture seule et sans copie (np.memmap)"""
+        path = self.path(source, symbol, timeframe)
+        if not path.exists() or path.stat().st_size < BAR_DTYPE.itemsize:
+            return np.empty(0, dtype=BAR_DTYPE)
+        count = path.stat().st_size // BAR_DTYPE.itemsize
+        return np.memmap(path, dtype=BAR_DTYPE, mode='r', shape=(count,))
+
+    def rows_after(self, source, symbol, timeframe, timestamp=None):
+        """Bougies stockées strictement postérieures à `timestamp` (vue sans copie)"""
+        data = self.read(source, symbol, timeframe)
+        if timestamp is None or not len(data):
+            return data
+        return data[np.searchsorted(data['timestamp'], timestamp, side='right'):]
+
+    def last_timestamp(self, source, symbol, timeframe):
+        data = self.read(source, symbol, timeframe)
+        return int(data['timestamp'][-1]) if len(data) else None
+
+    def frame(self, source, symbol, timeframe, since=None):
+        """DataFrame pour les backtests ; `since` = datetime ou horodatage ms"""
+        if isinstance(since, datetime):
+            since = int(since.replace(tzinfo=since.tzinfo or timezone.utc).timestamp() * 1000) - 1
+        return bars_to_frame(self.rows_after(source, symbol, timeframe, since))
+
+    # --- ÉCRITURE ---
+    def append(self, source, symbol, timeframe, bars):
+        """Ajoute les bougies plus récentes que la dernière stockée. Renvoie le nombre de bougies ajoutées."""
+        bars = np.asarray(bars, dtype=BAR_DTYPE)
+        if not len(bars):
+            return 0
+        path = self.path(source, symbol, timeframe)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'ab') as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # Relu sous verrou : un autre bot a peut-être déjà écrit ces bougies
+                last = self.last_timestamp(source, symbol, timeframe)
+                if last is not None:
+                    bars = bars[bars['timestamp'] > last]
+                bars = np.sort(bars, order='timestamp')
+                f.write(bars.tobytes())
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return len(bars)
+
+    # --- MISE À JOUR INCRÉMENTALE DEPUIS LES SOURCES ---
+    def update_ccxt(self, exchange, symbol, timeframe='1h', limit=1000):
+        """
+        Télécharge uniquement les bougies postérieures au cache (paramètre `since` de ccxt).
+        Les bougies clôturées sont stockées ; la bougie en cours est renvoyée (ou None).
+        """
+        source = exchange.id
+        tf_ms = timeframe_ms(timeframe)
+        last = self.last_timestamp(source, symbol, timeframe)
+        since = None if last is None else last + tf_ms
+        forming = None
+        while True:
+            rows = exchange.fetch_ohlcv(symbol, timeframe, since=since, limit=limit)
+            now = now_ms()
+            closed = [r for r in rows if r[0] + tf_ms <= now]
+            if rows and rows[-1][0] + tf_ms > now:
+                forming = tuple(rows[-1])
+            if closed:
+                self.append(source, symbol, timeframe, [tuple(r[:6]) for r in closed])
+            # Page pleine : il reste peut-être de l'historique à rattraper
+            if len(rows) < limit or not closed:
+                return forming
+            since = closed[-1][0] + tf_ms
+
+    def update_alpaca(self, api, symbol, timeframe='1Hour', limit=200):
+        """Idem pour Alpaca : premier appel avec `limit`, puis uniquement depuis la dernière bougie (start)"""
+        tf_ms = timeframe_ms(timeframe)
+        last = self.last_timestamp('alpaca', symbol, timeframe)
+        kwargs = {'limit': limit}
+        if last is not None:
+            start = datetime.fromtimestamp((last + tf_ms) / 1000, tz=timezone.utc)
+            kwargs = {'start': start.isoformat().replace('+00:00', 'Z')}
+        if "/" in symbol:
+            df = api.get_crypto_bars(symbol, timeframe, **kwargs).df
+        else:
+            df = api.get_bars(symbol, timeframe, **kwargs).df
+        return self._store_frame('alpaca', symbol, timeframe, df)
+
+    def update_yfinance(self, symbol, interval='1h', period='60d'):
+        """Idem pour Yahoo : premier appel sur `period`, puis uniquement depuis la dernière bougie (start)"""
+        import pandas as pd
+        import yfinance as yf
+        last = self.last_timestamp('yfinance', symbol, interval)
+        if last is None:
+            df = yf.download(symbol, period=period, interval=interval, progress=False)
+        else:
+            start = datetime.fromtimestamp((last + timeframe_ms(interval)) / 1000, tz=timezone.utc)
+            df = yf.download(symbol, start=start, interval=interval, progress=False)
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        return self._store_frame('yfinance', symbol, interval, df.dropna())
+
+    def _store_frame(self, source, symbol, timeframe, df):
+        import pandas as pd
+        if df is None or df.empty:
+            return None
+        if isinstance(df.index, pd.MultiIndex):
+            # Alpaca multi-symboles : index (symbol, timestamp)
+            df = df.reset_index(level=0, drop=True)
+        bars = frame_to_bars(df)
+        is_closed = bars['timestamp'] + timeframe_ms(timeframe) <= now_ms()
+        self.append(source, symbol, timeframe, bars[is_closed])
+        return tuple(bars[~is_closed][-1].tolist()) if (~is_closed).any() else None
+
+    def window(self, source, symbol, timeframe, after=None):
+        """Bougies clôturées postérieures à `after` pour StreamingIndicators -> [(timestamp, high, low, close), ...]"""
+        rows = self.rows_after(source, symbol, timeframe, after)
+        return list(zip(rows['timestamp'].tolist(), rows['high'].tolist(), rows['low'].tolist(), rows['close'].tolist()))
+
+
+def hlc(bar):
+    """(timestamp, open, high, low, close, volume) -> (timestamp, high, low, close), None si pas de bougie"""
+    if bar is None:
+        return None
+    return (bar[0], bar[2], bar[3], bar[4])
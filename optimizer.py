@@ -0,0 +1,272 @@
+import itertools
+import os
+from multiprocessing import Pool, shared_memory
+import numpy as np
+import pandas as pd
+from indicators import ema, rsi, atr
+from vector_engine import simulate, quick_stats, TRADE_COLUMNS
+
+# ==========================================
+# OPTIMISATION PARALLÈLE DES PARAMÈTRES
+# ==========================================
+# - Les tableaux OHLC + toutes les colonnes d'indicateurs sont copiés UNE fois dans un bloc de mémoire partagée
+# - Chaque indicateur n'est calculé qu'une fois par longueur distincte, puis réutilisé par toutes les combinaisons
+# - Les workers s'attachent au bloc au démarrage et ne reçoivent ensuite que des dicts de paramètres
+
+RESULT_COLUMNS = ['Return [%]', 'Win Rate [%]', 'Profit Factor', '# Trades',
+                  'Max. Drawdown [%]', 'Equity Final [$]']
+
+# État du worker (rempli par _init_worker dans chaque processus)
+_worker = {}
+
+
+def _param_grid(grid, defaults, constraint=None):
+    names = list(grid)
+    for values in itertools.product(*(grid[name] for name in names)):
+        params = {**defaults, **dict(zip(names, values))}
+        if constraint is None or constraint(params):
+            yield params
+
+
+def _param_dtypes(grid, defaults):
+    """Type de chaque paramètre d'après ses valeurs (grille ou défaut) : les longueurs restent entières"""
+    return {name: np.asarray(grid.get(name, [value])).dtype for name, value in defaults.items()}
+
+
+class SharedColumns:
+    """Tableaux float64 stockés côte à côte dans un bloc multiprocessing.shared_memory"""
+
+    def __init__(self, columns):
+        names = list(columns)
+        n = len(next(iter(columns.values()))) if names else 0
+        self.layout = {name: row for row, name in enumerate(names)}
+        self.shape = (len(names), n)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, 8 * len(names) * n))
+        block = np.ndarray(self.shape, dtype=np.float64, buffer=self.shm.buf)
+        for name, row in self.layout.items():
+            block[row] = columns[name]
+        del block
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _indicator_columns(open_, high, low, close, grid, defaults):
+    """Calcule chaque indicateur une seule fois par longueur distincte"""
+    lengths = {key: set(grid.get(key, [defaults[key]])) for key in ('fast_len', 'slow_len', 'rsi_len', 'atr_len')}
+    columns = {'Open': open_, 'High': high, 'Low': low, 'Close': close}
+    for length in lengths['fast_len'] | lengths['slow_len']:
+        columns[('ema', length)] = ema(close, length)
+    for length in lengths['rsi_len']:
+        columns[('rsi', length)] = rsi(close, length)
+    for length in lengths['atr_len']:
+        columns[('atr', length)] = atr(high, low, close, length)
+    return columns
+
+
+def _init_worker(shm_name, shape, layout, cash, commission):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker['shm'] = shm # Garde le bloc attaché tant que le worker vit
+    _worker['columns'] = {name: block[row] for name, row in layout.items()}
+    _worker['cash'] = cash
+    _worker['commission'] = commission
+
+
+def _simulate_window(params, lo=0, hi=None):
+    """Simulation sur les bougies [lo, hi) du bloc partagé (tranches = vues, aucune copie)"""
+    columns = _worker['columns']
+    window = slice(lo, hi)
+    indicators = (
+        columns[('ema', params['fast_len'])][window],
+        columns[('ema', params['slow_len'])][window],
+        columns[('rsi', params['rsi_len'])][window],
+        columns[('atr', params['atr_len'])][window],
+    )
+    return simulate(columns['Open'][window], columns['High'][window], columns['Low'][window],
+                    columns['Close'][window], indicators, cash=_worker['cash'], commission=_worker['commission'],
+                    atr_mult=params['atr_mult'], tp_mult=params['tp_mult'])
+
+
+def _run_combination(params):
+    equity, trades, _ = _simulate_window(params)
+    return {**params, **quick_stats(equity, trades)}
+
+
+def optimize(df, grid, defaults, maximize='Return [%]', constraint=None,
+             processes=None, cash=1000000, commission=.0003, chunksize=None):
+    """
+    Teste toutes les combinaisons de `grid` (dict nom -> liste de valeurs) sur un pool de processus.
+    Les paramètres absents de la grille prennent la valeur de `defaults`.
+    Renvoie un DataFrame trié du meilleur au moins bon selon `maximize`.
+    Les colonnes de paramètres gardent le type de la grille : results.to_dict('records')[0] se passe
+    tel quel à strategy_params() (results.iloc[0] convertirait tout en float).
+    """
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"❌ Paramètres inconnus : {sorted(unknown)}")
+
+    open_ = df['Open'].to_numpy(dtype=float)
+    high = df['High'].to_numpy(dtype=float)
+    low = df['Low'].to_numpy(dtype=float)
+    close = df['Close'].to_numpy(dtype=float)
+
+    combinations = list(_param_grid(grid, defaults, constraint))
+    if not combinations:
+        return pd.DataFrame(columns=list(defaults) + RESULT_COLUMNS).astype(_param_dtypes(grid, defaults))
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = chunksize or max(1, len(combinations) // (processes * 8))
+
+    shared = SharedColumns(_indicator_columns(open_, high, low, close, grid, defaults))
+    try:
+        initargs = (shared.name, shared.shape, shared.layout, cash, commission)
+        with Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+            rows = pool.map(_run_combination, combinations, chunksize=chunksize)
+    finally:
+        shared.close()
+
+    results = pd.DataFrame(rows).astype(_param_dtypes(grid, defaults))
+    return results.sort_values(maximize, ascending=False, na_position='last').reset_index(drop=True)
+
+
+# ==========================================
+# WALK-FORWARD (OPTIMISATION GLISSANTE)
+# ==========================================
+# L'historique est découpé en folds entraînement / test consécutifs :
+# - rolling  : fenêtre d'entraînement de taille fixe qui glisse avec le test
+# - anchored : l'entraînement démarre toujours à la première bougie et s'allonge
+# Les meilleurs paramètres de chaque entraînement sont évalués sur le test qui suit (hors échantillon).
+# Un seul bloc partagé (OHLC + indicateurs sur tout l'historique, indicateurs causaux donc sans biais
+# de look-ahead) sert à tous les folds : les workers ne reçoivent que (fold, bornes, paramètres).
+
+def _advance(index, position, length, backward=False):
+    """Position atteinte en avançant (ou reculant) de `length` bougies (int) ou d'une durée ('90D', '4W'...)"""
+    if isinstance(length, (int, np.integer)):
+        return position - length if backward else position + length
+    delta = pd.Timedelta(length)
+    if backward:
+        return int(index.searchsorted(index[position] - delta))
+    if position >= len(index):
+        return len(index)
+    return int(index.searchsorted(index[position] + delta))
+
+
+def walk_forward_folds(index, train, test, anchored=False):
+    """
+    Bornes des folds [(train_lo, train_hi, test_lo, test_hi), ...] sur un DatetimeIndex.
+    `train` / `test` : nombre de bougies ou durée pandas ('365D'). Le dernier test peut être plus court.
+    """
+    n = len(index)
+    folds = []
+    test_lo = _advance(index, 0, train)
+    while test_lo < n - 1:
+        test_hi = min(n, max(test_lo + 1, _advance(index, test_lo, test)))
+        train_lo = 0 if anchored else max(0, _advance(index, test_lo, train, backward=True))
+        folds.append((train_lo, test_lo, test_lo, test_hi))
+        test_lo = test_hi
+    return folds
+
+
+def _run_train(task):
+    fold, lo, hi, params = task
+    equity, trades, _ = _simulate_window(params, lo, hi)
+    return fold, params, quick_stats(equity, trades)
+
+
+def _run_test(task):
+    fold, lo, hi, params = task
+    equity, trades, _ = _simulate_window(params, lo, hi)
+    return fold, equity, trades, quick_stats(equity, trades)
+
+
+def _best(rows, maximize):
+    """Meilleure combinaison d'un fold (NaN classés en dernier)"""
+    ranked = sorted(rows, key=lambda row: (np.isnan(row[1][maximize]), -np.nan_to_num(row[1][maximize])))
+    return ranked[0]
+
+
+def walk_forward(df, grid, defaults, train, test, anchored=False, maximize='Return [%]', constraint=None,
+                 processes=None, cash=1000000, commission=.0003, chunksize=None):
+    """
+    Optimise `grid` sur chaque fenêtre d'entraînement puis évalue les meilleurs paramètres sur le test suivant.
+    Toutes les combinaisons de tous les folds passent dans le même pool de processus.
+    Renvoie un dict :
+    - 'folds'  : DataFrame, une ligne par fold (dates, paramètres retenus, stats d'entraînement et de test)
+    - 'equity' : équité hors échantillon recollée (Series) ; chaque test repart du capital de fin du précédent,
+                 une position encore ouverte en fin de test est valorisée à la dernière clôture
+    - 'trades' : trades hors échantillon (indices de bougies sur tout l'historique, PnL à l'échelle recollée)
+    - 'stats'  : statistiques de classement (quick_stats) de l'ensemble hors échantillon
+    """
+    unknown = set(grid) - set(defaults)
+    if unknown:
+        raise ValueError(f"❌ Paramètres inconnus : {sorted(unknown)}")
+
+    folds = walk_forward_folds(df.index, train, test, anchored)
+    if not folds:
+        raise ValueError("❌ Historique trop court pour un fold entraînement + test")
+    combinations = list(_param_grid(grid, defaults, constraint))
+    if not combinations:
+        raise ValueError("❌ Aucune combinaison de paramètres (contrainte trop stricte ?)")
+
+    open_ = df['Open'].to_numpy(dtype=float)
+    high = df['High'].to_numpy(dtype=float)
+    low = df['Low'].to_numpy(dtype=float)
+    close = df['Close'].to_numpy(dtype=float)
+
+    train_tasks = [(k, lo, hi, params) for k, (lo, hi, _, _) in enumerate(folds) for params in combinations]
+    processes = processes or os.cpu_count() or 1
+    chunksize = chunksize or max(1, len(train_tasks) // (processes * 8))
+
+    shared = SharedColumns(_indicator_columns(open_, high, low, close, grid, defaults))
+    try:
+        initargs = (shared.name, shared.shape, shared.layout, cash, commission)
+        with Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+            by_fold = {}
+            for fold, params, stats in pool.imap_unordered(_run_train, train_tasks, chunksize=chunksize):
+                by_fold.setdefault(fold, []).append((params, stats))
+            best = {fold: _best(rows, maximize) for fold, rows in by_fold.items()}
+            test_tasks = [(k, test_lo, test_hi, best[k][0]) for k, (_, _, test_lo, test_hi) in enumerate(folds)]
+            tested = sorted(pool.map(_run_test, test_tasks), key=lambda row: row[0])
+    finally:
+        shared.close()
+
+    # Recollage : l'équité de chaque test est remise à l'échelle du capital atteint à la fin du précédent
+    capital = float(cash)
+    equity_parts, trade_parts, rows = [], [], []
+    for (fold, equity, trades, stats), (train_lo, train_hi, test_lo, test_hi) in zip(tested, folds):
+        scale = capital / cash
+        equity_parts.append(equity * scale)
+        trades = trades.copy()
+        trades[:, [TRADE_COLUMNS.index('EntryBar'), TRADE_COLUMNS.index('ExitBar')]] += test_lo
+        for column in ('Size', 'PnL', 'Commission'):
+            trades[:, TRADE_COLUMNS.index(column)] *= scale
+        trade_parts.append(trades)
+        params, train_stats = best[fold]
+        rows.append({
+            'fold': fold,
+            'train_start': df.index[train_lo], 'train_end': df.index[train_hi - 1],
+            'test_start': df.index[test_lo], 'test_end': df.index[test_hi - 1],
+            **{name: params[name] for name in defaults},
+            **{f"Train {key}": value for key, value in train_stats.items()},
+            **{f"Test {key}": value for key, value in stats.items()},
+        })
+        capital = equity[-1] * scale
+
+    first_test = folds[0][2]
+    equity = pd.Series(np.concatenate(equity_parts), index=df.index[first_test:folds[-1][3]], name='Equity')
+    trades = np.concatenate(trade_parts)
+    trades_df = pd.DataFrame(trades, columns=TRADE_COLUMNS).astype({'EntryBar': int, 'ExitBar': int})
+    trades_df['EntryTime'] = df.index[trades_df['EntryBar'].to_numpy()]
+    trades_df['ExitTime'] = df.index[trades_df['ExitBar'].to_numpy()]
+    return {
+        'folds': pd.DataFrame(rows).astype(_param_dtypes(grid, defaults)),
+        'equity': equity,
+        'trades': trades_df,
+        'stats': quick_stats(equity.to_numpy(), trades),
+    }
@@ -0,0 +1,237 @@
+import numpy as np
+import pandas as pd
+import strategy
+from vector_engine import SIZE_FRACTION, quick_stats
+
+# ==========================================
+# BACKTEST DE PORTEFEUILLE MULTI-ACTIFS (UNE SEULE PASSE)
+# ==========================================
+# Les N symboles sont alignés sur un index de temps commun : tableaux 2-D (bougies x symboles).
+# Les règles de BotStrategy (noyau strategy.py) s'appliquent à tous les symboles à la fois :
+# - indicateurs et signaux calculés une fois par symbole, sur ses propres bougies (une action n'a pas de nuit)
+# - une seule boucle sur le temps, chaque étape traite les N symboles avec des opérations NumPy
+# - signal à la clôture, entrée à l'ouverture suivante, SL / TP / trailing stop comme vector_engine.simulate
+# - capital partagé : chaque entrée reçoit poids x équité du portefeuille x 95%, commission à l'entrée et à la sortie
+# Bougie absente pour un symbole (marché fermé, historique plus court) : pas d'ordre, valorisation à la dernière clôture ;
+# un signal attend la prochaine bougie de son symbole (check_mixed_grid : grilles :00 / :30 mélangées).
+
+TRADE_COLUMNS = ['Symbol', 'Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice', 'SL', 'TP',
+                 'PnL', 'Commission', 'ReturnPct']
+
+
+def align(frames):
+    """
+    {symbole: DataFrame OHLC} -> (index commun, symboles, dict de tableaux 2-D Open/High/Low/Close).
+    Les bougies manquantes d'un symbole valent NaN.
+    """
+    symbols = list(frames)
+    index = frames[symbols[0]].index
+    for symbol in symbols[1:]:
+        index = index.union(frames[symbol].index)
+    columns = {}
+    for name in ('Open', 'High', 'Low', 'Close'):
+        columns[name] = np.column_stack([
+            frames[symbol][name].reindex(index).to_numpy(dtype=float) for symbol in symbols
+        ])
+    return index, symbols, columns
+
+
+def _signals(high, low, close, params):
+    """Signal et ATR d'un symbole sur la grille commune (calculés sur ses seules bougies présentes)"""
+    n = len(close)
+    signal = np.zeros(n, dtype=np.int8)
+    atr_values = np.full(n, np.nan)
+    present = np.flatnonzero(~np.isnan(close))
+    if not len(present):
+        return signal, atr_values
+    columns = strategy.compute(high[present], low[present], close[present],
+                               params['fast_len'], params['slow_len'], params['rsi_len'], params['atr_len'])
+    indicators = [columns[name] for name in ('EMA_Fast', 'EMA_Slow', 'RSI', 'ATR')]
+    # Chauffe identique à vector_engine.simulate (backtesting.py)
+    warmup = max(int(np.isnan(ind).argmin()) for ind in indicators)
+    own = columns['signal'].astype(np.int8)
+    own[:1 + warmup] = strategy.FLAT
+    signal[present] = own
+    atr_values[present] = columns['ATR']
+    return signal, atr_values
+
+
+def run_portfolio_backtest(frames, weights=None, cash=1000000, commission=.0003, fractional=True,
+                           atr_mult=strategy.ATR_MULT_SL, tp_mult=strategy.TP_MULT, fast_len=strategy.EMA_FAST,
+                           slow_len=strategy.EMA_SLOW, rsi_len=strategy.RSI_LEN, atr_len=strategy.ATR_LEN):
+    """
+    Backtest de BotStrategy sur plusieurs symboles avec un capital commun.
+    `weights` : {symbole: poids} (somme <= 1), équipondéré par défaut.
+    `fractional` : quantités fractionnaires (crypto) ; False = unités entières comme backtesting.py.
+    Renvoie un dict : 'equity' (Series), 'trades' (DataFrame), 'per_symbol' (DataFrame), 'stats' (quick_stats).
+    """
+    index, symbols, data = align(frames)
+    open_, high, low, close = data['Open'], data['High'], data['Low'], data['Close']
+    n, count = close.shape
+    if weights is None:
+        weight = np.full(count, 1.0 / count)
+    else:
+        weight = np.array([weights.get(symbol, 0.0) for symbol in symbols], dtype=float)
+    if weight.sum() > 1 + 1e-9:
+        raise ValueError(f"❌ La somme des poids dépasse 1 ({weight.sum():.2f})")
+
+    params = {'fast_len': fast_len, 'slow_len': slow_len, 'rsi_len': rsi_len, 'atr_len': atr_len}
+    signal = np.zeros((n, count), dtype=np.int8)
+    atr_values = np.empty((n, count))
+    for j in range(count):
+        signal[:, j], atr_values[:, j] = _signals(high[:, j], low[:, j], close[:, j], params)
+    last_close = pd.DataFrame(close).ffill().to_numpy()
+    trail_long = close - strategy.TRAIL_MULT * atr_values
+    trail_short = close + strategy.TRAIL_MULT * atr_values
+
+    # État par symbole
+    size = np.zeros(count)
+    entry_price = np.zeros(count)
+    entry_bar = np.zeros(count, dtype=np.int64)
+    entry_commission = np.zeros(count)
+    stop = np.full(count, np.nan)
+    target = np.full(count, np.nan)
+    pending = np.zeros(count, dtype=np.int8) # Direction à exécuter à l'ouverture suivante
+    pending_sl = np.full(count, np.nan)
+    pending_tp = np.full(count, np.nan)
+
+    balance = float(cash)
+    equity = np.full(n, np.nan)
+    rows = []
+    for t in range(n):
+        traded = ~np.isnan(open_[t])
+
+        # 1. Entrées au marché à l'ouverture (ordres du signal de la veille)
+        enter = (pending != 0) & traded
+        if enter.any():
+            price = open_[t, enter]
+            budget = np.maximum(0, weight[enter] * equity[t - 1] * SIZE_FRACTION)
+            units = budget / (price * (1 + commission))
+            if not fractional:
+                units = np.floor(units)
+            fill = np.flatnonzero(enter)[units > 0]
+            units = units[units > 0]
+            size[fill] = units * pending[fill]
+            entry_price[fill] = open_[t, fill]
+            entry_bar[fill] = t
+            entry_commission[fill] = units * open_[t, fill] * commission
+            stop[fill] = pending_sl[fill]
+            target[fill] = pending_tp[fill]
+            balance -= (size[fill] * open_[t, fill]).sum() + entry_commission[fill].sum()
+        # Un ordre attend la prochaine bougie DE SON symbole (grilles décalées, nuits, week-ends)
+        pending[enter] = 0
+
+        # 2. Sorties : SL (prioritaire) ou TP touché dans la bougie
+        is_long = size > 0
+        is_short = size < 0
+        if is_long.any() or is_short.any():
+            sl_hit = traded & ((is_long & (low[t] <= stop)) | (is_short & (high[t] >= stop)))
+            tp_hit = traded & ~sl_hit & ((is_long & (high[t] >= target)) | (is_short & (low[t] <= target)))
+            out = sl_hit | tp_hit
+            if out.any():
+                level = np.where(sl_hit, stop, target)
+                # Gap à l'ouverture : exécution au pire / au meilleur de l'ouverture et du niveau
+                worse = np.where(is_long == sl_hit, np.minimum(open_[t], level), np.maximum(open_[t], level))
+                exit_price = worse[out]
+                closing = np.flatnonzero(out)
+                units = size[closing]
+                exit_commission = np.abs(units) * exit_price * commission
+                balance += (units * exit_price).sum() - exit_commission.sum()
+                commissions = entry_commission[closing] + exit_commission
+                pnl = units * (exit_price - entry_price[closing]) - commissions
+                returns = (np.sign(units) * (exit_price / entry_price[closing] - 1)
+                           - commissions / (np.abs(units) * entry_price[closing]))
+                rows.extend(zip(closing, units, entry_bar[closing], np.full(len(closing), t),
+                                entry_price[closing], exit_price, stop[closing], target[closing],
+                                pnl, commissions, returns))
+                size[closing] = 0
+
+        # 3. Trailing stop remonté à la clôture (utilisé à partir de la bougie suivante)
+        stop = np.where(size > 0, np.fmax(stop, trail_long[t]), np.where(size < 0, np.fmin(stop, trail_short[t]), stop))
+
+        # 4. Valorisation du portefeuille à la clôture
+        equity[t] = balance + (size * np.nan_to_num(last_close[t])).sum()
+        if equity[t] <= 0:
+            equity[t:] = 0
+            break
+
+        # 5. Nouveaux signaux sur les symboles sans position (exécutés à l'ouverture suivante)
+        if t < n - 1:
+            new = (size == 0) & traded & (signal[t] != 0)
+            if new.any():
+                pending[new] = signal[t, new]
+                sl, tp = strategy.levels(signal[t, new], close[t, new], atr_values[t, new], atr_mult, tp_mult)
+                pending_sl[new] = sl
+                pending_tp[new] = tp
+
+    trades = pd.DataFrame(rows, columns=TRADE_COLUMNS)
+    trades = trades.astype({'EntryBar': int, 'ExitBar': int})
+    trades['Symbol'] = [symbols[j] for j in trades['Symbol']]
+    trades['EntryTime'] = index[trades['EntryBar'].to_numpy()]
+    trades['ExitTime'] = index[trades['ExitBar'].to_numpy()]
+
+    per_symbol = trades.groupby('Symbol').agg(**{
+        'PnL [$]': ('PnL', 'sum'), '# Trades': ('PnL', 'size'),
+        'Win Rate [%]': ('PnL', lambda pnl: (pnl > 0).mean() * 100),
+    }).reindex(symbols).fillna({'PnL [$]': 0.0, '# Trades': 0})
+
+    stats_rows = trades[['Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice', 'SL', 'TP',
+                         'PnL', 'Commission', 'ReturnPct']].to_numpy(dtype=float)
+    equity = pd.Series(equity, index=index, name='Equity').ffill().fillna(float(cash))
+    return {
+        'equity': equity,
+        'trades': trades,
+        'per_symbol': per_symbol,
+        'stats': quick_stats(equity.to_numpy(), stats_rows),
+    }
+
+
+# --- GRILLES DE TEMPS DÉCALÉES ---
+def check_mixed_grid(frames, offset='30min'):
+    """
+    Décale l'index d'un symbole sur deux de `offset` (actions yfinance à :30, crypto à :00) et vérifie que
+    chaque symbole prend exactement les mêmes trades (dates d'entrée et de sortie) que seul dans le portefeuille.
+    Renvoie {'symbols', 'trades', 'mismatches' (symboles en écart), 'ok'}.
+    """
+    shifted = {}
+    for k, (symbol, frame) in enumerate(frames.items()):
+        frame = frame.copy()
+        if k % 2:
+            frame.index = frame.index + pd.Timedelta(offset)
+        shifted[symbol] = frame
+    trades = run_portfolio_backtest(shifted)['trades']
+    mismatches = []
+    for symbol, frame in shifted.items():
+        alone = run_portfolio_backtest({symbol: frame})['trades']
+        mixed = trades[trades['Symbol'] == symbol]
+        if not (alone['EntryTime'].tolist() == mixed['EntryTime'].tolist()
+                and alone['ExitTime'].tolist() == mixed['ExitTime'].tolist()):
+            mismatches.append(symbol)
+    return {'symbols': len(frames), 'trades': len(trades), 'mismatches': mismatches, 'ok': not mismatches}
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=50, help="Nombre de symboles synthétiques")
+    parser.add_argument("--bars", type=int, default=3 * 365 * 24, help="Bougies 1h par symbole")
+    parser.add_argument("--check-grid", action="store_true", help="Vérifier les trades avec des grilles de temps décalées (:00 / :30)")
+    import profiling
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    from synthetic import generate_ohlcv
+    frames = {f"SYN{k}": generate_ohlcv(args.bars, seed=k) for k in range(args.symbols)}
+    if args.check_grid:
+        check = check_mixed_grid(frames)
+        print(f"{'✅' if check['ok'] else '❌'} Grilles décalées : {check['trades']} trades sur {check['symbols']} symboles"
+              f"{'' if check['ok'] else ', écarts : ' + ', '.join(check['mismatches'])}")
+        raise SystemExit(0 if check['ok'] else 1)
+    start = time.perf_counter()
+    with profiling.maybe(profiling.from_args(args, "portfolio"), "run"):
+        result = run_portfolio_backtest(frames)
+    elapsed = time.perf_counter() - start
+    stats = result['stats']
+    print(f"💼 {args.symbols} symboles x {args.bars} bougies en {elapsed:.2f}s")
+    print(f"📈 Rendement {stats['Return [%]']:.2f}% | {stats['# Trades']} trades | Drawdown max {stats['Max. Drawdown [%]']:.2f}%")
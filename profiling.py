@@ -0,0 +1,200 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+# ==========================================
+# PROFILAGE À LA DEMANDE (BOUCLES DES BOTS ET BACKTESTS)
+# ==========================================
+# --profile sur les points d'entrée, case à cocher dans l'onglet simulation du dashboard.
+# Deux modes :
+# - 'cprofile' : profil exact des itérations choisies (une sur `every`) -> fichier .pstats
+#                (snakeviz / python -m pstats), surcoût limité aux itérations profilées
+# - 'sample'   : échantillonnage de la pile toutes les `interval` secondes depuis un thread
+#                -> fichier .collapsed (flamegraph.pl, speedscope), surcoût borné : utilisable en production
+# Chaque run affiche les fonctions les plus coûteuses et la part du temps par famille
+# (pandas, construction de DataFrame, réseau / attente API, ccxt, alpaca...).
+
+DEFAULT_DIR = Path(os.getenv("PROFILE_DIR", Path(__file__).parent / "profiles"))
+
+# Familles de temps, reconnues au chemin du fichier (la première qui correspond gagne)
+CATEGORIES = (
+    ('pandas_ta', ('pandas_ta',)),
+    ('DataFrame', ('pandas/core/frame.py', 'pandas/core/internals/construction.py')),
+    ('pandas', ('pandas',)),
+    ('numpy', ('numpy',)),
+    ('réseau / attente API', ('requests', 'urllib3', 'http/client.py', 'ssl.py', 'socket.py', 'selectors.py',
+                              'aiohttp', 'websockets')),
+    ('ccxt', ('ccxt',)),
+    ('alpaca', ('alpaca_trade_api', 'alpaca/')),
+    ('backtesting.py', ('backtesting',)),
+    ('yfinance', ('yfinance',)),
+)
+
+
+def category(filename):
+    path = filename.replace(os.sep, '/')
+    for name, patterns in CATEGORIES:
+        if any(pattern in path for pattern in patterns):
+            return name
+    if path.startswith(str(Path(__file__).parent).replace(os.sep, '/')):
+        return 'code du bot'
+    return 'autre'
+
+
+def _label(filename, line, function):
+    return f"{Path(filename).name}:{line}({function})" if line else function
+
+
+class Profiler:
+    def __init__(self, name, mode='cprofile', every=1, out_dir=None, top=15, interval=0.005):
+        if mode not in ('cprofile', 'sample'):
+            raise ValueError(f"❌ Mode de profilage inconnu : {mode} (cprofile ou sample)")
+        self.name = name
+        self.mode = mode
+        self.every = max(1, every)
+        self.out_dir = Path(out_dir) if out_dir else DEFAULT_DIR
+        self.top = top
+        self.interval = interval
+        self.calls = 0
+
+    def iteration(self, label):
+        """session() pour une itération sur `every`, contexte vide pour les autres (un compteur)"""
+        self.calls += 1
+        if (self.calls - 1) % self.every:
+            return nullcontext({})
+        return self.session(f"{label}{self.calls}")
+
+    def wrap(self, fn):
+        """fn profilée une fois sur `every`"""
+        def wrapper(*args, **kwargs):
+            with self.iteration(fn.__name__):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        return wrapper
+
+    @contextmanager
+    def session(self, label="run", quiet=False):
+        """Profile le bloc ; le dict produit reçoit 'path' (fichier écrit) et 'report' (texte) à la sortie"""
+        result = {}
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        base = self.out_dir / f"{self.name}_{label}_{stamp}"
+        start = time.perf_counter()
+        if self.mode == 'cprofile':
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield result
+            finally:
+                profile.disable()
+                elapsed = time.perf_counter() - start
+                result['path'] = base.with_suffix('.pstats')
+                profile.dump_stats(result['path'])
+                result['report'] = self._pstats_report(profile, elapsed, label, result['path'])
+        else:
+            sampler = _Sampler(threading.get_ident(), self.interval)
+            sampler.start()
+            try:
+                yield result
+            finally:
+                sampler.stop()
+                elapsed = time.perf_counter() - start
+                result['path'] = base.with_suffix('.collapsed')
+                result['path'].write_text("".join(f"{stack} {count}\n" for stack, count in sampler.stacks.items()))
+                result['report'] = self._sample_report(sampler, elapsed, label, result['path'])
+        if not quiet:
+            print(result['report'])
+
+    # --- RAPPORTS ---
+    def _header(self, label, elapsed, path):
+        return f"🔬 Profil {self.name}/{label} ({self.mode}) : {elapsed * 1000:.1f} ms -> {path}"
+
+    def _pstats_report(self, profile, elapsed, label, path):
+        stats = pstats.Stats(profile)
+        shares = Counter()
+        rows = []
+        for (filename, line, function), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            shares[category(filename)] += tottime
+            rows.append((tottime, cumtime, calls, _label(filename, line, function)))
+        total = sum(shares.values()) or 1.0
+        lines = [self._header(label, elapsed, path)]
+        lines.append("   Par famille (temps propre) : " + " | ".join(
+            f"{name} {value / total:.0%}" for name, value in shares.most_common() if value / total >= 0.01))
+        lines.append(f"   {'propre (ms)':>12} {'cumulé (ms)':>12} {'appels':>8}  fonction")
+        for tottime, cumtime, calls, name in sorted(rows, reverse=True)[:self.top]:
+            lines.append(f"   {tottime * 1000:12.2f} {cumtime * 1000:12.2f} {calls:8d}  {name}")
+        return "\n".join(lines)
+
+    def _sample_report(self, sampler, elapsed, label, path):
+        samples = sum(sampler.stacks.values())
+        lines = [self._header(label, elapsed, path)]
+        if not samples:
+            lines.append("   Aucun échantillon (bloc plus court que l'intervalle)")
+            return "\n".join(lines)
+        lines.append("   Par famille (feuille de pile) : " + " | ".join(
+            f"{name} {count / samples:.0%}" for name, count in sampler.categories.most_common()
+            if count / samples >= 0.01))
+        lines.append(f"   {'échantillons':>12} {'part':>6}  fonction (en cours d'exécution)")
+        for name, count in sampler.leaves.most_common(self.top):
+            lines.append(f"   {count:12d} {count / samples:6.0%}  {name}")
+        return "\n".join(lines)
+
+
+class _Sampler:
+    """Relève la pile d'un thread à intervalle fixe (sys._current_frames) ; piles repliées 'a;b;c' -> nombre"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.leaves = Counter()
+        self.categories = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            leaf = frame.f_code
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.leaves[_label(leaf.co_filename, leaf.co_firstlineno, leaf.co_name)] += 1
+            self.categories[category(leaf.co_filename)] += 1
+
+
+def add_arguments(parser):
+    """Options communes --profile / --profile-every des points d'entrée"""
+    parser.add_argument("--profile", nargs="?", const="cprofile", choices=("cprofile", "sample"),
+                        help="Profiler les itérations (cprofile, défaut) ou échantillonner la pile (sample, léger)")
+    parser.add_argument("--profile-every", type=int, default=1, help="Profiler une itération sur N")
+
+
+def maybe(profiler, label):
+    """Contexte de profilage d'une itération, ou contexte vide si le profilage est désactivé"""
+    return profiler.iteration(label) if profiler else nullcontext({})
+
+
+def from_args(args, name):
+    """Profiler configuré par --profile, ou None"""
+    if not getattr(args, 'profile', None):
+        return None
+    return Profiler(name, mode=args.profile, every=args.profile_every)
@@ -0,0 +1,110 @@
+import time
+from datetime import datetime, timezone
+from ohlcv_cache import hlc, timeframe_ms
+from scheduler import BarScheduler
+from stream import BarAggregator, make_source, parse_event, run_stream
+import profiling
+
+# ==========================================
+# REJEU HISTORIQUE ACCÉLÉRÉ DES BOTS PAPIER
+# ==========================================
+# Les bougies enregistrées (fichier JSONL du flux) ou stockées dans le cache local passent
+# par le même code de portefeuille et de signal que le live, sans attendre la clôture réelle :
+# speed = 0 -> aussi vite que le CPU le permet ; speed = 3600 -> une bougie 1h par seconde (démo).
+# run_paper_bot() : aiguillage commun des bots papier (rejeu, flux poussé ou réveil à chaque clôture).
+
+
+def parse_date(text):
+    """'2024-01-31' ou '2024-01-31T12:00' (UTC) -> horodatage ms ; None si vide"""
+    if not text:
+        return None
+    moment = datetime.fromisoformat(text)
+    return int(moment.replace(tzinfo=moment.tzinfo or timezone.utc).timestamp() * 1000)
+
+def bar_time(timestamp):
+    """Horodatage ms -> texte affiché dans le journal (la date compte en rejeu)"""
+    return datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+def load_bars(cache, source, symbol, timeframe, path=None, since=None, until=None):
+    """
+    Bougies clôturées à rejouer [(timestamp, open, high, low, close, volume), ...].
+    `path` : enregistrement JSONL (stream.record) ; sinon le cache local (source, symbole, timeframe).
+    """
+    if path:
+        bars = []
+        aggregator = BarAggregator(timeframe, bars.append, skip_partial=False)
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    aggregator.add(parse_event(line))
+        # Fin de l'enregistrement : la dernière bougie est considérée clôturée
+        aggregator.flush(now=float('inf'))
+    else:
+        data = cache.rows_after(source, symbol, timeframe, None if since is None else since - 1)
+        bars = list(zip(data['timestamp'].tolist(), data['open'].tolist(), data['high'].tolist(),
+                        data['low'].tolist(), data['close'].tolist(), data['volume'].tolist()))
+    return [bar for bar in bars
+            if (since is None or bar[0] >= since) and (until is None or bar[0] < until)]
+
+def replay(bars, on_bar, timeframe, speed=0, sleep=time.sleep):
+    """Appelle on_bar(bar) pour chaque bougie ; avec speed > 0, attend durée_bougie / speed entre deux"""
+    pause = timeframe_ms(timeframe) / 1000 / speed if speed else 0
+    for bar in bars:
+        on_bar(bar)
+        if pause:
+            sleep(pause)
+    return len(bars)
+
+
+def run_paper_bot(args, exchange, cache, feed, timeframe, indicators, tick, act, reset, wallet, profiler=None):
+    """
+    Boucle des bots papier (local_bot, binance_simu) selon les arguments : --replay, --stream ou BarScheduler.
+    - tick(expected) : itération live (données, signal, ordres) ; act(last, now) : décision sur une ligne d'indicateurs
+    - reset(symbol) : portefeuille et noyau neufs pour une paire rejouée -> ses indicateurs
+    `cache` est celui que lit le bot en mode flux (temporaire pour un flux hors ligne).
+    """
+    symbol = args.symbol.split(",")[0]
+
+    def replay_bar(bar):
+        """Bougie historique : même code que le live, horloge = horodatage de la bougie"""
+        last = indicators.feed([hlc(bar)])
+        if last is not None:
+            act(last, bar_time(bar[0]))
+
+    def on_bar(bar):
+        """Bougie clôturée poussée par le flux"""
+        if (indicators.last_timestamp or -1) >= bar[0]:
+            return
+        last = cache.last_timestamp(exchange.id, symbol, timeframe)
+        # Trou dans le flux (reconnexion) : rattrapage REST avant d'intégrer la bougie
+        if live_stream and last is not None and bar[0] > last + timeframe_ms(timeframe):
+            feed.update_ccxt(exchange, symbol, timeframe, limit=100, need=bar[0] - timeframe_ms(timeframe))
+        cache.append(exchange.id, symbol, timeframe, [bar])
+        tick(bar[0])
+
+    if args.replay:
+        path = None if args.replay == "cache" else args.replay
+        for symbol in args.symbol.split(","):
+            # Portefeuille et indicateurs neufs pour chaque paire
+            indicators = reset(symbol)
+            bars = load_bars(cache, exchange.id, symbol, timeframe, path, parse_date(args.since), parse_date(args.until))
+            if not bars:
+                print(f"⚠️ Aucune bougie à rejouer pour {symbol} (cache vide ?)")
+                continue
+            print(f"⏪ Rejeu {symbol} : {len(bars)} bougies ({bar_time(bars[0][0])} -> {bar_time(bars[-1][0])})")
+            with profiling.maybe(profiler, f"replay_{symbol.replace('/', '-')}"):
+                replay(bars, replay_bar, timeframe, speed=args.speed)
+            valeur_finale = wallet['USDT'] + wallet['CRYPTO'] * bars[-1][4]
+            print(f"🏁 {symbol} : valeur finale {valeur_finale:.2f}$ ({valeur_finale - 1000:+.2f}$)")
+    elif args.stream:
+        source = make_source(args.stream, exchange.id, symbol, timeframe, args.stream_path)
+        live_stream = args.stream in ("kline", "trades")
+        if live_stream:
+            # Chauffe REST unique, puis plus aucun polling : chaque clôture déclenche directement la stratégie
+            feed.update_ccxt(exchange, symbol, timeframe, limit=100)
+            tick(cache.last_timestamp(exchange.id, symbol, timeframe))
+        run_stream(source, timeframe, on_bar, settle=args.settle)
+    else:
+        # Réveil à chaque clôture de bougie (+ délai de settle) au lieu d'un polling toutes les 60 secondes
+        scheduler = BarScheduler(timeframe, settle=args.settle, intrabar_every=args.intrabar)
+        scheduler.run(tick)
@@ -0,0 +1,186 @@
+import time
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from ohlcv_cache import BAR_DTYPE
+
+# ==========================================
+# ANNEAU DE BOUGIES EN MÉMOIRE PARTAGÉE (UN ÉCRIVAIN, N LECTEURS)
+# ==========================================
+# Un bloc multiprocessing.shared_memory par flux (source, symbole, timeframe), de taille fixe :
+# - les `capacity` dernières bougies clôturées + leurs indicateurs (EMA rapide / lente, RSI, ATR)
+# - un emplacement de plus pour la bougie en cours
+# Un seul écrivain (le hub de données, datahub.py) ; les lecteurs (bots, dashboard) ne prennent aucun verrou :
+# compteur de séquence (seqlock) impair pendant une écriture, le lecteur recommence si la séquence a bougé.
+# La fenêtre lue est une petite copie NumPy (quelques Ko) : ni DataFrame, ni parsing, ni téléchargement.
+# Mémoire constante quelle que soit la durée de fonctionnement des bots.
+
+RING_DTYPE = np.dtype(BAR_DTYPE.descr + [
+    ('ema_fast', '<f8'),
+    ('ema_slow', '<f8'),
+    ('rsi', '<f8'),
+    ('atr', '<f8'),
+])
+
+DEFAULT_CAPACITY = 2000
+
+# En-tête : int64 x 8
+_SEQ, _COUNT, _CAPACITY, _HAS_FORMING = range(4)
+HEADER_SIZE = 8 * 8
+
+_CREATED = set() # Blocs créés par ce processus
+
+
+def ring_name(source, symbol, timeframe):
+    """'binance', 'BTC/USDT', '1h' -> 'bars_binance_BTC-USDT_1h' (nom du bloc partagé)"""
+    return f"bars_{source}_{symbol.replace('/', '-').replace(':', '-')}_{timeframe}"
+
+
+class BarRing:
+    def __init__(self, name, capacity=DEFAULT_CAPACITY, create=False):
+        self.name = name
+        self.owner = create
+        if create:
+            size = HEADER_SIZE + (capacity + 1) * RING_DTYPE.itemsize
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                # Bloc orphelin d'un écrivain arrêté brutalement
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            _CREATED.add(name)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Lecteur : le bloc appartient à l'écrivain, il ne doit pas être détruit à la sortie du lecteur
+            if name not in _CREATED:
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+        self.header = np.ndarray(8, dtype=np.int64, buffer=self.shm.buf)
+        if create:
+            self.header[:] = 0
+            self.header[_CAPACITY] = capacity
+        self.capacity = int(self.header[_CAPACITY])
+        self.rows = np.ndarray(self.capacity + 1, dtype=RING_DTYPE, buffer=self.shm.buf, offset=HEADER_SIZE)
+
+    @classmethod
+    def attach(cls, name):
+        """Lecteur ; None si aucun écrivain n'a créé ce bloc"""
+        try:
+            return cls(name)
+        except FileNotFoundError:
+            return None
+
+    # --- ÉCRITURE (écrivain unique) ---
+    def append(self, rows, forming=None):
+        """Ajoute des bougies clôturées (tableau RING_DTYPE) et remplace la bougie en cours (ligne ou None)"""
+        rows = np.asarray(rows, dtype=RING_DTYPE)[-self.capacity:]
+        header = self.header
+        header[_SEQ] += 1 # Impair : écriture en cours
+        count = int(header[_COUNT])
+        if len(rows):
+            self.rows[(count + np.arange(len(rows))) % self.capacity] = rows
+            header[_COUNT] = count + len(rows)
+        if forming is not None:
+            self.rows[self.capacity] = forming
+        header[_HAS_FORMING] = forming is not None
+        header[_SEQ] += 1 # Pair : lecture possible
+
+    # --- LECTURE (sans verrou) ---
+    def _read(self, fn):
+        while True:
+            seq = int(self.header[_SEQ])
+            if seq & 1:
+                time.sleep(0)
+                continue
+            result = fn(int(self.header[_COUNT]), bool(self.header[_HAS_FORMING]))
+            if int(self.header[_SEQ]) == seq:
+                return result
+
+    def _slots(self, count, n):
+        n = min(n, count, self.capacity)
+        return (count - n + np.arange(n)) % self.capacity
+
+    def window(self, n=None, forming=False):
+        """Les `n` dernières bougies clôturées (toutes par défaut), + la bougie en cours si `forming`"""
+        def read(count, has_forming):
+            rows = self.rows[self._slots(count, self.capacity if n is None else n)]
+            if forming and has_forming:
+                rows = np.concatenate([rows, self.rows[self.capacity:]])
+            return rows
+        return self._read(read)
+
+    def after(self, timestamp):
+        """Bougies clôturées postérieures à `timestamp` ; None si l'anneau ne remonte pas jusque-là (trou)"""
+        def read(count, _):
+            size = min(count, self.capacity)
+            timestamps = self.rows['timestamp']
+            # Recherche dichotomique dans l'ordre logique (le plus ancien en premier)
+            lo, hi = 0, size
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if timestamps[(count - size + mid) % self.capacity] <= timestamp:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == 0 and size:
+                return None # L'anneau commence après `timestamp` : le lecteur a trop de retard (relire le cache)
+            return self.rows[self._slots(count, size - lo)]
+        return self._read(read)
+
+    def last_timestamp(self):
+        rows = self.window(1)
+        return int(rows['timestamp'][0]) if len(rows) else None
+
+    @property
+    def seq(self):
+        """Numéro de version : change à chaque écriture (rafraîchissement de l'affichage)"""
+        return int(self.header[_SEQ])
+
+    def close(self):
+        self.header = self.rows = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            _CREATED.discard(self.name)
+
+
+def _value(value):
+    return np.nan if value is None else value
+
+
+INDICATOR_FIELDS = ('ema_fast', 'ema_slow', 'rsi', 'atr')
+
+
+def ring_rows(bars, indicators):
+    """Bougies clôturées (BAR_DTYPE) -> lignes RING_DTYPE ; `indicators` (StreamingIndicators) intègre chaque bougie"""
+    rows = np.zeros(len(bars), dtype=RING_DTYPE)
+    for name in BAR_DTYPE.names:
+        rows[name] = bars[name]
+    values = []
+    for timestamp, high, low, close in hlc_rows(bars):
+        indicators.update(high, low, close)
+        indicators.last_timestamp = timestamp
+        values.append([getattr(indicators, name).value for name in INDICATOR_FIELDS])
+    # None (chauffe) -> NaN
+    values = np.array(values, dtype=float).reshape(-1, len(INDICATOR_FIELDS))
+    for k, name in enumerate(INDICATOR_FIELDS):
+        rows[name] = values[:, k]
+    return rows
+
+
+def forming_row(bar, indicators):
+    """Bougie en cours (timestamp, open, high, low, close, volume) -> ligne RING_DTYPE, indicateurs via peek()"""
+    row = np.zeros((), dtype=RING_DTYPE)
+    for name, value in zip(BAR_DTYPE.names, bar):
+        row[name] = value
+    _, _, high, low, close, _ = bar
+    row['ema_fast'] = _value(indicators.ema_fast.peek(close))
+    row['ema_slow'] = _value(indicators.ema_slow.peek(close))
+    row['rsi'] = _value(indicators.rsi.peek(close))
+    row['atr'] = _value(indicators.atr.peek(high, low, close))
+    return row
+
+
+def hlc_rows(rows):
+    """Lignes de l'anneau -> [(timestamp, high, low, close), ...] pour StreamingIndicators"""
+    return list(zip(rows['timestamp'].tolist(), rows['high'].tolist(), rows['low'].tolist(), rows['close'].tolist()))
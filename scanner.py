@@ -0,0 +1,192 @@
+import asyncio
+import argparse
+import os
+from datetime import datetime, timezone
+from strategy import SignalKernel, LONG, SHORT
+import profiling
+
+# ==========================================
+# SCANNER MULTI-SYMBOLES (UN SEUL PROCESSUS ASYNCIO)
+# ==========================================
+# Remplace "un bot = un processus Python + pandas" par une boucle asyncio unique :
+# - les téléchargements sont concurrents, bornés par un sémaphore PAR EXCHANGE
+# - chaque symbole ne garde que son état d'indicateurs incrémentaux (quelques floats)
+# - après la chauffe, seules les bougies depuis la dernière clôture connue sont demandées
+
+TIMEFRAME = '1h'
+WARMUP_BARS = 100
+
+# Requêtes simultanées maximum par exchange
+EXCHANGE_LIMITS = {'binance': 10, 'alpaca': 3}
+DEFAULT_LIMIT = 5
+
+
+class CcxtSource:
+    """Données publiques ccxt en asynchrone (ccxt.async_support)"""
+
+    def __init__(self, exchange_id):
+        import ccxt.async_support as ccxt_async
+        self.name = exchange_id
+        self.exchange = getattr(ccxt_async, exchange_id)({'enableRateLimit': True})
+
+    async def fetch(self, symbol, since, limit):
+        rows = await self.exchange.fetch_ohlcv(symbol, TIMEFRAME, since=since, limit=limit)
+        return [(r[0], r[2], r[3], r[4]) for r in rows]
+
+    async def close(self):
+        await self.exchange.close()
+
+
+class AlpacaSource:
+    """Données Alpaca : le client REST est synchrone, on l'exécute dans un thread"""
+
+    def __init__(self):
+        import alpaca_trade_api as tradeapi
+        from dotenv import load_dotenv
+        load_dotenv()
+        self.name = 'alpaca'
+        self.api = tradeapi.REST(os.getenv("ALPACA_API_KEY"), os.getenv("ALPACA_SECRET_KEY"),
+                                 os.getenv("ALPACA_BASE_URL"), api_version='v2')
+
+    def _fetch(self, symbol, since, limit):
+        from alpaca_trade_api.rest import TimeFrame
+        if since is None:
+            kwargs = {'limit': limit}
+        else:
+            start = datetime.fromtimestamp(since / 1000, tz=timezone.utc)
+            kwargs = {'start': start.isoformat().replace('+00:00', 'Z')}
+        if "/" in symbol:
+            df = self.api.get_crypto_bars(symbol, "1Hour", **kwargs).df
+        else:
+            df = self.api.get_bars(symbol, TimeFrame.Hour, **kwargs).df
+        if df.empty:
+            return []
+        timestamps = (df.index.get_level_values(-1).as_unit('ms').asi8).tolist()
+        return list(zip(timestamps, df['high'].tolist(), df['low'].tolist(), df['close'].tolist()))
+
+    async def fetch(self, symbol, since, limit):
+        return await asyncio.to_thread(self._fetch, symbol, since, limit)
+
+    async def close(self):
+        pass
+
+
+class SymbolState:
+    """État minimal d'un symbole surveillé"""
+    __slots__ = ('source', 'symbol', 'kernel', 'indicators', 'last_signal')
+
+    def __init__(self, source, symbol):
+        self.source = source
+        self.symbol = symbol
+        self.kernel = SignalKernel()
+        self.indicators = self.kernel.indicators
+        self.last_signal = "NEUTRE"
+
+
+SIGNAL_NAMES = {LONG: "BUY", SHORT: "SELL"}
+
+def evaluate(kernel, last):
+    """Même règle que les bots (noyau strategy.py) : croisement EMA 9/21 + RSI directionnel, SL/TP sur l'ATR"""
+    direction, sl, tp = kernel.evaluate(last)
+    return SIGNAL_NAMES.get(direction, "NEUTRE"), sl, tp
+
+
+async def scan_symbol(state, semaphore, on_signal):
+    # Après la chauffe, on ne demande que depuis la dernière bougie clôturée intégrée
+    since = state.indicators.last_timestamp
+    async with semaphore:
+        bars = await state.source.fetch(state.symbol, since, WARMUP_BARS)
+    last = state.indicators.sync(bars)
+    if last is None:
+        return
+    signal, sl, tp = evaluate(state.kernel, last)
+    if signal != state.last_signal:
+        state.last_signal = signal
+        if signal != "NEUTRE":
+            on_signal(state, last, signal, sl, tp)
+
+
+def print_signal(state, last, signal, sl, tp):
+    icon = "🟢" if signal == "BUY" else "🔴"
+    now = datetime.now().strftime('%H:%M')
+    print(f"[{now}] {icon} {signal} {state.source.name}:{state.symbol} | Prix: {last['close']:.2f} | SL: {sl:.2f} | TP: {tp:.2f}")
+
+
+def telegram_signal(notifier):
+    """on_signal qui affiche et notifie ; les rafales multi-symboles sont regroupées par le Notifier"""
+    def on_signal(state, last, signal, sl, tp):
+        print_signal(state, last, signal, sl, tp)
+        icon = "🟢" if signal == "BUY" else "🔴"
+        notifier.notify(f"{icon} *{signal}* {state.source.name}:{state.symbol}\n"
+                        f"Prix : {last['close']:.2f} | SL : {sl:.2f} | TP : {tp:.2f}")
+    return on_signal
+
+
+def parse_symbols(symbols, default_exchange):
+    """'BTC/USDT,alpaca:NVDA' -> [('binance', 'BTC/USDT'), ('alpaca', 'NVDA')]"""
+    pairs = []
+    for item in symbols.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        prefix, sep, rest = item.partition(":")
+        # 'BTC/USDT:USDT' (contrat ccxt) n'a pas de préfixe d'exchange
+        if sep and "/" not in prefix:
+            pairs.append((prefix, rest))
+        else:
+            pairs.append((default_exchange, item))
+    return pairs
+
+
+async def run_scanner(pairs, interval=60, on_signal=print_signal, profiler=None):
+    sources = {}
+    semaphores = {}
+    states = []
+    for exchange_id, symbol in pairs:
+        if exchange_id not in sources:
+            sources[exchange_id] = AlpacaSource() if exchange_id == 'alpaca' else CcxtSource(exchange_id)
+            semaphores[exchange_id] = asyncio.Semaphore(EXCHANGE_LIMITS.get(exchange_id, DEFAULT_LIMIT))
+        states.append(SymbolState(sources[exchange_id], symbol))
+
+    print(f"📡 Scanner démarré sur {len(states)} symboles ({', '.join(sources)})")
+    try:
+        while True:
+            with profiling.maybe(profiler, "scan"):
+                results = await asyncio.gather(
+                    *(scan_symbol(state, semaphores[state.source.name], on_signal) for state in states),
+                    return_exceptions=True,
+                )
+            for state, result in zip(states, results):
+                if isinstance(result, Exception):
+                    print(f"⚠️ Erreur {state.symbol} : {result}")
+            await asyncio.sleep(interval)
+    finally:
+        for source in sources.values():
+            await source.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=str, default="BTC/USDT,ETH/USDT", help="Liste séparée par des virgules (préfixe 'exchange:' optionnel)")
+    parser.add_argument("--exchange", type=str, default="binance", help="Exchange par défaut")
+    parser.add_argument("--interval", type=float, default=60, help="Secondes entre deux scans")
+    parser.add_argument("--telegram", action="store_true", help="Envoyer aussi les signaux sur Telegram (.env)")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+
+    on_signal = print_signal
+    if args.telegram:
+        from dotenv import load_dotenv
+        from notifier import telegram_notifier
+        load_dotenv()
+        notifier = telegram_notifier()
+        if notifier:
+            on_signal = telegram_signal(notifier)
+        else:
+            print("⚠️ TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID absents, signaux affichés seulement.")
+
+    try:
+        asyncio.run(run_scanner(parse_symbols(args.symbols, args.exchange), interval=args.interval, on_signal=on_signal,
+                                profiler=profiling.from_args(args, "scanner")))
+    except KeyboardInterrupt:
+        print("🛑 Scanner arrêté.")
@@ -0,0 +1,71 @@
+import time
+from ohlcv_cache import timeframe_ms
+
+# ==========================================
+# PLANIFICATEUR ALIGNÉ SUR LA CLÔTURE DES BOUGIES
+# ==========================================
+# Au lieu d'interroger l'API toutes les 60 s (59 appels inutiles par bougie 1h) :
+# - on dort jusqu'à la clôture exacte de la bougie + un délai de "settle" (publication côté exchange)
+# - on réessaie rapidement (avec un recul exponentiel) tant que la nouvelle bougie clôturée n'est pas disponible
+# - mode intrabar optionnel : évaluation de la bougie en cours à faible fréquence
+
+
+class BarScheduler:
+    def __init__(self, timeframe='1h', settle=2.0, retry_every=2.0, max_wait=120.0, intrabar_every=None,
+                 offset=0.0, clock=time.time, sleep=time.sleep):
+        self.period = timeframe_ms(timeframe) / 1000
+        # Décalage des bougies par rapport à l'heure pleine (ex : 1800 s pour les actions US ouvertes à 9h30)
+        self.offset = offset
+        self.settle = settle
+        self.retry_every = retry_every
+        self.max_wait = max_wait
+        self.intrabar_every = intrabar_every or None
+        self.clock = clock
+        self.sleep = sleep
+
+    def next_close(self, now=None):
+        """Prochaine clôture de bougie (epoch en secondes)"""
+        now = self.clock() if now is None else now
+        return ((now - self.offset) // self.period + 1) * self.period + self.offset
+
+    def seconds_until_wake(self, now=None):
+        now = self.clock() if now is None else now
+        # Juste après une clôture, on est encore dans la fenêtre de settle de la bougie précédente
+        close = self.next_close(now - self.settle)
+        return max(0.0, close + self.settle - now), close
+
+    def expected_open_ms(self, close):
+        """Horodatage (ms, ouverture) de la bougie qui vient de clôturer à `close`"""
+        return int((close - self.period) * 1000)
+
+    def run(self, step, immediate=True):
+        """
+        Boucle infinie. `step(expected)` est appelé :
+        - au démarrage (si `immediate`) pour la dernière bougie clôturée
+        - à chaque clôture avec l'horodatage d'ouverture (ms) de la bougie attendue ; il renvoie False
+          si elle n'est pas encore publiée (nouvel essai après `retry_every` secondes, jusqu'à `max_wait`)
+        - en mode intrabar, toutes les `intrabar_every` secondes avec expected=None
+        """
+        if immediate:
+            step(self.expected_open_ms(self.next_close() - self.period))
+
+        while True:
+            wait, close = self.seconds_until_wake()
+            wake_at = self.clock() + wait
+
+            # Attente de la clôture (avec évaluations intrabar éventuelles)
+            while self.intrabar_every and wake_at - self.clock() > self.intrabar_every:
+                self.sleep(self.intrabar_every)
+                step(None)
+            self.sleep(max(0.0, wake_at - self.clock()))
+
+            expected = self.expected_open_ms(close)
+            deadline = self.clock() + self.max_wait
+            delay = self.retry_every
+            while not step(expected):
+                if self.clock() >= deadline:
+                    # Marché fermé ou source en retard : inutile d'insister jusqu'à la prochaine clôture
+                    print(f"💤 Pas de nouvelle bougie après {self.max_wait:.0f}s, on attend la suivante.")
+                    break
+                self.sleep(min(delay, max(0.0, deadline - self.clock())))
+                delay *= 2
@@ -1,20 +1,32 @@
-import time
-import pandas_ta as ta
 from datetime import datetime
+import time
 import os
 from dotenv import load_dotenv
-import alpaca_trade_api as tradeapi
 from pathlib import Path
 import argparse
 import sys
-import requests
-import pandas as pd
-import yfinance as yf # <--- La clé pour les données gratuites
+from strategy import SignalKernel, LONG, SHORT
+from ohlcv_cache import OHLCVCache, hlc, timeframe_ms
+from scheduler import BarScheduler
+from notifier import telegram_notifier
+from state import BotState, state_name, resume_indicators
+from metrics import metrics
+import datahub
+import profiling
 
 # --- GESTION ARGUMENTS ---
 parser = argparse.ArgumentParser()
 parser.add_argument("--symbol", type=str, default="BTC/USD", help="Symbole à surveiller")
+parser.add_argument("--settle", type=float, default=2.0, help="Secondes d'attente après la clôture d'une bougie")
+parser.add_argument("--intrabar", type=float, default=0, help="Évaluation de la bougie en cours toutes les N secondes (0 = désactivé)")
+parser.add_argument("--fresh", action="store_true", help="Ignorer l'état sauvegardé (dernier signal oublié, indicateurs recalculés)")
+parser.add_argument("--metrics-port", type=int, default=0, help="Port local des mesures de latence au format Prometheus (0 = désactivé)")
+datahub.add_arguments(parser)
+profiling.add_arguments(parser)
 args = parser.parse_args()
+
+# Import lourd après les arguments : --help et les erreurs de saisie sont instantanés
+import alpaca_trade_api as tradeapi
 SYMBOL = args.symbol 
 
 # --- CONFIG ---
@@ -28,24 +40,20 @@ BASE_URL = os.getenv("ALPACA_BASE_URL")
 TG_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TG_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
 
-# Paramètres Stratégie
-EMA_FAST = 9
-EMA_SLOW = 21
-RSI_LEN = 14
-ATR_LEN = 14
-ATR_MULT_SL = 2.0
-TP_MULT = 2.6
+# Stratégie : noyau commun (strategy.py), mêmes paramètres que le backtest
+kernel = SignalKernel()
+indicators = kernel.indicators
+cache = OHLCVCache()
+# Téléchargements via le hub de données partagé (--hub) : un seul appel par clôture pour tous les bots
+feed = datahub.DataFeed(cache, args.hub)
 
 # --- FONCTIONS ---
+# Envoi Telegram en arrière-plan : la boucle ne fait que déposer le message dans une file
+notifier = telegram_notifier(TG_TOKEN, TG_CHAT_ID)
+
 def send_telegram(message):
-    if TG_TOKEN and TG_CHAT_ID:
-        url = f"https://api.telegram.org/bot{TG_TOKEN}/sendMessage"
-        data = {"chat_id": TG_CHAT_ID, "text": message, "parse_mode": "Markdown"}
-        try:
-            requests.post(url, data=data)
-            print(f"📩 Notification envoyée !")
-        except:
-            print(f"❌ Erreur envoi Telegram")
+    if notifier:
+        notifier.notify(message)
 
 # Connexion Alpaca (juste pour vérifier les clés, on utilise Yahoo pour la data Stocks)
 try:
@@ -56,58 +64,76 @@ except Exception as e:
     print(f"❌ Erreur Clés : {e}")
     sys.exit()
 
-def get_data():
+def get_data(intrabar=False, need=None):
     try:
-        df = None
-        
+        # Cache local : seules les bougies postérieures à la dernière stockée sont téléchargées
+
         # CAS 1 : CRYPTO (Alpaca est parfait)
         if "/" in SYMBOL:
-            df = api.get_crypto_bars(SYMBOL, "1Hour", limit=200).df
-            df.columns = [c.lower() for c in df.columns]
-            rename_map = {'c': 'close', 'h': 'high', 'l': 'low', 'o': 'open', 'v': 'volume'}
-            df.rename(columns=rename_map, inplace=True)
-            
+            source, timeframe = 'alpaca', "1Hour"
+            with metrics.timer('fetch'):
+                forming = feed.update_alpaca(api, SYMBOL, timeframe, limit=200, need=need)
+
         # CAS 2 : ACTIONS (Yahoo Finance pour éviter le délai)
         else:
-            # On télécharge les 5 derniers jours en H1
-            ticker = yf.Ticker(SYMBOL)
-            df = ticker.history(period="5d", interval="1h")
-            
-            if df.empty: return None
-            
-            # Nettoyage Yahoo
-            df.columns = [c.lower() for c in df.columns] # open, high, low, close...
-            # Yahoo n'a pas besoin de rename, les noms sont déjà bons (juste en minuscules)
-
-        # Calculs Indicateurs
-        df['EMA_Fast'] = ta.ema(df['close'], length=EMA_FAST)
-        df['EMA_Slow'] = ta.ema(df['close'], length=EMA_SLOW)
-        df['RSI'] = ta.rsi(df['close'], length=RSI_LEN)
-        df['ATR'] = ta.atr(df['high'], df['low'], df['close'], length=ATR_LEN)
-        
-        df.dropna(inplace=True)
-        return df
+            # Premier appel : les 5 derniers jours en H1
+            source, timeframe = 'yfinance', "1h"
+            with metrics.timer('fetch'):
+                forming = feed.update_yfinance(SYMBOL, interval=timeframe, period="5d", need=need)
+
+        with metrics.timer('parse'):
+            closed = feed.window(source, SYMBOL, timeframe, after=indicators.last_timestamp)
+
+        # Calculs Indicateurs (incrémentaux : seules les nouvelles bougies clôturées sont intégrées)
+        # À la clôture on évalue la bougie clôturée ; en mode intrabar, la bougie en cours
+        with metrics.timer('indicators'):
+            return indicators.feed(closed, hlc(forming) if intrabar else None)
 
     except Exception as e:
         print(f"⚠️ Erreur Data : {e}")
         return None
 
+if args.metrics_port:
+    metrics.serve(args.metrics_port, bot="signal_bot", symbol=SYMBOL)
+
 # --- BOUCLE PRINCIPALE ---
 last_signal = "NEUTRE"
 
+# Reprise à chaud : dernier signal + état des indicateurs (pas de double notification ni de chauffe au redémarrage)
+store = BotState(state_name("signal_bot", SYMBOL))
+snapshot = None if args.fresh else store.load()
+if snapshot:
+    last_signal = snapshot['last_signal']
+    # Indicateurs repris seulement si le cache couvre l'arrêt (sinon chauffe comme au démarrage à froid)
+    if "/" in SYMBOL:
+        warm = resume_indicators(indicators, snapshot, cache, 'alpaca', SYMBOL, "1Hour", warmup=200)
+    else:
+        warm = resume_indicators(indicators, snapshot, cache, 'yfinance', SYMBOL, "1h", warmup=5 * 24) # period="5d"
+    print(f"♻️ Reprise de l'état sauvegardé : dernier signal {last_signal}{'' if warm else ' (indicateurs recalculés)'}")
+
 print("📡 Recherche de signaux en cours...")
 
-while True:
+def tick(expected):
+    """
+    Une itération : données, signal, ordres.
+    expected = ouverture (ms) de la bougie qui vient de clôturer, ou None en mode intrabar.
+    Renvoie False si cette bougie n'est pas encore publiée (le planificateur réessaie).
+    """
+    global last_signal
     try:
-        df = get_data()
-        
-        if df is not None and not df.empty:
-            last = df.iloc[-1]
+        last = get_data(intrabar=expected is None, need=expected)
+        if expected is not None and (indicators.last_timestamp or 0) < expected:
+            return False
+
+        if last is not None:
             price = last['close']
             ema_f = last['EMA_Fast']
             ema_s = last['EMA_Slow']
             rsi = last['RSI']
-            atr = last['ATR']
+            if expected is not None:
+                metrics.observe('bot_bar_close_to_decision_seconds', time.time() - (expected + timeframe_ms("1Hour")) / 1000)
+            with metrics.timer('decision'):
+                direction, sl, tp = kernel.evaluate(last)
 
             # Affichage console (Pour te rassurer que ça tourne)
             now = datetime.now().strftime('%H:%M')
@@ -116,28 +142,26 @@ while True:
             # --- LOGIQUE DE SIGNAL ---
             
             # ACHAT
-            if ema_f > ema_s and rsi > 50:
+            if direction == LONG:
                 if last_signal != "BUY":
-                    sl = price - (ATR_MULT_SL * atr)
-                    tp = price + (TP_MULT * atr)
                     msg = (f"🟢 **ACHAT (LONG) : {SYMBOL}**\n"
                            f"Prix : {price:.2f}\n"
                            f"Stop Loss : {sl:.2f}\n"
                            f"Take Profit : {tp:.2f}")
                     send_telegram(msg)
                     last_signal = "BUY"
+                    store.record('signal', symbol=SYMBOL, side='buy', price=price, sl=sl, tp=tp)
             
             # VENTE
-            elif ema_f < ema_s and rsi < 50:
+            elif direction == SHORT:
                 if last_signal != "SELL":
-                    sl = price + (ATR_MULT_SL * atr)
-                    tp = price - (TP_MULT * atr)
                     msg = (f"🔴 **VENTE (SHORT) : {SYMBOL}**\n"
                            f"Prix : {price:.2f}\n"
                            f"Stop Loss : {sl:.2f}\n"
                            f"Take Profit : {tp:.2f}")
                     send_telegram(msg)
                     last_signal = "SELL"
+                    store.record('signal', symbol=SYMBOL, side='sell', price=price, sl=sl, tp=tp)
             
             # NEUTRE
             else:
@@ -145,10 +169,23 @@ while True:
                     last_signal = "NEUTRE"
                     # On ne notifie pas le retour au neutre pour ne pas spammer
 
+            # Instantané écrit en arrière-plan
+            store.save({'last_signal': last_signal, 'indicators': indicators.state()})
+
         else:
             print("💤 Données vides ou marché fermé.")
 
     except Exception as e:
         print(f"⚠️ Erreur boucle : {e}")
-
-    time.sleep(60)
\ No newline at end of file
+    return True
+
+# Profilage à la demande (--profile) : une itération sur --profile-every, rapport + fichier dans profiles/
+profiler = profiling.from_args(args, "signal_bot")
+if profiler:
+    tick = profiler.wrap(tick)
+
+# Réveil à chaque clôture de bougie (+ délai de settle) au lieu d'un polling toutes les 60 secondes
+# Les bougies H1 Yahoo des actions US sont décalées d'une demi-heure (ouverture à 9h30)
+offset = 0 if "/" in SYMBOL else 1800
+scheduler = BarScheduler("1Hour", settle=args.settle, intrabar_every=args.intrabar, offset=offset)
+scheduler.run(tick)
@@ -0,0 +1,156 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from ohlcv_cache import now_ms, timeframe_ms
+
+# ==========================================
+# REPRISE À CHAUD : INSTANTANÉ D'ÉTAT + JOURNAL DES TRADES
+# ==========================================
+# Par bot (nom + symbole), deux fichiers dans bot_state/ (ou $BOT_STATE_DIR) :
+# - <nom>.json          : instantané compact (portefeuille, position, dernier signal, état des indicateurs)
+#                         réécrit atomiquement (fichier temporaire + os.replace), seul le plus récent compte
+# - <nom>.journal.jsonl : journal des trades en ajout seul, une ligne JSON par événement
+# La boucle ne fait que déposer dans une file (aucune écriture disque, aucun fsync sur le chemin critique).
+# Un thread dédié écrit par lots : un seul fsync par lot toutes les `flush_every` secondes au plus.
+# Au redémarrage, load() relit l'instantané en quelques millisecondes : pas de bougies de chauffe à retélécharger.
+# resume_indicators() ne reprend les indicateurs que si les bougies manquantes depuis l'arrêt sont récupérables.
+
+DEFAULT_ROOT = Path(os.getenv("BOT_STATE_DIR", Path(__file__).parent / "bot_state"))
+STATE_VERSION = 1
+
+
+def state_name(bot, symbol):
+    """'local_bot', 'BTC/USDT' -> 'local_bot_BTC-USDT'"""
+    return f"{bot}_{symbol.replace('/', '-').replace(':', '-')}"
+
+
+def resume_indicators(indicators, snapshot, cache, source, symbol, timeframe, warmup):
+    """
+    Recharge l'état des indicateurs de l'instantané -> True, ou False (chauffe complète depuis le cache).
+    Refusé si l'instantané est plus vieux que la fenêtre de chauffe (`warmup` bougies, ce qu'un démarrage à froid
+    télécharge) ou si le cache ne contient plus sa dernière bougie (cache vidé ou déplacé) : les bougies intégrées
+    ensuite ne seraient pas la suite de celles de l'instantané.
+    """
+    state = snapshot['indicators']
+    last = state['last_timestamp']
+    if last is not None:
+        if now_ms() - last > warmup * timeframe_ms(timeframe):
+            return False
+        # Le cache se complète depuis sa dernière bougie : s'il contient `last`, la suite est continue
+        stored = cache.rows_after(source, symbol, timeframe, last - 1)
+        if not len(stored) or stored['timestamp'][0] != last:
+            return False
+    return indicators.restore(state)
+
+
+class BotState:
+    def __init__(self, name, root=None, flush_every=1.0, max_queue=10_000):
+        root = Path(root) if root else DEFAULT_ROOT
+        root.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = root / f"{name}.json"
+        self.journal_path = root / f"{name}.journal.jsonl"
+        self.flush_every = flush_every
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name=f"state-{name}", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --- LECTURE (au démarrage) ---
+    def load(self):
+        """Dernier instantané (dict) ou None (premier lancement, fichier illisible, autre version)"""
+        try:
+            state = json.loads(self.snapshot_path.read_text())
+        except (OSError, ValueError):
+            return None
+        return state if state.get('version') == STATE_VERSION else None
+
+    def journal(self):
+        """Événements du journal, du plus ancien au plus récent (une ligne tronquée par un crash est ignorée)"""
+        events = []
+        try:
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return events
+
+    # --- ÉCRITURE (depuis la boucle, ne bloque jamais) ---
+    def save(self, state):
+        """Programme l'écriture de l'instantané (copie superficielle : la boucle peut continuer à modifier ses dicts)"""
+        self._put(('snapshot', {**state, 'version': STATE_VERSION, 'saved_at': time.time()}))
+
+    def record(self, event, **fields):
+        """Ajoute un événement au journal (ex : record('buy', symbol=..., price=..., qty=...))"""
+        self._put(('journal', {'ts': time.time(), 'event': event, **fields}))
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0):
+        """Écrit ce qui reste dans la file (fsync compris) puis arrête le thread"""
+        if self._thread.is_alive():
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+
+    # --- THREAD D'ÉCRITURE ---
+    def _write_snapshot(self, state):
+        tmp = self.snapshot_path.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+
+    def _run(self):
+        with open(self.journal_path, 'a') as journal:
+            stop = False
+            while not stop:
+                item = self.queue.get()
+                # Lot : tout ce qui arrive pendant flush_every secondes
+                batch = [item]
+                deadline = time.monotonic() + self.flush_every
+                while item is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+
+                snapshot = None
+                lines = []
+                for item in batch:
+                    if item is None:
+                        stop = True
+                    elif item[0] == 'journal':
+                        lines.append(json.dumps(item[1], separators=(',', ':')) + "\n")
+                    else:
+                        snapshot = item[1] # Seul le plus récent est écrit
+
+                try:
+                    # Journal d'abord : un instantané ne décrit jamais un trade absent du journal
+                    if lines:
+                        journal.writelines(lines)
+                        journal.flush()
+                        os.fsync(journal.fileno())
+                    if snapshot is not None:
+                        self._write_snapshot(snapshot)
+                except OSError as e:
+                    print(f"⚠️ Erreur sauvegarde d'état : {e}")
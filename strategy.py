@@ -0,0 +1,117 @@
+import numpy as np
+from indicators import StreamingIndicators, ema, rsi, atr
+
+# ==========================================
+# NOYAU DE STRATÉGIE UNIQUE (EMA 9/21 + RSI 14 + ATR 14)
+# ==========================================
+# Une seule définition de la règle, utilisée partout :
+# - mode batch (tableaux complets) : backtests, optimisation (vector_engine, engine.BotStrategy)
+# - mode incrémental (une bougie à la fois) : bots live, simulateurs, scanner
+# Règle : LONG si EMA rapide > EMA lente et RSI > 50, SHORT si EMA rapide < EMA lente et RSI < 50.
+# SL / TP posés à ATR_MULT_SL / TP_MULT fois l'ATR du prix de clôture du signal.
+# check_parity() vérifie que les deux modes donnent exactement les mêmes signaux (tests/test_strategy_parity.py).
+
+EMA_FAST = 9
+EMA_SLOW = 21
+RSI_LEN = 14
+ATR_LEN = 14
+RSI_THRESHOLD = 50
+ATR_MULT_SL = 2.0
+TP_MULT = 2.6
+TRAIL_MULT = 1.5 # Trailing stop des backtests
+
+LONG, FLAT, SHORT = 1, 0, -1
+
+
+# --- RÈGLE ---
+def signal(ema_fast, ema_slow, rsi_value, threshold=RSI_THRESHOLD):
+    """Une bougie -> LONG / SHORT / FLAT"""
+    if ema_fast > ema_slow and rsi_value > threshold:
+        return LONG
+    if ema_fast < ema_slow and rsi_value < threshold:
+        return SHORT
+    return FLAT
+
+def signals(ema_fast, ema_slow, rsi_values, threshold=RSI_THRESHOLD):
+    """Même règle sur des tableaux (NaN de chauffe -> FLAT)"""
+    with np.errstate(invalid='ignore'):
+        return np.where((ema_fast > ema_slow) & (rsi_values > threshold), LONG,
+                        np.where((ema_fast < ema_slow) & (rsi_values < threshold), SHORT, FLAT))
+
+def levels(direction, price, atr_value, atr_mult=ATR_MULT_SL, tp_mult=TP_MULT):
+    """(stop loss, take profit) d'une entrée dans la direction donnée"""
+    return price - direction * atr_mult * atr_value, price + direction * tp_mult * atr_value
+
+
+# --- MODE BATCH ---
+def compute(high, low, close, fast_len=EMA_FAST, slow_len=EMA_SLOW, rsi_len=RSI_LEN, atr_len=ATR_LEN,
+            threshold=RSI_THRESHOLD):
+    """Indicateurs et signal sur des tableaux complets (NaN pendant la chauffe)"""
+    columns = {
+        'EMA_Fast': ema(close, fast_len),
+        'EMA_Slow': ema(close, slow_len),
+        'RSI': rsi(close, rsi_len),
+        'ATR': atr(high, low, close, atr_len),
+    }
+    columns['signal'] = signals(columns['EMA_Fast'], columns['EMA_Slow'], columns['RSI'], threshold)
+    return columns
+
+
+# --- MODE INCRÉMENTAL ---
+class SignalKernel:
+    """Indicateurs incrémentaux + règle : une décision par bougie, en O(1)"""
+
+    def __init__(self, fast_len=EMA_FAST, slow_len=EMA_SLOW, rsi_len=RSI_LEN, atr_len=ATR_LEN,
+                 threshold=RSI_THRESHOLD, atr_mult=ATR_MULT_SL, tp_mult=TP_MULT):
+        self.indicators = StreamingIndicators(fast_len, slow_len, rsi_len, atr_len)
+        self.threshold = threshold
+        self.atr_mult = atr_mult
+        self.tp_mult = tp_mult
+
+    def evaluate(self, last):
+        """Snapshot d'indicateurs -> (direction, sl, tp) ; (FLAT, None, None) si neutre ou en chauffe"""
+        if last is None:
+            return FLAT, None, None
+        direction = signal(last['EMA_Fast'], last['EMA_Slow'], last['RSI'], self.threshold)
+        if direction == FLAT:
+            return FLAT, None, None
+        return (direction, *levels(direction, last['close'], last['ATR'], self.atr_mult, self.tp_mult))
+
+    def update(self, high, low, close):
+        """Intègre une bougie clôturée et renvoie (snapshot, direction, sl, tp)"""
+        last = self.indicators.update(high, low, close)
+        return (last, *self.evaluate(last))
+
+    def feed(self, closed_bars, forming=None):
+        """Comme StreamingIndicators.feed, avec la décision en plus"""
+        last = self.indicators.feed(closed_bars, forming)
+        return (last, *self.evaluate(last))
+
+
+# --- PARITÉ BATCH / INCRÉMENTAL ---
+def check_parity(high, low, close, fast_len=EMA_FAST, slow_len=EMA_SLOW, rsi_len=RSI_LEN, atr_len=ATR_LEN,
+                 threshold=RSI_THRESHOLD, tolerance=1e-9):
+    """
+    Rejoue les bougies une à une dans SignalKernel et compare au mode batch.
+    Renvoie {'bars', 'max_error' (écart relatif des indicateurs), 'signal_mismatches', 'ok'}.
+    """
+    batch = compute(high, low, close, fast_len, slow_len, rsi_len, atr_len, threshold)
+    kernel = SignalKernel(fast_len, slow_len, rsi_len, atr_len, threshold)
+    names = ('EMA_Fast', 'EMA_Slow', 'RSI', 'ATR')
+    max_error = 0.0
+    mismatches = 0
+    rows = zip(np.asarray(high).tolist(), np.asarray(low).tolist(), np.asarray(close).tolist())
+    for i, (h, l, c) in enumerate(rows):
+        last, direction, _, _ = kernel.update(h, l, c)
+        if last is None:
+            # En chauffe : le batch doit aussi avoir au moins un indicateur indéfini
+            if not any(np.isnan(batch[name][i]) for name in names):
+                mismatches += 1
+            continue
+        for name in names:
+            error = abs(last[name] - batch[name][i]) / max(1.0, abs(batch[name][i]))
+            max_error = max(max_error, error) if not np.isnan(error) else np.inf
+        if direction != batch['signal'][i]:
+            mismatches += 1
+    return {'bars': len(close), 'max_error': max_error, 'signal_mismatches': mismatches,
+            'ok': max_error <= tolerance and mismatches == 0}
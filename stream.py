@@ -0,0 +1,250 @@
+import asyncio
+import json
+from ohlcv_cache import timeframe_ms, now_ms
+
+# ==========================================
+# INGESTION EN FLUX (PUSH) : KLINES / TRADES -> BOUGIES CLÔTURÉES
+# ==========================================
+# Au lieu d'interroger l'API REST, une source pousse des événements :
+#   ('trade', timestamp_ms, prix, quantité)
+#   ('kline', timestamp_ms, open, high, low, close, volume, clôturée)
+# BarAggregator construit la bougie en mémoire et appelle on_bar(bar) à chaque clôture,
+# avec bar = (timestamp, open, high, low, close, volume), le même format que le cache.
+# Sources interchangeables : websocket ccxt.pro, fichier JSONL rejoué, socket TCP (tests hors ligne).
+
+
+class BarAggregator:
+    """Agrège trades ou klines en bougies OHLCV ; on_bar(bar) est appelé une fois par bougie clôturée"""
+
+    def __init__(self, timeframe, on_bar, skip_partial=True):
+        self.tf_ms = timeframe_ms(timeframe)
+        self.on_bar = on_bar
+        self.bar = None # [timestamp, open, high, low, close, volume] de la bougie en cours
+        self.last_closed = None
+        # Avec des trades, la première bougie ne contient que la fin de la période : on l'ignore
+        self._partial = skip_partial
+
+    def _close(self):
+        bar, self.bar = tuple(self.bar), None
+        if self._partial:
+            self._partial = False
+            return
+        self.last_closed = bar[0]
+        self.on_bar(bar)
+
+    def _is_late(self, bucket):
+        # Événement d'une bougie déjà clôturée (réseau en retard, reconnexion) : ignoré
+        return (self.last_closed is not None and bucket <= self.last_closed) or \
+               (self.bar is not None and bucket < self.bar[0])
+
+    def add_trade(self, timestamp, price, qty=0.0):
+        bucket = timestamp - timestamp % self.tf_ms
+        if self._is_late(bucket):
+            return
+        if self.bar is not None and bucket > self.bar[0]:
+            self._close()
+        if self.bar is None:
+            self.bar = [bucket, price, price, price, price, qty]
+        else:
+            bar = self.bar
+            if price > bar[2]:
+                bar[2] = price
+            if price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] += qty
+
+    def add_kline(self, timestamp, open_, high, low, close, volume, closed=False):
+        # Une kline porte l'état complet de la bougie : pas de bougie partielle à ignorer
+        self._partial = False
+        if self._is_late(timestamp):
+            return
+        if self.bar is not None and timestamp > self.bar[0]:
+            self._close()
+        self.bar = [timestamp, open_, high, low, close, volume]
+        if closed:
+            self._close()
+
+    def add(self, event):
+        if event[0] == 'trade':
+            self.add_trade(*event[1:])
+        elif event[0] == 'kline':
+            self.add_kline(*event[1:])
+
+    def flush(self, now=None):
+        """Clôture à l'horloge : la bougie en cours est échue même sans nouvel événement"""
+        now = now_ms() if now is None else now
+        if self.bar is not None and self.bar[0] + self.tf_ms <= now:
+            self._close()
+
+
+# --- FORMAT TEXTE (FICHIERS ET SOCKETS DE REJEU) ---
+def parse_event(line):
+    """Ligne JSON -> événement. {"type": "trade", "ts", "price", "qty"} ou {"type": "kline", "ts", "o", "h", "l", "c", "v", "closed"}"""
+    data = json.loads(line)
+    if data['type'] == 'trade':
+        return ('trade', int(data['ts']), float(data['price']), float(data.get('qty', 0.0)))
+    return ('kline', int(data['ts']), float(data['o']), float(data['h']), float(data['l']),
+            float(data['c']), float(data.get('v', 0.0)), bool(data.get('closed', False)))
+
+def format_event(event):
+    if event[0] == 'trade':
+        _, ts, price, qty = event
+        return json.dumps({'type': 'trade', 'ts': ts, 'price': price, 'qty': qty})
+    _, ts, o, h, l, c, v, closed = event
+    return json.dumps({'type': 'kline', 'ts': ts, 'o': o, 'h': h, 'l': l, 'c': c, 'v': v, 'closed': closed})
+
+
+# --- SOURCES ---
+# Interface : `name`, `realtime` (horloge murale ou temps rejoué), `async events()` et `async close()`
+
+class CcxtKlineSource:
+    """Klines poussées par websocket (ccxt.pro watch_ohlcv)"""
+    realtime = True
+
+    def __init__(self, exchange_id, symbol, timeframe):
+        import ccxt.pro as ccxtpro
+        self.name = exchange_id
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.exchange = getattr(ccxtpro, exchange_id)({'enableRateLimit': True})
+
+    async def events(self):
+        while True:
+            rows = await self.exchange.watch_ohlcv(self.symbol, self.timeframe)
+            for r in rows:
+                yield ('kline', r[0], r[1], r[2], r[3], r[4], r[5], False)
+
+    async def close(self):
+        await self.exchange.close()
+
+
+class CcxtTradeSource(CcxtKlineSource):
+    """Trades bruts poussés par websocket (ccxt.pro watch_trades), agrégés localement"""
+
+    async def events(self):
+        while True:
+            trades = await self.exchange.watch_trades(self.symbol)
+            for t in trades:
+                yield ('trade', t['timestamp'], t['price'], t['amount'] or 0.0)
+
+
+class ReplaySource:
+    """
+    Rejeu d'un fichier JSONL d'événements (voir parse_event), ou de bougies du cache (from_bars).
+    speed = 0 : aussi vite que possible ; sinon accélération du temps réel (ex : 60 = 1 h en 1 min).
+    """
+    realtime = False
+
+    def __init__(self, path=None, speed=0, events=None, name='replay'):
+        self.name = name
+        self.path = path
+        self.speed = speed
+        self._events = events
+
+    @classmethod
+    def from_bars(cls, bars, speed=0, name='replay'):
+        """Tableau BAR_DTYPE (OHLCVCache.read) -> klines clôturées"""
+        events = [('kline', int(b['timestamp']), float(b['open']), float(b['high']), float(b['low']),
+                   float(b['close']), float(b['volume']), True) for b in bars]
+        return cls(events=events, speed=speed, name=name)
+
+    def _iter(self):
+        if self._events is not None:
+            yield from self._events
+            return
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    yield parse_event(line)
+
+    async def events(self):
+        previous = None
+        for event in self._iter():
+            if self.speed and previous is not None and event[1] > previous:
+                await asyncio.sleep((event[1] - previous) / 1000 / self.speed)
+            previous = event[1]
+            yield event
+
+    async def close(self):
+        pass
+
+
+class SocketSource:
+    """Événements JSONL lus sur une socket TCP (ex : `nc -l 9000 < trades.jsonl`)"""
+
+    def __init__(self, host='127.0.0.1', port=9000, name='socket', realtime=False):
+        self.name = name
+        # realtime=True seulement si la socket relaie un flux en direct (clôture à l'horloge)
+        self.realtime = realtime
+        self.host = host
+        self.port = port
+        self.writer = None
+
+    async def events(self):
+        reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        while line := await reader.readline():
+            if line.strip():
+                yield parse_event(line)
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+def make_source(kind, exchange_id, symbol, timeframe, path=None):
+    """'kline' / 'trades' (websocket ccxt.pro), 'file' (rejeu de `path`) ou 'socket' (`path` = hôte:port)"""
+    if kind == 'kline':
+        return CcxtKlineSource(exchange_id, symbol, timeframe)
+    if kind == 'trades':
+        return CcxtTradeSource(exchange_id, symbol, timeframe)
+    if kind == 'file':
+        return ReplaySource(path)
+    if kind == 'socket':
+        host, _, port = (path or '127.0.0.1:9000').rpartition(':')
+        return SocketSource(host or '127.0.0.1', int(port))
+    raise ValueError(f"Source de flux inconnue : {kind}")
+
+
+# --- BOUCLE ---
+async def stream_bars(source, timeframe, on_bar, settle=2.0, check_every=1.0):
+    """
+    Consomme la source et appelle on_bar(bar) pour chaque bougie clôturée.
+    En temps réel, une bougie échue est aussi clôturée à l'horloge (close + settle), sans attendre l'événement suivant.
+    """
+    aggregator = BarAggregator(timeframe, on_bar)
+    watchdog = None
+
+    async def clock_flush():
+        while True:
+            await asyncio.sleep(check_every)
+            aggregator.flush(now_ms() - int(settle * 1000))
+
+    if source.realtime:
+        watchdog = asyncio.create_task(clock_flush())
+    try:
+        async for event in source.events():
+            aggregator.add(event)
+    finally:
+        if watchdog:
+            watchdog.cancel()
+        await source.close()
+    return aggregator
+
+def run_stream(source, timeframe, on_bar, settle=2.0):
+    """Point d'entrée synchrone pour les bots"""
+    return asyncio.run(stream_bars(source, timeframe, on_bar, settle=settle))
+
+async def record(source, path, limit=None):
+    """Enregistre un flux en JSONL pour le rejouer plus tard (ReplaySource)"""
+    count = 0
+    try:
+        with open(path, 'a') as f:
+            async for event in source.events():
+                f.write(format_event(event) + "\n")
+                count += 1
+                if limit and count >= limit:
+                    break
+    finally:
+        await source.close()
+    return count
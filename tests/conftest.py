@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modules du dépôt à la racine (pas de paquet installé)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
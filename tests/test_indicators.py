@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+import indicators
+from synthetic import generate_bars
+
+# Référence écrite directement à partir des définitions de pandas_ta (boucles Python, sans pandas) :
+# - ta.ema : NaN pendant la chauffe, SMA des `length` premières valeurs, puis récurrence alpha = 2 / (length + 1)
+# - ta.rsi / ta.atr : rma = ewm(alpha=1/length, adjust=True, min_periods=length), soit une moyenne pondérée
+#   par (1 - alpha)^k de toutes les valeurs valides depuis la première
+# Tolérance : 1e-9 en relatif (et 1e-9 en absolu pour les valeurs proches de 0), NaN aux mêmes positions.
+RTOL = ATOL = 1e-9
+LENGTHS = [2, 9, 14, 21]
+
+
+def ref_ema(close, length):
+    out = [np.nan] * len(close)
+    if len(close) < length:
+        return np.array(out)
+    value = sum(close[:length]) / length
+    out[length - 1] = value
+    alpha = 2.0 / (length + 1)
+    for i in range(length, len(close)):
+        value = alpha * close[i] + (1 - alpha) * value
+        out[i] = value
+    return np.array(out)
+
+
+def ref_rma(values, length):
+    """Moyenne ewm adjust=True explicite : somme pondérée / somme des poids, NaN initiaux ignorés"""
+    decay = 1.0 - 1.0 / length
+    out = []
+    seen = []
+    for value in values:
+        if not np.isnan(value):
+            seen.append(value)
+        if len(seen) < length:
+            out.append(np.nan)
+            continue
+        weights = [decay ** k for k in range(len(seen) - 1, -1, -1)]
+        out.append(sum(w * v for w, v in zip(weights, seen)) / sum(weights))
+    return np.array(out)
+
+
+def ref_rsi(close, length):
+    delta = [np.nan] + [close[i] - close[i - 1] for i in range(1, len(close))]
+    gain = ref_rma([d if np.isnan(d) else max(d, 0.0) for d in delta], length)
+    loss = ref_rma([d if np.isnan(d) else max(-d, 0.0) for d in delta], length)
+    return 100.0 * gain / (gain + loss)
+
+
+def ref_atr(high, low, close, length):
+    tr = [np.nan] + [max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+                     for i in range(1, len(close))]
+    return ref_rma(tr, length)
+
+
+def streaming(indicator, *series):
+    """Valeurs de update() bougie par bougie (None -> NaN), en vérifiant au passage que peek() donne la même"""
+    out = []
+    for values in zip(*series):
+        peeked = indicator.peek(*values)
+        value = indicator.update(*values)
+        assert peeked == value or (peeked is None and value is None)
+        out.append(np.nan if value is None else value)
+    return np.array(out)
+
+
+@pytest.fixture(scope="module")
+def bars():
+    # Taille modeste : la référence rma est quadratique
+    bars = generate_bars(600, seed=3)
+    return bars['high'].tolist(), bars['low'].tolist(), bars['close'].tolist()
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_ema(bars, length):
+    _, _, close = bars
+    reference = ref_ema(close, length)
+    np.testing.assert_allclose(indicators.ema(close, length), reference, rtol=RTOL, atol=ATOL)
+    np.testing.assert_allclose(streaming(indicators.StreamingEMA(length), close), reference, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_rsi(bars, length):
+    _, _, close = bars
+    reference = ref_rsi(close, length)
+    np.testing.assert_allclose(indicators.rsi(close, length), reference, rtol=RTOL, atol=ATOL)
+    np.testing.assert_allclose(streaming(indicators.StreamingRSI(length), close), reference, rtol=RTOL, atol=ATOL)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_atr(bars, length):
+    high, low, close = bars
+    reference = ref_atr(high, low, close, length)
+    np.testing.assert_allclose(indicators.atr(high, low, close, length), reference, rtol=RTOL, atol=ATOL)
+    np.testing.assert_allclose(streaming(indicators.StreamingATR(length), high, low, close), reference,
+                               rtol=RTOL, atol=ATOL)
+
+
+def test_short_series_stays_warming_up():
+    close = [100.0, 101.0, 99.5]
+    assert np.isnan(indicators.ema(close, 5)).all()
+    assert np.isnan(streaming(indicators.StreamingEMA(5), close)).all()
+    assert np.isnan(indicators.rsi(close, 5)).all()
+    assert np.isnan(streaming(indicators.StreamingRSI(5), close)).all()
+
+
+def test_state_restore_resumes_identically(bars):
+    high, low, close = bars
+    full = indicators.StreamingIndicators()
+    resumed = indicators.StreamingIndicators()
+    half = len(close) // 2
+    for h, l, c in zip(high[:half], low[:half], close[:half]):
+        full.update(h, l, c)
+    assert resumed.restore(full.state())
+    for h, l, c in zip(high[half:], low[half:], close[half:]):
+        assert resumed.update(h, l, c) == full.update(h, l, c)
@@ -0,0 +1,30 @@
+import pytest
+import optimizer
+from synthetic import generate_ohlcv
+from vector_engine import run_vector_backtest
+
+DEFAULTS = {'fast_len': 9, 'slow_len': 21, 'rsi_len': 14, 'atr_len': 14, 'atr_mult': 2.0, 'tp_mult': 3.0}
+LENGTHS = ('fast_len', 'slow_len', 'rsi_len', 'atr_len')
+
+
+@pytest.fixture(scope="module")
+def df():
+    return generate_ohlcv(1500, seed=1)
+
+
+def test_results_keep_grid_dtypes(df):
+    results = optimizer.optimize(df, {'fast_len': [5, 9], 'atr_mult': [1.5, 2]}, DEFAULTS, processes=1)
+    for name in LENGTHS:
+        assert results[name].dtype.kind == 'i'
+    assert results['atr_mult'].dtype.kind == 'f'
+    # La meilleure ligne se rejoue telle quelle dans le backtest vectorisé
+    best = results.to_dict('records')[0]
+    stats = run_vector_backtest(df, cash=1000000, commission=.0003, **{name: best[name] for name in DEFAULTS})
+    assert stats['Return [%]'] == pytest.approx(best['Return [%]'])
+
+
+def test_empty_results_keep_grid_dtypes(df):
+    results = optimizer.optimize(df, {'fast_len': [5]}, DEFAULTS, constraint=lambda params: False)
+    assert results.empty
+    for name in LENGTHS:
+        assert results[name].dtype.kind == 'i'
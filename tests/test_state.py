@@ -0,0 +1,53 @@
+import pytest
+from indicators import StreamingIndicators
+from ohlcv_cache import OHLCVCache, now_ms, timeframe_ms
+from state import resume_indicators
+
+TF = '1h'
+HOUR = timeframe_ms(TF)
+
+
+def bars(start, count):
+    return [(start + k * HOUR, 100.0 + k, 101.0 + k, 99.0 + k, 100.5 + k, 1.0) for k in range(count)]
+
+
+def snapshot_after(rows):
+    """Instantané d'indicateurs qui ont intégré `rows`"""
+    indicators = StreamingIndicators()
+    indicators.feed([(r[0], r[2], r[3], r[4]) for r in rows])
+    return {'indicators': indicators.state()}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return OHLCVCache(tmp_path)
+
+
+@pytest.fixture
+def recent():
+    # 60 bougies clôturées, la dernière il y a 5 heures
+    return bars((now_ms() // HOUR - 65) * HOUR, 60)
+
+
+def test_resume_when_cache_covers_the_gap(cache, recent):
+    cache.append('test', 'X/USDT', TF, recent)
+    snapshot = snapshot_after(recent[:40])
+    indicators = StreamingIndicators()
+    assert resume_indicators(indicators, snapshot, cache, 'test', 'X/USDT', TF, warmup=100)
+    assert indicators.last_timestamp == recent[39][0]
+
+
+def test_reject_when_cache_no_longer_holds_the_last_bar(cache, recent):
+    # Cache vidé puis rechargé sur une fenêtre plus récente : trou entre l'instantané et le cache
+    cache.append('test', 'X/USDT', TF, recent[45:])
+    indicators = StreamingIndicators()
+    assert not resume_indicators(indicators, snapshot_after(recent[:40]), cache, 'test', 'X/USDT', TF, warmup=100)
+    assert indicators.last_timestamp is None
+
+
+def test_reject_when_older_than_warmup(cache, recent):
+    cache.append('test', 'X/USDT', TF, recent)
+    # Dernière bougie de l'instantané il y a ~25 heures, chauffe de 20 bougies
+    indicators = StreamingIndicators()
+    assert not resume_indicators(indicators, snapshot_after(recent[:40]), cache, 'test', 'X/USDT', TF, warmup=20)
+    assert indicators.last_timestamp is None
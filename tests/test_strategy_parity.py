@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+import strategy
+from synthetic import generate_bars
+
+
+@pytest.fixture(scope="module")
+def bars():
+    return generate_bars(5000, seed=7)
+
+
+def test_check_parity(bars):
+    parity = strategy.check_parity(bars['high'], bars['low'], bars['close'])
+    assert parity['signal_mismatches'] == 0
+    assert parity['max_error'] <= 1e-9
+    assert parity['ok']
+
+
+@pytest.mark.parametrize("params", [
+    {},
+    {'fast_len': 5, 'slow_len': 30, 'rsi_len': 7, 'atr_len': 10},
+])
+def test_live_signals_and_levels_match_backtest(bars, params):
+    high, low, close = bars['high'], bars['low'], bars['close']
+    batch = strategy.compute(high, low, close, **params)
+    kernel = strategy.SignalKernel(**params)
+    sl_batch, tp_batch = strategy.levels(batch['signal'], close, batch['ATR'])
+    for i, (h, l, c) in enumerate(zip(high.tolist(), low.tolist(), close.tolist())):
+        _, direction, sl, tp = kernel.update(h, l, c)
+        assert direction == batch['signal'][i], f"signal différent à la bougie {i}"
+        if direction != strategy.FLAT:
+            assert sl == pytest.approx(sl_batch[i], rel=1e-9)
+            assert tp == pytest.approx(tp_batch[i], rel=1e-9)
@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+from indicators import ema, rsi, atr
+from strategy import signals, RSI_THRESHOLD, TRAIL_MULT, ATR_MULT_SL, TP_MULT, EMA_FAST, EMA_SLOW, RSI_LEN, ATR_LEN
+
+# ==========================================
+# BACKTEST VECTORISÉ (NUMPY) DE BotStrategy
+# ==========================================
+# Mêmes règles que BotStrategy + backtesting.Backtest :
+# - signal évalué à la clôture de la bougie i, ordre exécuté à l'ouverture de i+1
+# - SL/TP posés à partir de la clôture et de l'ATR de la bougie du signal
+# - trailing stop à 1.5x ATR remonté à chaque clôture, le SL est prioritaire sur le TP dans une même bougie
+#   (sauf avec des bougies 1m : intrabar.py retrouve le niveau réellement touché en premier)
+# - taille = 95% du capital, commission prélevée à l'entrée et à la sortie
+# La boucle Python ne tourne qu'une fois par TRADE : les entrées et sorties sont cherchées par tableaux.
+
+SIZE_FRACTION = 0.95
+
+def _next_index(mask):
+    """Pour chaque i, le premier indice j >= i où mask est vrai (len(mask) sinon)"""
+    n = len(mask)
+    idx = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(idx[::-1])[::-1]
+
+def _find_exit(direction, entry_bar, sl, tp, open_, high, low, trail, intrabar=None):
+    """
+    Cherche la première bougie qui touche le SL (suiveur) ou le TP, par blocs de taille croissante.
+    Renvoie (bougie de sortie, prix de sortie, SL courant) ou None si le trade reste ouvert.
+    `intrabar` (intrabar.IntrabarFills) tranche les bougies qui touchent les deux niveaux.
+    """
+    n = len(open_)
+    lo = entry_bar
+    stop = sl
+    width = 64
+    while lo < n:
+        hi = min(n, lo + width)
+        # Le stop de la bougie m dépend des clôtures entre l'entrée et m-1
+        stops = np.empty(hi - lo)
+        stops[0] = stop
+        if hi - lo > 1:
+            if direction > 0:
+                stops[1:] = np.maximum(stop, np.maximum.accumulate(trail[lo:hi - 1]))
+            else:
+                stops[1:] = np.minimum(stop, np.minimum.accumulate(trail[lo:hi - 1]))
+
+        if direction > 0:
+            sl_hit = low[lo:hi] <= stops
+            tp_hit = high[lo:hi] >= tp
+        else:
+            sl_hit = high[lo:hi] >= stops
+            tp_hit = low[lo:hi] <= tp
+        hit = sl_hit | tp_hit
+
+        if hit.any():
+            j = int(hit.argmax())
+            m = lo + j
+            if sl_hit[j] and tp_hit[j] and intrabar is not None:
+                touch = intrabar.first_touch(m, direction, stops[j], tp)
+                if touch is not None:
+                    return m, touch[1], stops[j]
+            if sl_hit[j]:
+                price = min(open_[m], stops[j]) if direction > 0 else max(open_[m], stops[j])
+            else:
+                price = max(open_[m], tp) if direction > 0 else min(open_[m], tp)
+            return m, price, stops[j]
+
+        stop = max(stops[-1], trail[hi - 1]) if direction > 0 else min(stops[-1], trail[hi - 1])
+        lo = hi
+        width *= 2
+    return None
+
+TRADE_COLUMNS = ['Size', 'EntryBar', 'ExitBar', 'EntryPrice', 'ExitPrice',
+                 'SL', 'TP', 'PnL', 'Commission', 'ReturnPct']
+
+def compute_indicators(open_, high, low, close, fast_len=EMA_FAST, slow_len=EMA_SLOW, rsi_len=RSI_LEN, atr_len=ATR_LEN):
+    return (
+        ema(close, fast_len),
+        ema(close, slow_len),
+        rsi(close, rsi_len),
+        atr(high, low, close, atr_len),
+    )
+
+def simulate(open_, high, low, close, indicators, cash=1000000, commission=.0003, atr_mult=ATR_MULT_SL, tp_mult=TP_MULT,
+             intrabar=None):
+    """
+    Cœur de la simulation sur tableaux NumPy (`intrabar` : modèle de remplissage 1m optionnel).
+    Renvoie (courbe d'équité, trades clôturés [TRADE_COLUMNS], nombre de bougies de chauffe).
+    """
+    n = len(close)
+    ema_f, ema_s, rsi_v, atr_v = indicators
+
+    # Chauffe identique à backtesting.py : on attend que tous les indicateurs soient définis
+    warmup = max(int(np.isnan(ind).argmin()) for ind in indicators)
+    start = 1 + warmup
+
+    signal = signals(ema_f, ema_s, rsi_v, RSI_THRESHOLD)
+    signal[:start] = 0
+    next_signal = _next_index(signal != 0)
+    trail_long = close - TRAIL_MULT * atr_v
+    trail_short = close + TRAIL_MULT * atr_v
+
+    equity = np.full(n, np.nan)
+    rows = []
+    balance = float(cash)
+    k = start
+    while k < n:
+        i = int(next_signal[k])
+        # Un signal sur la dernière bougie ne sera jamais exécuté
+        if i >= n - 1:
+            equity[k:] = balance
+            break
+        equity[k:i + 1] = balance
+
+        direction = int(signal[i])
+        price = close[i]
+        sl = price - direction * atr_mult * atr_v[i]
+        tp = price + direction * tp_mult * atr_v[i]
+
+        # Exécution au marché à l'ouverture suivante, 95% du capital disponible
+        entry_bar = i + 1
+        entry_price = open_[entry_bar]
+        price_plus_commission = entry_price + (SIZE_FRACTION * entry_price * commission) / SIZE_FRACTION
+        size = int((max(0, balance) * SIZE_FRACTION) // price_plus_commission)
+        if not size:
+            # Ordre annulé par le broker : on réévalue dès la bougie d'exécution
+            k = entry_bar
+            continue
+        size *= direction
+        entry_commission = abs(size) * entry_price * commission
+        balance_open = balance - entry_commission
+
+        trail = trail_long if direction > 0 else trail_short
+        exit_ = _find_exit(direction, entry_bar, sl, tp, open_, high, low, trail, intrabar)
+        last_bar = exit_[0] if exit_ else n
+        equity[entry_bar:last_bar] = balance_open + size * (close[entry_bar:last_bar] - entry_price)
+
+        # Argent épuisé : backtesting.py solde le trade à la clôture et arrête la simulation
+        segment = equity[entry_bar:last_bar]
+        if len(segment) and segment.min() <= 0:
+            ruined_bar = entry_bar + int((segment <= 0).argmax())
+            exit_ = (ruined_bar, close[ruined_bar], None)
+
+        if exit_ is None:
+            # Trade encore ouvert en fin de données : il n'apparaît pas dans les trades clôturés
+            break
+
+        exit_bar, exit_price, last_sl = exit_
+        exit_commission = abs(size) * exit_price * commission
+        balance = balance_open + size * (exit_price - entry_price) - exit_commission
+        equity[exit_bar] = balance
+        commissions = entry_commission + exit_commission
+        rows.append((size, entry_bar, exit_bar, entry_price, exit_price, last_sl, tp,
+                     size * (exit_price - entry_price) - commissions, commissions,
+                     np.sign(size) * (exit_price / entry_price - 1) - commissions / (abs(size) * entry_price)))
+        k = exit_bar
+        if balance <= 0:
+            balance = 0.0
+            equity[exit_bar:] = 0
+            break
+
+    equity = pd.Series(equity).bfill().fillna(balance).to_numpy()
+    trades = np.array(rows, dtype=float).reshape(-1, len(TRADE_COLUMNS))
+    return equity, trades, warmup
+
+def quick_stats(equity, trades):
+    """Statistiques de classement calculées directement sur les tableaux (même définition que backtesting.py)"""
+    pnl = trades[:, TRADE_COLUMNS.index('PnL')]
+    returns = trades[:, TRADE_COLUMNS.index('ReturnPct')]
+    drawdown = 1 - equity / np.maximum.accumulate(equity)
+    losses = abs(returns[returns < 0].sum())
+    return {
+        'Return [%]': (equity[-1] - equity[0]) / equity[0] * 100,
+        'Win Rate [%]': (pnl > 0).mean() * 100 if len(pnl) else np.nan,
+        'Profit Factor': returns[returns > 0].sum() / losses if losses else np.nan,
+        '# Trades': len(pnl),
+        'Max. Drawdown [%]': -np.nan_to_num(drawdown.max()) * 100,
+        'Equity Final [$]': equity[-1],
+    }
+
+def run_vector_backtest(df, cash=1000000, commission=.0003, atr_mult=ATR_MULT_SL, tp_mult=TP_MULT,
+                        fast_len=EMA_FAST, slow_len=EMA_SLOW, rsi_len=RSI_LEN, atr_len=ATR_LEN, indicators=None,
+                        intrabar=None):
+    """
+    Backtest vectorisé de BotStrategy. Renvoie les mêmes statistiques que backtesting.Backtest.run().
+    `indicators` permet de fournir des colonnes déjà calculées (ema rapide, ema lente, rsi, atr).
+    `intrabar` : bougies 1m (tableau BAR_DTYPE, voir intrabar.load_minutes) pour savoir si le SL ou le TP
+    a été touché en premier dans une même bougie ; sans elles le SL est retenu comme dans backtesting.py.
+    """
+    from backtesting._stats import compute_stats # Chargé seulement pour le rapport complet
+    open_ = df['Open'].to_numpy(dtype=float)
+    high = df['High'].to_numpy(dtype=float)
+    low = df['Low'].to_numpy(dtype=float)
+    close = df['Close'].to_numpy(dtype=float)
+    n = len(close)
+
+    if indicators is None:
+        indicators = compute_indicators(open_, high, low, close, fast_len, slow_len, rsi_len, atr_len)
+    fills = None
+    if intrabar is not None:
+        from intrabar import IntrabarFills
+        fills = intrabar if isinstance(intrabar, IntrabarFills) else IntrabarFills(intrabar, df.index)
+    equity, rows, warmup = simulate(open_, high, low, close, indicators, cash=cash, commission=commission,
+                                    atr_mult=atr_mult, tp_mult=tp_mult, intrabar=fills)
+
+    trades = pd.DataFrame(rows, columns=TRADE_COLUMNS)
+    trades = trades.astype({'Size': int, 'EntryBar': int, 'ExitBar': int})
+    trades['EntryTime'] = df.index[trades['EntryBar'].to_numpy(dtype=int)]
+    trades['ExitTime'] = df.index[trades['ExitBar'].to_numpy(dtype=int)]
+    trades['Duration'] = trades['ExitTime'] - trades['EntryTime']
+    trades['Tag'] = None
+
+    stats = compute_stats(trades=trades, equity=equity, ohlc_data=df, strategy_instance=None)
+
+    # Avec un DataFrame de trades, compute_stats n'affiche pas les commissions
+    commissions = trades['Commission'].sum()
+    if commissions:
+        keys = list(stats.index)
+        keys.insert(keys.index('Return [%]'), 'Commissions [$]')
+        stats['Commissions [$]'] = commissions
+        stats = type(stats)(stats.reindex(keys), dtype=object)
+
+    # compute_stats ne connaît pas la chauffe sans instance de stratégie : on corrige le Buy & Hold
+    if warmup < n:
+        buy_hold = (close[-1] - close[warmup]) / close[warmup] * 100
+        stats['Alpha [%]'] = stats['Return [%]'] - stats['Beta'] * buy_hold
+        stats['Buy & Hold Return [%]'] = buy_hold
+    return stats